@@ -7,8 +7,10 @@ Solves: BR2 (Adaptive Practice Delivery), BR3 (Efficiency of Practice)
 Research Source: Paper 6.pdf - Algorithm 1
 """
 
+import heapq
 import numpy as np
-from typing import Dict, List, Optional
+import scipy.sparse as sp
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
 from dataclasses import dataclass
 from enum import Enum
 
@@ -57,6 +59,151 @@ class ContentItem:
         if self.prerequisites is None:
             self.prerequisites = []
 
+# ============================================================================
+# ARRAY-BACKED CONTENT BANK (BR3)
+# ============================================================================
+
+class ContentBank:
+    """
+    Struct-of-arrays item pool
+    
+    One NumPy column per numeric field (difficulty, weight, estimated time,
+    scaffolding, concept index) and a sparse items x concepts prerequisite
+    matrix, so filtering and ZPD scoring over the whole pool are a handful
+    of array operations. Text fields stay in plain lists and ContentItem
+    objects are only built, as views, for the items a session returns.
+    """
+    
+    def __init__(
+        self,
+        item_ids: Sequence[str],
+        concept_ids: Sequence[str],
+        difficulty: Sequence[float],
+        weight: Optional[Sequence[float]] = None,
+        estimated_time: Optional[Sequence[int]] = None,
+        scaffolding_available: Optional[Sequence[bool]] = None,
+        prerequisites: Optional[Sequence[Sequence[str]]] = None,
+        payloads: Optional[Sequence[Optional[Dict]]] = None
+    ):
+        """
+        Args:
+            item_ids, concept_ids, difficulty: One entry per item
+            weight, estimated_time, scaffolding_available: Per item
+                (defaults 1.0, 5, True as in ContentItem)
+            prerequisites: Prerequisite concept IDs per item
+            payloads: Per item {'question', 'options', 'correct_answer',
+                'explanation'} (returned as-is in the item views)
+        """
+        n = len(item_ids)
+        self.item_ids = list(item_ids)
+        
+        # Concept vocabulary shared by item concepts and prerequisites
+        self.concepts: List[str] = []
+        self.concept_index: Dict[str, int] = {}
+        self.concept = np.fromiter((self._concept_slot(c) for c in concept_ids), dtype=np.int32, count=n)
+        
+        self.difficulty = np.asarray(difficulty, dtype=np.float64)
+        self.weight = np.ones(n) if weight is None else np.asarray(weight, dtype=np.float64)
+        self.estimated_time = (
+            np.full(n, 5, dtype=np.int32) if estimated_time is None
+            else np.asarray(estimated_time, dtype=np.int32)
+        )
+        self.scaffolding_available = (
+            np.ones(n, dtype=bool) if scaffolding_available is None
+            else np.asarray(scaffolding_available, dtype=bool)
+        )
+        
+        indptr = [0]
+        indices = []
+        for required in (prerequisites if prerequisites is not None else [()] * n):
+            indices.extend(self._concept_slot(c) for c in (required or ()))
+            indptr.append(len(indices))
+        self.prerequisites = sp.csr_matrix(
+            (np.ones(len(indices), dtype=np.float64), indices, indptr),
+            shape=(n, len(self.concepts))
+        )
+        
+        self.payloads = list(payloads) if payloads is not None else [None] * n
+    
+    def _concept_slot(self, concept_id: str) -> int:
+        slot = self.concept_index.get(concept_id)
+        if slot is None:
+            slot = self.concept_index[concept_id] = len(self.concepts)
+            self.concepts.append(concept_id)
+        return slot
+    
+    @classmethod
+    def from_items(cls, items: Iterable[ContentItem]) -> 'ContentBank':
+        """Pack ContentItem objects into columns"""
+        items = list(items)
+        return cls(
+            item_ids=[item.item_id for item in items],
+            concept_ids=[item.concept_id for item in items],
+            difficulty=[item.difficulty for item in items],
+            weight=[item.weight for item in items],
+            estimated_time=[item.estimated_time for item in items],
+            scaffolding_available=[item.scaffolding_available for item in items],
+            prerequisites=[item.prerequisites for item in items],
+            payloads=[
+                {
+                    'question': item.question,
+                    'options': item.options,
+                    'correct_answer': item.correct_answer,
+                    'explanation': item.explanation
+                }
+                for item in items
+            ]
+        )
+    
+    def __len__(self) -> int:
+        return len(self.item_ids)
+    
+    def item(self, i: int) -> ContentItem:
+        """ContentItem view of row i"""
+        payload = self.payloads[i] or {}
+        start, end = self.prerequisites.indptr[i], self.prerequisites.indptr[i + 1]
+        return ContentItem(
+            item_id=self.item_ids[i],
+            concept_id=self.concepts[self.concept[i]],
+            difficulty=float(self.difficulty[i]),
+            weight=float(self.weight[i]),
+            estimated_time=int(self.estimated_time[i]),
+            scaffolding_available=bool(self.scaffolding_available[i]),
+            prerequisites=[self.concepts[c] for c in self.prerequisites.indices[start:end]],
+            question=payload.get('question'),
+            options=payload.get('options'),
+            correct_answer=payload.get('correct_answer'),
+            explanation=payload.get('explanation')
+        )
+    
+    def items(self, indices: Iterable[int]) -> List[ContentItem]:
+        return [self.item(int(i)) for i in indices]
+    
+    def take(self, indices: Sequence[int]) -> 'ContentBank':
+        """New bank holding the given rows (e.g. one classroom's concepts)"""
+        indices = np.asarray(indices, dtype=np.int64)
+        bank = ContentBank.__new__(ContentBank)
+        bank.item_ids = [self.item_ids[i] for i in indices]
+        bank.concepts = self.concepts
+        bank.concept_index = self.concept_index
+        bank.concept = self.concept[indices]
+        bank.difficulty = self.difficulty[indices]
+        bank.weight = self.weight[indices]
+        bank.estimated_time = self.estimated_time[indices]
+        bank.scaffolding_available = self.scaffolding_available[indices]
+        bank.prerequisites = self.prerequisites[indices]
+        bank.payloads = [self.payloads[i] for i in indices]
+        return bank
+    
+    def concept_vector(self, values: Dict[str, float], default: float) -> np.ndarray:
+        """Dense per-concept vector from a {concept_id: value} dict"""
+        vector = np.full(len(self.concepts), default, dtype=np.float64)
+        for concept_id, value in values.items():
+            slot = self.concept_index.get(concept_id)
+            if slot is not None:
+                vector[slot] = value
+        return vector
+
 class AdaptivePracticeEngine:
     """
     Adaptive Learning with Feedback Loops
@@ -68,8 +215,31 @@ class AdaptivePracticeEngine:
     4. Adjust content difficulty dynamically
     """
     
-    def __init__(self, config: CognitiveLoadConfig = CognitiveLoadConfig()):
+    SELECTION_STRATEGIES = ('greedy', 'knapsack')
+    
+    def __init__(
+        self,
+        config: CognitiveLoadConfig = CognitiveLoadConfig(),
+        selection_strategy: str = 'greedy',
+        knapsack_value_scale: int = 20,
+        knapsack_max_cells: int = 20_000_000
+    ):
+        """
+        Args:
+            selection_strategy: 'greedy' (take items in ZPD order while they
+                fit) or 'knapsack' (best total ZPD score under the time
+                budget and max_load); see select_next_content
+            knapsack_value_scale: Knapsack score units per ZPD score point
+                (20 = optimal to within 0.05 per item)
+            knapsack_max_cells: Knapsack table size (items x minutes x score
+                units) above which selection falls back to greedy
+        """
+        if selection_strategy not in self.SELECTION_STRATEGIES:
+            raise ValueError(f"Unknown selection strategy: {selection_strategy}")
         self.config = config
+        self.selection_strategy = selection_strategy
+        self.knapsack_value_scale = knapsack_value_scale
+        self.knapsack_max_cells = knapsack_max_cells
         self.beta1 = 0.9  # Exponential decay for knowledge state
         self.gamma = 0.1  # Scaling factor for difficulty adjustment
         self.alpha = 0.01  # Learning rate
@@ -101,70 +271,218 @@ class AdaptivePracticeEngine:
     
     def select_next_content(
         self,
-        available_content: List[ContentItem],
+        available_content: Union[ContentBank, List[ContentItem]],
         student_mastery: Dict[str, float],
         learning_velocity: Dict[str, float],
-        session_time_remaining: int = 30
+        session_time_remaining: int = 30,
+        strategy: Optional[str] = None
     ) -> List[ContentItem]:
         """
         BR2: Select content that keeps student in Zone of Proximal Development
         BR3: Skip mastered content, focus on gaps
         
         Algorithm from Paper 6.pdf - Steps 5-7
+        
+        Items passing the mastery filter are ranked by ZPD score, then
+        selected under the time budget and the max_load ceiling on the
+        session's average cognitive load, either greedily in rank order or
+        as the knapsack-optimal set (strategy defaults to the engine's).
+        Items that would overload the session can be taken scaffolded
+        (difficulty x 0.7, 2 extra minutes).
         """
-        selected_items = []
-        current_time = 0
+        bank = (
+            available_content if isinstance(available_content, ContentBank)
+            else ContentBank.from_items(available_content)
+        )
         
-        # Filter based on BR3 efficiency rules
-        filtered_content = self._filter_by_mastery(
-            available_content, 
-            student_mastery
+        # Filter based on BR3 efficiency rules, sort by priority (ZPD targeting)
+        ranked, scores = self._rank_content(bank, student_mastery, learning_velocity)
+        return self._select_ranked(
+            bank, ranked, scores, student_mastery, session_time_remaining, strategy
         )
+    
+    def _select_ranked(
+        self,
+        bank: ContentBank,
+        ranked: np.ndarray,
+        scores: np.ndarray,
+        student_mastery: Dict[str, float],
+        session_time_remaining: int,
+        strategy: Optional[str] = None
+    ) -> List[ContentItem]:
+        """Session items from already ranked candidates (see select_next_content)"""
+        if not len(ranked):
+            return []
         
-        # Sort by priority (ZPD targeting)
-        prioritized = self._prioritize_by_zpd(
-            filtered_content,
-            student_mastery,
-            learning_velocity
+        # L(t) contribution of each candidate, plain and scaffolded
+        ki = bank.concept_vector(student_mastery, 0.3)[bank.concept[ranked]] / 100.0
+        weight, difficulty = bank.weight[ranked], bank.difficulty[ranked]
+        loads = weight * difficulty * (1 - ki)
+        scaffolded_loads = weight * (difficulty * 0.7) * (1 - ki)
+        
+        if (strategy or self.selection_strategy) == 'knapsack':
+            choices = self._select_knapsack(
+                bank, ranked, scores, loads, scaffolded_loads, session_time_remaining
+            )
+            if choices is not None:
+                return self._selected_views(bank, ranked, choices)
+        
+        return self._selected_views(
+            bank, ranked,
+            self._select_greedy(bank, ranked, loads, scaffolded_loads, session_time_remaining)
         )
+    
+    def _select_greedy(
+        self,
+        bank: ContentBank,
+        ranked: np.ndarray,
+        loads: np.ndarray,
+        scaffolded_loads: np.ndarray,
+        session_time_remaining: int
+    ) -> List[tuple]:
+        """
+        Take candidates in rank order while they fit the time budget,
+        keeping a running load sum and count so each check is O(1)
+        
+        Returns: (position in ranked, scaffolded) pairs
+        """
+        max_load = self.config.max_load
+        times = bank.estimated_time[ranked].tolist()
+        can_scaffold = bank.scaffolding_available[ranked].tolist()
+        loads, scaffolded_loads = loads.tolist(), scaffolded_loads.tolist()
         
-        # Select items while maintaining optimal cognitive load
-        for item in prioritized:
-            if current_time + item.estimated_time > session_time_remaining:
+        choices = []
+        load_sum = 0.0
+        current_time = 0
+        for position, estimated_time in enumerate(times):
+            if current_time + estimated_time > session_time_remaining:
                 break
             
-            # Calculate projected cognitive load
-            projected_items = selected_items + [item]
-            projected_load = self.calculate_cognitive_load(
-                projected_items,
-                student_mastery
-            )
-            
-            # Check if load is within optimal range
-            if projected_load <= self.config.max_load:
-                selected_items.append(item)
-                current_time += item.estimated_time
-            else:
-                # Try with scaffolding to reduce difficulty
-                if item.scaffolding_available:
-                    scaffolded = ContentItem(
-                        item_id=item.item_id + "_scaffolded",
-                        concept_id=item.concept_id,
-                        difficulty=item.difficulty * 0.7,  # Reduce difficulty
-                        weight=item.weight,
-                        estimated_time=item.estimated_time + 2,  # Scaffolding takes time
-                        scaffolding_available=False
-                    )
-                    projected_items = selected_items + [scaffolded]
-                    projected_load = self.calculate_cognitive_load(
-                        projected_items,
-                        student_mastery
-                    )
-                    
-                    if projected_load <= self.config.max_load:
-                        selected_items.append(scaffolded)
-                        current_time += scaffolded.estimated_time
+            # Projected average load with this item added
+            if (load_sum + loads[position]) / (len(choices) + 1) <= max_load:
+                choices.append((position, False))
+                load_sum += loads[position]
+                current_time += estimated_time
+            elif can_scaffold[position] and (
+                (load_sum + scaffolded_loads[position]) / (len(choices) + 1) <= max_load
+            ):
+                # Scaffolding reduces difficulty but takes 2 more minutes
+                choices.append((position, True))
+                load_sum += scaffolded_loads[position]
+                current_time += estimated_time + 2
+        
+        return choices
+    
+    def _select_knapsack(
+        self,
+        bank: ContentBank,
+        ranked: np.ndarray,
+        scores: np.ndarray,
+        loads: np.ndarray,
+        scaffolded_loads: np.ndarray,
+        session_time_remaining: int
+    ) -> Optional[List[tuple]]:
+        """
+        Set of candidates with the highest total ZPD score such that
+        total time <= session_time_remaining and average load <= max_load
+        
+        The load ceiling is linear: sum(load - max_load) <= 0. Each item is
+        skipped, taken plain or taken scaffolded, so this is a multiple-choice
+        knapsack over (minutes, score units) whose table keeps the
+        smallest load excess per cell. Dominated items are dropped before
+        the table is built.
+        
+        Returns: (position in ranked, scaffolded) pairs in rank order, or
+        None if the table would exceed knapsack_max_cells
+        """
+        budget = int(session_time_remaining)
+        max_load = self.config.max_load
+        times = bank.estimated_time[ranked].astype(np.int64)
+        values = np.rint(scores * self.knapsack_value_scale).astype(np.int64)
+        can_scaffold = bank.scaffolding_available[ranked]
+        
+        # An item beaten on both score and load by budget // time others of
+        # the same duration and scaffolding can never be in an optimal set
+        time_list, value_list = times.tolist(), values.tolist()
+        load_list, scaffold_list = loads.tolist(), can_scaffold.tolist()
+        candidates = []
+        dominating = {}
+        for position in sorted(
+            np.flatnonzero(times <= budget).tolist(), key=lambda p: (-value_list[p], load_list[p])
+        ):
+            heap = dominating.setdefault((time_list[position], scaffold_list[position]), [])
+            limit = budget // max(1, time_list[position])
+            if len(heap) >= limit and -heap[0] <= load_list[position]:
+                continue
+            candidates.append(position)
+            heapq.heappush(heap, -load_list[position])
+            if len(heap) > limit:
+                heapq.heappop(heap)
+        if not candidates:
+            return []
+        candidates = np.sort(np.array(candidates))
+        
+        # Score units reachable within the budget
+        max_picks = budget // max(1, int(times[candidates].min()))
+        value_cap = int(np.sort(values[candidates])[::-1][:max_picks].sum())
+        if len(candidates) * (budget + 1) * (value_cap + 1) > self.knapsack_max_cells:
+            return None
+        
+        # best[t, v]: smallest sum(load - max_load) using t minutes for v score units
+        best = np.full((budget + 1, value_cap + 1), np.inf)
+        best[0, 0] = 0.0
+        taken = np.zeros((len(candidates), budget + 1, value_cap + 1), dtype=np.int8)
+        for row, position in enumerate(candidates):
+            options = [(1, int(times[position]), loads[position])]
+            if can_scaffold[position]:
+                options.append((2, int(times[position]) + 2, scaffolded_loads[position]))
+            previous = best.copy()
+            for option, minutes, load in options:
+                value = int(values[position])
+                if minutes > budget or value > value_cap:
+                    continue
+                projected = previous[:budget + 1 - minutes, :value_cap + 1 - value] + (load - max_load)
+                better = projected < best[minutes:, value:]
+                np.copyto(best[minutes:, value:], projected, where=better)
+                np.copyto(taken[row, minutes:, value:], option, where=better)
         
+        # Highest score with the load ceiling met, then the lightest such session
+        feasible = best <= 1e-9
+        if not feasible.any():
+            return []
+        value = int(np.flatnonzero(feasible.any(axis=0)).max())
+        minutes = int(np.argmin(np.where(feasible[:, value], best[:, value], np.inf)))
+        
+        choices = []
+        for row in range(len(candidates) - 1, -1, -1):
+            option = taken[row, minutes, value]
+            if option:
+                position = int(candidates[row])
+                choices.append((position, bool(option == 2)))
+                minutes -= int(times[position]) + (2 if option == 2 else 0)
+                value -= int(values[position])
+        return sorted(choices)
+    
+    def _selected_views(
+        self,
+        bank: ContentBank,
+        ranked: np.ndarray,
+        choices: List[tuple]
+    ) -> List[ContentItem]:
+        """ContentItem views of the chosen candidates (scaffolded variants derived)"""
+        selected_items = []
+        for position, scaffolded in choices:
+            item = bank.item(int(ranked[position]))
+            if scaffolded:
+                item = ContentItem(
+                    item_id=item.item_id + "_scaffolded",
+                    concept_id=item.concept_id,
+                    difficulty=item.difficulty * 0.7,  # Reduce difficulty
+                    weight=item.weight,
+                    estimated_time=item.estimated_time + 2,  # Scaffolding takes time
+                    scaffolding_available=False
+                )
+            selected_items.append(item)
         return selected_items
     
     def _filter_by_mastery(
@@ -172,37 +490,49 @@ class AdaptivePracticeEngine:
         content: List[ContentItem],
         student_mastery: Dict[str, float]
     ) -> List[ContentItem]:
+        """
+        BR3: Efficiency Optimization (list form of _mastery_filter)
+        """
+        bank = ContentBank.from_items(content)
+        return bank.items(self._mastery_filter(bank, student_mastery))
+    
+    def _mastery_filter(
+        self,
+        bank: ContentBank,
+        student_mastery: Dict[str, float]
+    ) -> np.ndarray:
         """
         BR3: Efficiency Optimization
         
         From Paper 4.pdf Results:
         - IF mastery > 85%: Skip (already mastered)
-        - ELIF mastery > 60%: Light review (1-2 questions)
-        - ELSE: Focused practice (5-10 questions)
+        - ELIF mastery > 60%: Light review (2 questions per concept)
+        - ELSE: Focused practice (up to 10 questions per concept)
+        
+        Returns: Indices of kept items, in bank order (per-concept caps keep
+        the first items of each concept)
         """
-        filtered = []
-        concept_counts = {}  # Track how many items per concept
+        mastery = bank.concept_vector(student_mastery, 30.0)[bank.concept]
+        candidates = np.flatnonzero(mastery < 85.0)
+        if not len(candidates):
+            return candidates
+        cap = np.where(mastery[candidates] >= 60.0, 2, 10)
         
-        for item in content:
-            mastery = student_mastery.get(item.concept_id, 30.0)
-            
-            if mastery >= 85.0:
-                # SKIP - Already mastered
-                continue
-            elif mastery >= 60.0:
-                # LIGHT REVIEW - Limit to 2 questions per concept
-                count = concept_counts.get(item.concept_id, 0)
-                if count < 2:
-                    filtered.append(item)
-                    concept_counts[item.concept_id] = count + 1
-            else:
-                # FOCUSED PRACTICE - Allow up to 10 questions
-                count = concept_counts.get(item.concept_id, 0)
-                if count < 10:
-                    filtered.append(item)
-                    concept_counts[item.concept_id] = count + 1
-        
-        return filtered
+        # Position of each candidate among its concept's candidates
+        concepts = bank.concept[candidates]
+        if len(bank.concepts) <= np.iinfo(np.int16).max:
+            # Stable argsort of 16-bit keys is a radix sort
+            concepts = concepts.astype(np.int16)
+        order = np.argsort(concepts, kind='stable')
+        sorted_concepts = concepts[order]
+        positions = np.arange(len(order))
+        group_start = np.maximum.accumulate(
+            np.where(np.r_[True, sorted_concepts[1:] != sorted_concepts[:-1]], positions, 0)
+        )
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = positions - group_start
+        
+        return candidates[rank < cap]
     
     def _prioritize_by_zpd(
         self,
@@ -210,6 +540,20 @@ class AdaptivePracticeEngine:
         student_mastery: Dict[str, float],
         learning_velocity: Dict[str, float]
     ) -> List[ContentItem]:
+        """
+        BR2: Zone of Proximal Development Targeting (list form of _zpd_scores)
+        """
+        bank = ContentBank.from_items(content)
+        scores = self._zpd_scores(bank, student_mastery, learning_velocity)
+        return bank.items(np.argsort(-scores, kind='stable'))
+    
+    def _zpd_scores(
+        self,
+        bank: ContentBank,
+        student_mastery: Dict[str, float],
+        learning_velocity: Dict[str, float],
+        indices: Optional[np.ndarray] = None
+    ) -> np.ndarray:
         """
         BR2: Zone of Proximal Development Targeting
         
@@ -217,48 +561,131 @@ class AdaptivePracticeEngine:
         1. Slightly above current competency (challenge)
         2. Not too far above (frustration)
         3. Aligned with learning trajectory
+        
+        Returns: ZPD score of the items at indices (default: every item)
         """
-        scored_content = []
+        indices = np.arange(len(bank)) if indices is None else indices
+        concepts = bank.concept[indices]
+        mastery = bank.concept_vector(student_mastery, 30.0)[concepts] / 100.0
+        velocity = bank.concept_vector(learning_velocity, 0.0)[concepts]
         
-        for item in content:
-            mastery = student_mastery.get(item.concept_id, 30.0) / 100.0
-            velocity = learning_velocity.get(item.concept_id, 0.0)
-            
-            # Calculate ZPD score
-            # Ideal: difficulty slightly above mastery
-            zpd_distance = item.difficulty - mastery
-            
-            if 0.1 <= zpd_distance <= 0.3:
-                # Sweet spot: challenging but achievable
-                zpd_score = 1.0
-            elif 0.0 <= zpd_distance < 0.1:
-                # Too easy: still beneficial but lower priority
-                zpd_score = 0.6
-            elif 0.3 < zpd_distance <= 0.5:
-                # Challenging: needs scaffolding
-                zpd_score = 0.7 if item.scaffolding_available else 0.3
-            else:
-                # Too difficult or too easy
-                zpd_score = 0.2
+        # Ideal: difficulty slightly above mastery
+        zpd_distance = bank.difficulty[indices] - mastery
+        zpd_score = np.select(
+            [
+                (zpd_distance >= 0.1) & (zpd_distance <= 0.3),  # Sweet spot
+                (zpd_distance >= 0.0) & (zpd_distance < 0.1),   # Too easy: lower priority
+                (zpd_distance > 0.3) & (zpd_distance <= 0.5)    # Challenging: needs scaffolding
+            ],
+            [1.0, 0.6, np.where(bank.scaffolding_available[indices], 0.7, 0.3)],
+            default=0.2  # Too difficult or too easy
+        )
+        
+        # Boost score for concepts with positive learning velocity
+        zpd_score = np.where(velocity > 0, zpd_score * 1.2, zpd_score)
+        
+        # Deprioritize items with any prerequisite below 60% (unknown = 0)
+        unmet = bank.concept_vector(student_mastery, 0.0) < 60.0
+        has_unmet = (bank.prerequisites[indices] @ unmet.astype(np.float64)) > 0
+        return np.where(has_unmet, zpd_score * 0.5, zpd_score)
+    
+    def _rank_content(
+        self,
+        bank: ContentBank,
+        student_mastery: Dict[str, float],
+        learning_velocity: Dict[str, float]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(indices, ZPD scores) of the items passing the mastery filter, best first"""
+        kept = self._mastery_filter(bank, student_mastery)
+        scores = self._zpd_scores(bank, student_mastery, learning_velocity, kept)
+        order = np.argsort(-scores, kind='stable')
+        return kept[order], scores[order]
+    
+    def _rank_content_batch(
+        self,
+        bank: ContentBank,
+        masteries: Sequence[Dict[str, float]],
+        velocities: Sequence[Dict[str, float]],
+        max_cells: int = 4_000_000
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        _rank_content for many students over one bank
+        
+        The mastery filter runs on a students x items matrix (max_cells per
+        chunk of students), restricted to the items that can pass the
+        per-concept caps, and ZPD scores are computed for the kept cells
+        only, then sorted per student in one lexsort. Results are identical
+        to calling _rank_content per student.
+        """
+        n_items, n_concepts = len(bank), len(bank.concepts)
+        if not n_items:
+            return [(np.zeros(0, dtype=np.int64), np.zeros(0))] * len(masteries)
+        
+        # Mastery is per concept, so every item of a concept is a candidate
+        # or none is: the per-concept caps keep the items whose position
+        # within their concept is below 2 / 10, and only the first 10 items
+        # of each concept can ever be kept
+        order = np.argsort(bank.concept, kind='stable')
+        sorted_concepts = bank.concept[order]
+        positions = np.arange(n_items)
+        position_in_concept = np.empty(n_items, dtype=np.int64)
+        position_in_concept[order] = positions - np.maximum.accumulate(
+            np.where(np.r_[True, sorted_concepts[1:] != sorted_concepts[:-1]], positions, 0)
+        )
+        head = np.flatnonzero(position_in_concept < 10)
+        head_concepts = bank.concept[head]
+        head_prerequisites = bank.prerequisites[head]
+        
+        ranked = []
+        chunk = max(1, max_cells // max(1, len(head)))
+        for begin in range(0, len(masteries), chunk):
+            students = range(begin, min(begin + chunk, len(masteries)))
+            mastery = np.full((len(students), n_concepts), 30.0)
+            known = np.zeros((len(students), n_concepts), dtype=bool)
+            velocity = np.zeros((len(students), n_concepts))
+            for row, student in enumerate(students):
+                for concept_id, value in masteries[student].items():
+                    slot = bank.concept_index.get(concept_id)
+                    if slot is not None:
+                        mastery[row, slot] = value
+                        known[row, slot] = True
+                for concept_id, value in velocities[student].items():
+                    slot = bank.concept_index.get(concept_id)
+                    if slot is not None:
+                        velocity[row, slot] = value
             
-            # Boost score for concepts with positive learning velocity
-            if velocity > 0:
-                zpd_score *= 1.2
+            # BR3 mastery filter: below 85, first 2 (>= 60) or 10 per concept
+            head_mastery = mastery[:, head_concepts]
+            keep = (head_mastery < 85.0) & (
+                position_in_concept[head] < np.where(head_mastery >= 60.0, 2, 10)
+            )
+            rows, cols = np.nonzero(keep)
+            items = head[cols]
             
-            # Prioritize prerequisite completion
-            prereq_mastery = [
-                student_mastery.get(prereq, 0.0) 
-                for prereq in item.prerequisites
-            ]
-            if prereq_mastery and min(prereq_mastery) < 60.0:
-                zpd_score *= 0.5  # Deprioritize if prerequisites not met
+            # BR2 ZPD scores of the kept cells (same expression as _zpd_scores)
+            zpd_distance = bank.difficulty[items] - head_mastery[rows, cols] / 100.0
+            zpd_score = np.select(
+                [
+                    (zpd_distance >= 0.1) & (zpd_distance <= 0.3),
+                    (zpd_distance >= 0.0) & (zpd_distance < 0.1),
+                    (zpd_distance > 0.3) & (zpd_distance <= 0.5)
+                ],
+                [1.0, 0.6, np.where(bank.scaffolding_available[items], 0.7, 0.3)],
+                default=0.2
+            )
+            zpd_score = np.where(velocity[rows, bank.concept[items]] > 0, zpd_score * 1.2, zpd_score)
+            unmet = (~known | (mastery < 60.0)).astype(np.float64)
+            has_unmet = np.asarray(head_prerequisites @ unmet.T)[cols, rows] > 0
+            zpd_score = np.where(has_unmet, zpd_score * 0.5, zpd_score)
             
-            scored_content.append((zpd_score, item))
-        
-        # Sort by ZPD score (highest first)
-        scored_content.sort(key=lambda x: x[0], reverse=True)
-        
-        return [item for score, item in scored_content]
+            # Best first within each student, ties in bank order
+            by_score = np.lexsort((-zpd_score, rows))
+            bounds = np.cumsum(np.bincount(rows, minlength=len(students)))[:-1]
+            ranked.extend(zip(
+                np.split(items[by_score], bounds),
+                np.split(zpd_score[by_score], bounds)
+            ))
+        return ranked
     
     def adjust_difficulty(
         self,
@@ -294,7 +721,7 @@ class AdaptivePracticeEngine:
         student_id: str,
         student_mastery: Dict[str, float],
         learning_velocity: Dict[str, float],
-        available_content: List[ContentItem],
+        available_content: Union[ContentBank, List[ContentItem]],
         session_duration: int = 30
     ) -> Dict:
         """
@@ -308,7 +735,50 @@ class AdaptivePracticeEngine:
             learning_velocity,
             session_duration
         )
+        return self._session_plan(student_id, selected_content, student_mastery)
+    
+    def generate_practice_sessions(
+        self,
+        students: Dict[str, Tuple[Dict[str, float], Dict[str, float]]],
+        available_content: Union[ContentBank, List[ContentItem]],
+        session_duration: int = 30
+    ) -> Dict[str, Dict]:
+        """
+        Practice sessions for a group of students (e.g. a classroom) over
+        one shared content pool
+        
+        Args:
+            students: {student_id: (student_mastery, learning_velocity)}
+        
+        Returns: {student_id: session plan as from generate_practice_session}
+        """
+        bank = (
+            available_content if isinstance(available_content, ContentBank)
+            else ContentBank.from_items(available_content)
+        )
+        student_ids = list(students)
+        ranked = self._rank_content_batch(
+            bank,
+            [students[s][0] for s in student_ids],
+            [students[s][1] for s in student_ids]
+        )
         
+        sessions = {}
+        for student_id, (candidates, scores) in zip(student_ids, ranked):
+            student_mastery = students[student_id][0]
+            selected_content = self._select_ranked(
+                bank, candidates, scores, student_mastery, session_duration
+            )
+            sessions[student_id] = self._session_plan(student_id, selected_content, student_mastery)
+        return sessions
+    
+    def _session_plan(
+        self,
+        student_id: str,
+        selected_content: List[ContentItem],
+        student_mastery: Dict[str, float]
+    ) -> Dict:
+        """BR2-compliant session plan for selected content"""
         cognitive_load = self.calculate_cognitive_load(
             selected_content,
             student_mastery
@@ -0,0 +1,228 @@
+"""
+AMEP Micro-Batching Inference Server
+Cross-student batched DKT/DKVMN prediction for quiz bursts
+
+Solves: BR1 (Personalized Mastery) at class scale on CPU-only workers
+
+During a class-wide quiz hundreds of students submit within seconds and
+every submission asks a neural engine for one batch-size-1 forward pass.
+BatchInferenceServer queues those requests, waits at most max_wait_ms for
+more to arrive (or until max_batch_size is reached), runs one padded
+forward pass through the engine's predict_mastery_batch, and hands each
+caller its own result. Engines with stateful batch methods (e.g.
+DKTEngine.predict_mastery_incremental_batch) are served the same way by
+naming that method and queueing its request tuples.
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+# ============================================================================
+# MICRO-BATCHING SERVER
+# ============================================================================
+
+class BatchInferenceServer:
+    """
+    Collects concurrent predict requests into single forward passes
+
+    Works with any engine exposing predict_mastery_batch(requests), where
+    requests is a list of (interactions, target_concept) pairs - both
+    DKTEngine and DKVMNEngine do. Any other method taking a list of request
+    tuples can be served by passing its name as method.
+
+    Usage:
+        server = BatchInferenceServer(dkt_engine, max_batch_size=64, max_wait_ms=10)
+        result = server.predict(interactions, target_concept=3)
+
+        server = BatchInferenceServer(dkt_engine, method='predict_mastery_incremental_batch')
+        result = server.predict_request((student_id, new_interactions, 3, history))
+    """
+
+    def __init__(
+        self,
+        engine,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 10.0,
+        name: str = 'batch-inference',
+        method: str = 'predict_mastery_batch'
+    ):
+        """
+        Args:
+            engine: Neural engine with predict_mastery_batch
+            max_batch_size: Largest batch sent to one forward pass
+            max_wait_ms: Longest time the first queued request waits for company
+            name: Worker thread name
+            method: Engine method called with each batch of request tuples
+        """
+        self.engine = engine
+        self.method = method
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._running = False
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'batches': 0,
+            'largest_batch': 0,
+            'errors': 0,
+            'inference_seconds': 0.0,
+            'queue_wait_seconds': 0.0
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the batching worker thread (idempotent)"""
+        with self._start_lock:
+            if self._running:
+                return
+            self._running = True
+            self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._worker.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the worker after draining already queued requests"""
+        with self._start_lock:
+            if not self._running:
+                return
+            self._running = False
+            self._queue.put(None)
+        self._worker.join(timeout)
+
+    # ------------------------------------------------------------------
+    # Client API
+    # ------------------------------------------------------------------
+
+    def submit(self, interactions: List[Dict], target_concept: Optional[int] = None) -> Future:
+        """Queue a prediction and return a Future for its result"""
+        return self.submit_request((interactions, target_concept))
+
+    def submit_request(self, request: Tuple) -> Future:
+        """Queue one request tuple in the shape the engine method expects"""
+        self.start()
+        future = Future()
+        self._queue.put((request, future, time.perf_counter()))
+        return future
+
+    def predict(
+        self,
+        interactions: List[Dict],
+        target_concept: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """Blocking prediction; same result shape as engine.predict_mastery"""
+        return self.submit(interactions, target_concept).result(timeout)
+
+    def predict_request(self, request: Tuple, timeout: Optional[float] = None) -> Dict:
+        """Blocking form of submit_request"""
+        return self.submit_request(request).result(timeout)
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _collect_batch(self, first) -> List:
+        """Gather requests until the batch is full or the window closes"""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Stop sentinel - put it back for the main loop
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                if self._running:
+                    continue
+                self._drain()
+                return
+
+            batch = self._collect_batch(first)
+            self._process(batch)
+
+    def _drain(self):
+        """Serve whatever is still queued after stop() was called"""
+        pending = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                pending.append(item)
+
+        for i in range(0, len(pending), self.max_batch_size):
+            self._process(pending[i:i + self.max_batch_size])
+
+    def _process(self, batch: List):
+        started = time.perf_counter()
+        requests = [request for request, _, _ in batch]
+
+        try:
+            results = getattr(self.engine, self.method)(requests)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            with self._stats_lock:
+                self._stats['errors'] += 1
+            return
+
+        finished = time.perf_counter()
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+        with self._stats_lock:
+            self._stats['requests'] += len(batch)
+            self._stats['batches'] += 1
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+            self._stats['inference_seconds'] += finished - started
+            self._stats['queue_wait_seconds'] += sum(started - queued for _, _, queued in batch)
+
+    # ------------------------------------------------------------------
+    # Monitoring
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict:
+        """Throughput counters for dashboards/logging"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        requests = stats['requests']
+        batches = stats['batches']
+        stats['avg_batch_size'] = round(requests / batches, 2) if batches else 0.0
+        stats['throughput_per_second'] = (
+            round(requests / stats['inference_seconds'], 1) if stats['inference_seconds'] else 0.0
+        )
+        stats['avg_queue_wait_ms'] = (
+            round(stats['queue_wait_seconds'] / requests * 1000, 2) if requests else 0.0
+        )
+        stats['pending'] = self._queue.qsize()
+        stats['max_batch_size'] = self.max_batch_size
+        stats['max_wait_ms'] = self.max_wait * 1000
+        stats['running'] = self._running
+        return stats
@@ -0,0 +1,282 @@
+"""
+AMEP BKT Parameter Fitting
+Per-concept expectation-maximization (Baum-Welch) for BKT parameters
+
+Solves: BR1 (Continuous Mastery Scoring) - replaces the hard-coded
+BKTParameters with values learned from each concept's response data
+
+BKT is a two-state HMM (unknown / known) with no forgetting:
+
+    P(L0) = prior,  P(unknown -> known) = P(T),  P(known -> known) = 1
+    P(correct | unknown) = P(G),  P(incorrect | known) = P(S)
+
+Every student's responses on a concept form one observation sequence.
+Sequences are sorted longest first and laid out time-major, so step t of
+the forward-backward pass touches one contiguous slice holding only the
+sequences still active at t. Each step is a NumPy operation over all of
+those sequences, and memory stays proportional to the number of responses
+(no padding).
+"""
+
+import numpy as np
+from dataclasses import asdict
+from typing import Dict, Optional, Tuple
+
+from ai_engine.knowledge_tracing import BKTParameters
+
+# Bounds keep EM away from degenerate solutions (e.g. guess > 1 - slip,
+# where "known" would predict fewer correct answers than "unknown")
+PARAM_BOUNDS = {
+    'p_l0': (0.01, 0.99),
+    'p_t': (0.001, 0.5),
+    'p_g': (0.01, 0.4),
+    'p_s': (0.01, 0.4)
+}
+
+# ============================================================================
+# SEQUENCE PACKING
+# ============================================================================
+
+class PackedSequences:
+    """
+    Observation sequences of one concept in time-major, longest-first layout
+
+    obs[offsets[t]:offsets[t + 1]] holds step t of the first n_active[t]
+    sequences.
+    """
+
+    def __init__(self, sequence_idx: np.ndarray, correct: np.ndarray):
+        """
+        Args:
+            sequence_idx: Sequence (student) code per response, chronological
+                within each sequence
+            correct: Boolean observation per response
+        """
+        sequence_idx = np.asarray(sequence_idx, dtype=np.int64)
+        correct = np.asarray(correct, dtype=bool)
+
+        _, sequence_idx = np.unique(sequence_idx, return_inverse=True)
+        sequence_idx = sequence_idx.reshape(-1)
+        lengths = np.bincount(sequence_idx) if len(sequence_idx) else np.empty(0, dtype=np.int64)
+
+        # Row of each sequence when sorted longest first
+        order = np.argsort(-lengths, kind='stable')
+        row = np.empty(len(lengths), dtype=np.int64)
+        row[order] = np.arange(len(lengths))
+        self.lengths = lengths[order]
+
+        # Position of each response within its sequence
+        by_sequence = np.argsort(sequence_idx, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(lengths) else lengths
+        step = np.empty(len(sequence_idx), dtype=np.int64)
+        step[by_sequence] = np.arange(len(sequence_idx)) - np.repeat(starts, lengths)
+
+        max_length = int(self.lengths[0]) if len(self.lengths) else 0
+        ascending = self.lengths[::-1]
+        self.n_active = len(ascending) - np.searchsorted(ascending, np.arange(max_length), side='right')
+        self.offsets = np.concatenate(([0], np.cumsum(self.n_active))).astype(np.int64)
+
+        self.obs = np.empty(len(sequence_idx), dtype=bool)
+        self.obs[self.offsets[step] + row[sequence_idx]] = correct
+
+    @property
+    def num_sequences(self) -> int:
+        return len(self.lengths)
+
+    @property
+    def num_responses(self) -> int:
+        return len(self.obs)
+
+    @property
+    def max_length(self) -> int:
+        return len(self.n_active)
+
+    def step(self, t: int, count: Optional[int] = None) -> slice:
+        """Slice of step t (optionally only its first `count` sequences)"""
+        start = self.offsets[t]
+        end = self.offsets[t + 1] if count is None else start + count
+        return slice(start, end)
+
+
+# ============================================================================
+# EXPECTATION-MAXIMIZATION
+# ============================================================================
+
+def _emissions(obs: np.ndarray, params: BKTParameters) -> Tuple[np.ndarray, np.ndarray]:
+    """P(obs | unknown), P(obs | known)"""
+    unknown = np.where(obs, params.p_g, 1.0 - params.p_g)
+    known = np.where(obs, 1.0 - params.p_s, params.p_s)
+    return unknown, known
+
+
+def expectation_step(packed: PackedSequences, params: BKTParameters) -> Dict[str, float]:
+    """
+    Scaled forward-backward pass over every sequence at once
+
+    Returns:
+        Expected sufficient statistics plus the data log-likelihood
+    """
+    total = packed.num_responses
+    p_t = params.p_t
+
+    emit_u, emit_k = _emissions(packed.obs, params)
+
+    # Forward: filtered P(state_t | obs_0..t), with per-step scale factors
+    alpha_u = np.empty(total)
+    alpha_k = np.empty(total)
+    scale = np.empty(total)
+
+    for t in range(packed.max_length):
+        cur = packed.step(t)
+        n = packed.n_active[t]
+        if t == 0:
+            prior_u = np.full(n, 1.0 - params.p_l0)
+            prior_k = np.full(n, params.p_l0)
+        else:
+            prev = packed.step(t - 1, n)
+            prior_u = alpha_u[prev] * (1.0 - p_t)
+            prior_k = alpha_k[prev] + alpha_u[prev] * p_t
+        joint_u = prior_u * emit_u[cur]
+        joint_k = prior_k * emit_k[cur]
+        norm = joint_u + joint_k
+        alpha_u[cur] = joint_u / norm
+        alpha_k[cur] = joint_k / norm
+        scale[cur] = norm
+
+    # Backward: sequences ending at t keep beta = 1
+    beta_u = np.ones(total)
+    beta_k = np.ones(total)
+    learn_events = 0.0
+    learn_opportunities = 0.0
+
+    for t in range(packed.max_length - 2, -1, -1):
+        m = packed.n_active[t + 1]
+        cur = packed.step(t, m)
+        nxt = packed.step(t + 1)
+        next_k = emit_k[nxt] * beta_k[nxt] / scale[nxt]
+        next_u = emit_u[nxt] * beta_u[nxt] / scale[nxt]
+        beta_u[cur] = (1.0 - p_t) * next_u + p_t * next_k
+        beta_k[cur] = next_k
+
+        # xi(unknown -> known) over transitions t -> t+1
+        learn_events += float(np.sum(alpha_u[cur] * p_t * next_k))
+        learn_opportunities += float(np.sum(alpha_u[cur] * beta_u[cur]))
+
+    gamma_k = alpha_k * beta_k
+    gamma_u = alpha_u * beta_u
+    first = packed.step(0)
+
+    return {
+        'initial_known': float(gamma_k[first].sum()),
+        'num_sequences': float(packed.num_sequences),
+        'learn_events': learn_events,
+        'learn_opportunities': learn_opportunities,
+        'guess_events': float(gamma_u[packed.obs].sum()),
+        'unknown_total': float(gamma_u.sum()),
+        'slip_events': float(gamma_k[~packed.obs].sum()),
+        'known_total': float(gamma_k.sum()),
+        'log_likelihood': float(np.log(scale).sum())
+    }
+
+
+def maximization_step(stats: Dict[str, float], previous: BKTParameters) -> BKTParameters:
+    """Re-estimate parameters from expected counts (keeping old values where undefined)"""
+
+    def ratio(numerator, denominator, fallback):
+        return numerator / denominator if denominator > 1e-12 else fallback
+
+    values = {
+        'p_l0': ratio(stats['initial_known'], stats['num_sequences'], previous.p_l0),
+        'p_t': ratio(stats['learn_events'], stats['learn_opportunities'], previous.p_t),
+        'p_g': ratio(stats['guess_events'], stats['unknown_total'], previous.p_g),
+        'p_s': ratio(stats['slip_events'], stats['known_total'], previous.p_s)
+    }
+    return BKTParameters(**{
+        name: float(np.clip(value, *PARAM_BOUNDS[name]))
+        for name, value in values.items()
+    })
+
+
+def fit_bkt(
+    packed: PackedSequences,
+    initial: Optional[BKTParameters] = None,
+    max_iterations: int = 100,
+    tolerance: float = 1e-5
+) -> Dict:
+    """
+    Fit BKT parameters for one concept by EM
+
+    Args:
+        packed: The concept's observation sequences
+        initial: Starting parameters (previous fit for incremental re-fits)
+        max_iterations: EM iteration cap
+        tolerance: Stop when the log-likelihood gain per response falls below this
+
+    Returns:
+        Dict with fitted 'params' (BKTParameters), 'log_likelihood',
+        'iterations' and 'converged'
+    """
+    params = initial or BKTParameters()
+    params = BKTParameters(**{
+        name: float(np.clip(value, *PARAM_BOUNDS[name]))
+        for name, value in asdict(params).items()
+    })
+
+    if packed.num_responses == 0:
+        return {'params': params, 'log_likelihood': 0.0, 'iterations': 0, 'converged': True}
+
+    previous_ll = -np.inf
+    log_likelihood = previous_ll
+    converged = False
+    iterations = 0
+
+    for iterations in range(1, max_iterations + 1):
+        stats = expectation_step(packed, params)
+        log_likelihood = stats['log_likelihood']
+        if (log_likelihood - previous_ll) / packed.num_responses < tolerance:
+            converged = True
+            break
+        previous_ll = log_likelihood
+        params = maximization_step(stats, params)
+
+    return {
+        'params': params,
+        'log_likelihood': log_likelihood,
+        'iterations': iterations,
+        'converged': converged
+    }
+
+
+def fit_concept(
+    concept_id: str,
+    sequence_idx: np.ndarray,
+    correct: np.ndarray,
+    initial: Optional[Dict] = None,
+    max_iterations: int = 100,
+    tolerance: float = 1e-5
+) -> Dict:
+    """
+    Process-pool entry point: fit one concept and return a plain document
+
+    Args:
+        concept_id: Concept being fitted
+        sequence_idx: Student code per response (chronological per student)
+        correct: Boolean observation per response
+        initial: Previous parameters as a dict with p_l0/p_t/p_g/p_s
+
+    Returns:
+        Dict with concept_id, fitted parameters and fit diagnostics
+    """
+    packed = PackedSequences(sequence_idx, correct)
+    start = BKTParameters(**{k: initial[k] for k in ('p_l0', 'p_t', 'p_g', 'p_s')}) if initial else None
+    result = fit_bkt(packed, start, max_iterations=max_iterations, tolerance=tolerance)
+
+    return dict(
+        asdict(result['params']),
+        concept_id=concept_id,
+        num_responses=packed.num_responses,
+        num_students=packed.num_sequences,
+        log_likelihood=result['log_likelihood'],
+        iterations=result['iterations'],
+        converged=result['converged']
+    )
@@ -0,0 +1,271 @@
+"""
+AMEP Vectorized Bayesian Knowledge Tracing
+NumPy BKT over packed (student, concept, correct) event arrays
+
+Solves: BR1 (Continuous Mastery Scoring) for bulk recomputes and backfills
+
+BKTEngine.update_mastery steps through one response at a time in Python.
+This engine applies the same update (Paper 2105_15106v4.pdf):
+
+    P(L|correct)   = P(L)(1 - P(S)) / [P(L)(1 - P(S)) + (1 - P(L))P(G)]
+    P(L|incorrect) = P(L)P(S) / [P(L)P(S) + (1 - P(L))(1 - P(G))]
+    P(L_next)      = P(L|obs) + (1 - P(L|obs))P(T)
+
+to every (student, concept) pair at once. Events are ranked within their
+pair, and round k updates the k-th event of every pair in one vectorized
+pass, so the number of Python iterations equals the longest single
+history rather than the total number of responses.
+"""
+
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ai_engine.knowledge_tracing import BKTParameters
+
+# ============================================================================
+# PER-CONCEPT PARAMETER VECTORS
+# ============================================================================
+
+class BKTParameterTable:
+    """
+    Per-concept BKT parameters stored as aligned NumPy vectors
+
+    Concepts without fitted values fall back to the defaults, so a table
+    can be built incrementally as concepts receive enough data.
+    """
+
+    def __init__(
+        self,
+        concept_ids: Optional[List[str]] = None,
+        defaults: BKTParameters = BKTParameters()
+    ):
+        self.defaults = defaults
+        self.concept_index: Dict[str, int] = {}
+        self.p_l0 = np.empty(0)
+        self.p_t = np.empty(0)
+        self.p_g = np.empty(0)
+        self.p_s = np.empty(0)
+        for concept_id in concept_ids or []:
+            self.index_of(concept_id)
+
+    def __len__(self) -> int:
+        return len(self.concept_index)
+
+    def index_of(self, concept_id: str) -> int:
+        """Return the concept's column, adding it with default parameters if new"""
+        index = self.concept_index.get(concept_id)
+        if index is None:
+            index = len(self.concept_index)
+            self.concept_index[concept_id] = index
+            self.p_l0 = np.append(self.p_l0, self.defaults.p_l0)
+            self.p_t = np.append(self.p_t, self.defaults.p_t)
+            self.p_g = np.append(self.p_g, self.defaults.p_g)
+            self.p_s = np.append(self.p_s, self.defaults.p_s)
+        return index
+
+    def encode(self, concept_ids: Iterable[str]) -> np.ndarray:
+        """Map concept ID strings to integer columns"""
+        return np.fromiter((self.index_of(c) for c in concept_ids), dtype=np.int64)
+
+    def set_params(self, concept_id: str, params: BKTParameters):
+        """Overwrite the parameters of one concept"""
+        index = self.index_of(concept_id)
+        self.p_l0[index] = params.p_l0
+        self.p_t[index] = params.p_t
+        self.p_g[index] = params.p_g
+        self.p_s[index] = params.p_s
+
+    def get_params(self, concept_id: str) -> BKTParameters:
+        """Parameters of one concept (defaults if unknown)"""
+        index = self.concept_index.get(concept_id)
+        if index is None:
+            return self.defaults
+        return BKTParameters(
+            p_l0=float(self.p_l0[index]),
+            p_t=float(self.p_t[index]),
+            p_g=float(self.p_g[index]),
+            p_s=float(self.p_s[index])
+        )
+
+
+# ============================================================================
+# VECTORIZED ENGINE
+# ============================================================================
+
+@dataclass
+class BKTScanResult:
+    """Output of VectorizedBKTEngine.scan"""
+    pair_students: np.ndarray     # student code of each (student, concept) pair
+    pair_concepts: np.ndarray     # concept column of each pair
+    mastery: np.ndarray           # final P(L) per pair (0-1)
+    counts: np.ndarray            # events folded into each pair
+    trajectory: Optional[np.ndarray] = None  # P(L) after each input event, input order
+
+    @property
+    def mastery_scores(self) -> np.ndarray:
+        """Final mastery on the 0-100 scale used by STUDENT_CONCEPT_MASTERY"""
+        return np.clip(self.mastery * 100.0, 0.0, 100.0)
+
+
+class VectorizedBKTEngine:
+    """
+    BKT update applied to whole arrays of posteriors at once
+
+    Usage:
+        engine = VectorizedBKTEngine(params)
+        result = engine.scan(student_codes, concept_codes, correct)
+    """
+
+    def __init__(self, params: Optional[BKTParameterTable] = None):
+        self.params = params if params is not None else BKTParameterTable()
+
+    def step(
+        self,
+        p_l: np.ndarray,
+        correct: np.ndarray,
+        concept_idx: np.ndarray
+    ) -> np.ndarray:
+        """
+        One BKT update for aligned arrays of posteriors and observations
+
+        Args:
+            p_l: Current P(L) per event (0-1)
+            correct: Boolean observation per event
+            concept_idx: Concept column per event (selects parameters)
+
+        Returns:
+            Updated P(L) per event
+        """
+        p_t = self.params.p_t[concept_idx]
+        p_g = self.params.p_g[concept_idx]
+        p_s = self.params.p_s[concept_idx]
+
+        known_obs = np.where(correct, 1.0 - p_s, p_s)
+        unknown_obs = np.where(correct, p_g, 1.0 - p_g)
+
+        numerator = p_l * known_obs
+        denominator = numerator + (1.0 - p_l) * unknown_obs
+        safe = denominator > 0
+        conditional = np.where(safe, numerator / np.where(safe, denominator, 1.0), p_l)
+
+        return conditional + (1.0 - conditional) * p_t
+
+    def scan(
+        self,
+        student_idx: np.ndarray,
+        concept_idx: np.ndarray,
+        correct: np.ndarray,
+        initial: Optional[Dict[Tuple[int, int], float]] = None,
+        return_trajectory: bool = False
+    ) -> BKTScanResult:
+        """
+        Fold complete response histories into posteriors for every pair
+
+        Events must be in chronological order within each (student,
+        concept) pair; pairs may be interleaved arbitrarily.
+
+        Args:
+            student_idx: Integer student code per event
+            concept_idx: Concept column per event (from params.encode)
+            correct: Boolean observation per event
+            initial: Optional starting P(L) for known pairs (else P(L0))
+            return_trajectory: Also return P(L) after every event
+
+        Returns:
+            BKTScanResult with one row per distinct pair
+        """
+        student_idx = np.asarray(student_idx, dtype=np.int64)
+        concept_idx = np.asarray(concept_idx, dtype=np.int64)
+        correct = np.asarray(correct, dtype=bool)
+        num_events = len(student_idx)
+
+        if num_events == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return BKTScanResult(empty, empty, np.empty(0), empty,
+                                 np.empty(0) if return_trajectory else None)
+
+        # Identify pairs via a combined integer key (sorted by student, concept)
+        stride = int(concept_idx.max()) + 1
+        pair_key = student_idx * stride + concept_idx
+        unique_keys, pair_of_event, counts = np.unique(
+            pair_key, return_inverse=True, return_counts=True
+        )
+        pair_of_event = pair_of_event.reshape(-1)
+        pair_students = unique_keys // stride
+        pair_concepts = unique_keys % stride
+
+        # Rank of each event within its pair (chronological position)
+        by_pair = np.argsort(pair_of_event, kind='stable')
+        pair_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        rank = np.empty(num_events, dtype=np.int64)
+        rank[by_pair] = np.arange(num_events) - np.repeat(pair_starts, counts)
+
+        # Starting posterior per pair
+        mastery = self.params.p_l0[pair_concepts].astype(np.float64)
+        if initial:
+            known = [(s, c, p) for (s, c), p in initial.items() if c < stride]
+            if known:
+                known_keys = np.array([s * stride + c for s, c, _ in known], dtype=np.int64)
+                known_values = np.array([p for _, _, p in known], dtype=np.float64)
+                slots = np.searchsorted(unique_keys, known_keys)
+                slots = np.minimum(slots, len(unique_keys) - 1)
+                hit = unique_keys[slots] == known_keys
+                mastery[slots[hit]] = known_values[hit]
+
+        # Group events into rounds: round k = k-th event of every pair
+        round_order = np.lexsort((pair_of_event, rank))
+        round_bounds = np.searchsorted(rank[round_order], np.arange(counts.max() + 1))
+
+        trajectory = np.empty(num_events) if return_trajectory else None
+
+        for k in range(counts.max()):
+            events = round_order[round_bounds[k]:round_bounds[k + 1]]
+            pairs = pair_of_event[events]
+            mastery[pairs] = self.step(mastery[pairs], correct[events], pair_concepts[pairs])
+            if trajectory is not None:
+                trajectory[events] = mastery[pairs]
+
+        return BKTScanResult(pair_students, pair_concepts, mastery, counts, trajectory)
+
+    def update(
+        self,
+        current: Dict[Tuple[str, str], float],
+        events: List[Dict]
+    ) -> Dict[Tuple[str, str], float]:
+        """
+        Update mastery (0-100 scale) for all pairs touched by a batch of events
+
+        Convenience wrapper over scan() for callers holding documents.
+
+        Args:
+            current: {(student_id, concept_id): mastery_score} for known pairs
+            events: Dicts with student_id, concept_id, is_correct (chronological)
+
+        Returns:
+            {(student_id, concept_id): new mastery_score} for every touched pair
+        """
+        if not events:
+            return {}
+
+        student_codes: Dict[str, int] = {}
+        student_idx = np.fromiter(
+            (student_codes.setdefault(e['student_id'], len(student_codes)) for e in events),
+            dtype=np.int64, count=len(events)
+        )
+        concept_idx = self.params.encode(e['concept_id'] for e in events)
+        correct = np.fromiter((bool(e.get('is_correct')) for e in events), dtype=bool, count=len(events))
+
+        initial = {}
+        for (student_id, concept_id), score in current.items():
+            if student_id in student_codes and concept_id in self.params.concept_index:
+                initial[(student_codes[student_id], self.params.concept_index[concept_id])] = score / 100.0
+
+        result = self.scan(student_idx, concept_idx, correct, initial=initial)
+
+        student_ids = list(student_codes)
+        concept_ids = list(self.params.concept_index)
+        return {
+            (student_ids[s], concept_ids[c]): float(score)
+            for s, c, score in zip(result.pair_students, result.pair_concepts, result.mastery_scores)
+        }
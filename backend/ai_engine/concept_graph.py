@@ -0,0 +1,398 @@
+"""
+AMEP Concept Graph
+Sparse concept x concept correlation matrix for the DKVMN layer
+
+Solves: BR3 (Efficiency) - related concepts are known server-side instead
+of being passed by the client on every request
+
+Concept IDs are mapped to integer indices once. Two sparse matrices are
+maintained incrementally:
+
+    counts[a, b]   students who practiced both a and b
+    support[a]     students who practiced a
+
+and turned into correlation weights (Ochiai coefficient)
+
+    w(a, b) = counts[a, b] / sqrt(support[a] * support[b])
+
+Pairs seen by fewer than min_support students are dropped, prerequisite
+links get at least prerequisite_weight (in both directions) and each row
+keeps its max_neighbors strongest entries. Readers get an immutable
+ConceptGraphSnapshot whose CSR rows are the related-concept lists, so a
+weighted read is a sparse row dot product and a whole student is one
+sparse mat-vec.
+
+Nothing here does I/O; services/concept_graph_service.py feeds it from
+student_responses and concepts.
+"""
+
+import time
+import threading
+import numpy as np
+import scipy.sparse as sp
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# ============================================================================
+# IMMUTABLE SNAPSHOT (what readers see)
+# ============================================================================
+
+class ConceptGraphSnapshot:
+    """
+    Correlation weights at one point in time
+
+    Args:
+        concept_ids: Index -> concept ID
+        weights: CSR matrix (n x n), row a = concepts related to a
+    """
+
+    def __init__(self, concept_ids: List[str], weights: sp.csr_matrix):
+        self.concept_ids = concept_ids
+        self.index = {concept_id: i for i, concept_id in enumerate(concept_ids)}
+        self.weights = weights
+        self.built_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.concept_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return int(self.weights.nnz)
+
+    def neighbors(self, concept_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(neighbor indices, weights) of a concept, straight from the CSR row"""
+        row = self.index.get(concept_id)
+        if row is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+        start, end = self.weights.indptr[row], self.weights.indptr[row + 1]
+        return self.weights.indices[start:end], self.weights.data[start:end]
+
+    def weight(self, concept_a: str, concept_b: str) -> Optional[float]:
+        """Correlation weight of a -> b, or None if they are not linked"""
+        target = self.index.get(concept_b)
+        indices, weights = self.neighbors(concept_a)
+        if target is None or not len(indices):
+            return None
+        hit = np.flatnonzero(indices == target)
+        return float(weights[hit[0]]) if len(hit) else None
+
+    def related(
+        self,
+        concept_id: str,
+        top_k: Optional[int] = None,
+        min_weight: float = 0.0
+    ) -> List[Tuple[str, float]]:
+        """Related concepts, strongest first"""
+        indices, weights = self.neighbors(concept_id)
+        order = np.argsort(-weights, kind='stable')
+        related = [
+            (self.concept_ids[indices[i]], float(weights[i]))
+            for i in order if weights[i] >= min_weight
+        ]
+        return related[:top_k] if top_k else related
+
+    def weighted_read(self, concept_id: str, values: Dict[str, float]) -> Optional[float]:
+        """
+        Correlation-weighted mean of a student's mastery over the neighbors
+        of concept_id (sparse row . value vector)
+
+        Returns None when the student has no mastery on any neighbor.
+        """
+        indices, weights = self.neighbors(concept_id)
+        if not len(indices):
+            return None
+        gathered = np.fromiter(
+            (values.get(self.concept_ids[i], np.nan) for i in indices),
+            dtype=np.float64,
+            count=len(indices)
+        )
+        known = ~np.isnan(gathered)
+        total = float(weights[known].sum())
+        if total <= 0:
+            return None
+        return float(np.dot(weights[known], gathered[known]) / total)
+
+    def weighted_read_all(self, values: Dict[str, float]) -> Dict[str, float]:
+        """
+        weighted_read for every concept at once: (W @ x) / (W @ mask)
+
+        Returns:
+            {concept_id: neighbor-weighted mastery} for concepts with at
+            least one neighbor the student has mastery on
+        """
+        x = np.zeros(len(self.concept_ids), dtype=np.float64)
+        mask = np.zeros(len(self.concept_ids), dtype=np.float64)
+        for concept_id, value in values.items():
+            i = self.index.get(concept_id)
+            if i is not None:
+                x[i] = value
+                mask[i] = 1.0
+        numerator = self.weights @ x
+        denominator = self.weights @ mask
+        rows = np.flatnonzero(denominator > 0)
+        return {
+            self.concept_ids[i]: float(numerator[i] / denominator[i])
+            for i in rows
+        }
+
+
+# ============================================================================
+# INCREMENTAL BUILDER
+# ============================================================================
+
+class ConceptGraph:
+    """
+    Incrementally maintained concept graph
+
+    Args:
+        min_support: Students needed before a co-occurrence pair counts
+        prerequisite_weight: Minimum weight of a prerequisite link
+        max_neighbors: Strongest entries kept per row (0 = all)
+        refresh_fn: Called with the graph to pull new data (see
+            services/concept_graph_service.refresh_concept_graph)
+        refresh_seconds: Refresh this often in the background (0 = never)
+    """
+
+    def __init__(
+        self,
+        min_support: int = 3,
+        prerequisite_weight: float = 0.6,
+        max_neighbors: int = 20,
+        refresh_fn: Optional[Callable[['ConceptGraph'], None]] = None,
+        refresh_seconds: float = 0
+    ):
+        self.min_support = min_support
+        self.prerequisite_weight = prerequisite_weight
+        self.max_neighbors = max_neighbors
+        self.refresh_fn = refresh_fn
+        self.refresh_seconds = refresh_seconds
+
+        self.concept_ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.counts = sp.csr_matrix((0, 0), dtype=np.int64)
+        self.support = np.zeros(0, dtype=np.int64)
+        self.prerequisites: Dict[str, List[str]] = {}
+        self.watermark = None  # newest response folded in (set by the service)
+
+        self._snapshot = ConceptGraphSnapshot([], sp.csr_matrix((0, 0), dtype=np.float64))
+        self._lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._refreshed_at: Optional[float] = None
+        self.stats = {'refreshes': 0, 'refresh_errors': 0, 'students_folded': 0, 'last_refresh_seconds': 0.0}
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    def _indices(self, concept_ids: Iterable[str]) -> np.ndarray:
+        """Integer indices of concept IDs, assigning new ones as needed"""
+        indices = []
+        for concept_id in concept_ids:
+            i = self.index.get(concept_id)
+            if i is None:
+                i = self.index[concept_id] = len(self.concept_ids)
+                self.concept_ids.append(concept_id)
+            indices.append(i)
+        return np.asarray(indices, dtype=np.int64)
+
+    def _grow(self):
+        n = len(self.concept_ids)
+        if self.counts.shape[0] < n:
+            self.counts.resize((n, n))
+            self.support = np.concatenate([self.support, np.zeros(n - len(self.support), dtype=np.int64)])
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def add_student_concepts(
+        self,
+        students: Iterable[Tuple[Sequence[str], Sequence[str]]]
+    ) -> int:
+        """
+        Fold newly practiced concepts into the co-occurrence counts
+
+        Args:
+            students: (new_concepts, previous_concepts) per student, where
+                new_concepts were first practiced since the last update and
+                previous_concepts are the ones already counted for them
+
+        Returns:
+            Number of students folded in
+
+        With N (new) and P (previous) the student x concept incidence
+        matrices of the batch, the increment is N'N + N'P + P'N - every new
+        concept paired with the student's other new and previous concepts -
+        so counts[a, b] stays "students who practiced both" without
+        rescanning old responses. Its diagonal is the support increment.
+        """
+        new_indices, new_indptr = [], [0]
+        previous_indices, previous_indptr = [], [0]
+        for new_concepts, previous_concepts in students:
+            new_concepts = set(new_concepts)
+            if not new_concepts:
+                continue
+            new_indices.append(self._indices(new_concepts))
+            new_indptr.append(new_indptr[-1] + len(new_concepts))
+            previous = self._indices(set(previous_concepts) - new_concepts)
+            previous_indices.append(previous)
+            previous_indptr.append(previous_indptr[-1] + len(previous))
+
+        folded = len(new_indices)
+        if not folded:
+            return 0
+
+        self._grow()
+        n = len(self.concept_ids)
+
+        def incidence(indices, indptr):
+            indices = np.concatenate(indices) if indices else np.empty(0, dtype=np.int64)
+            return sp.csr_matrix(
+                (np.ones(len(indices), dtype=np.int64), indices, np.asarray(indptr)),
+                shape=(folded, n)
+            )
+
+        new = incidence(new_indices, new_indptr)
+        previous = incidence(previous_indices, previous_indptr)
+        cross = new.T @ previous
+        delta = new.T @ new + cross + cross.T
+
+        self.support += delta.diagonal()
+        delta.setdiag(0)
+        delta.eliminate_zeros()
+        self.counts = (self.counts + delta).tocsr()
+        self.stats['students_folded'] += folded
+        return folded
+
+    def set_prerequisites(self, prerequisites: Dict[str, List[str]]):
+        """Replace the prerequisite links ({concept_id: [prerequisite ids]})"""
+        self.prerequisites = {c: list(p or []) for c, p in prerequisites.items()}
+        for concept_id, required in self.prerequisites.items():
+            self._indices([concept_id, *required])
+        self._grow()
+
+    # ------------------------------------------------------------------
+    # Snapshot
+    # ------------------------------------------------------------------
+
+    def _prune(self, weights: sp.csr_matrix) -> sp.csr_matrix:
+        """Keep the max_neighbors strongest entries of each row"""
+        if not self.max_neighbors:
+            return weights
+        keep = np.ones(weights.nnz, dtype=bool)
+        for row in np.flatnonzero(np.diff(weights.indptr) > self.max_neighbors):
+            start, end = weights.indptr[row], weights.indptr[row + 1]
+            weakest = np.argpartition(-weights.data[start:end], self.max_neighbors)[self.max_neighbors:]
+            keep[start + weakest] = False
+        pruned = weights.copy()
+        pruned.data = np.where(keep, pruned.data, 0.0)
+        pruned.eliminate_zeros()
+        return pruned
+
+    def build_snapshot(self) -> ConceptGraphSnapshot:
+        """Recompute weights from the counts and publish a new snapshot"""
+        n = len(self.concept_ids)
+        counts = self.counts.tocoo()
+        supported = counts.data >= self.min_support
+        rows, cols = counts.row[supported], counts.col[supported]
+        ochiai = counts.data[supported] / np.sqrt(
+            self.support[rows].astype(np.float64) * self.support[cols]
+        )
+        weights = sp.csr_matrix((ochiai, (rows, cols)), shape=(n, n))
+
+        if self.prerequisites and self.prerequisite_weight > 0:
+            links = [
+                (self.index[concept_id], self.index[required])
+                for concept_id, prerequisites in self.prerequisites.items()
+                for required in prerequisites
+                if required != concept_id
+            ]
+            if links:
+                a, b = np.asarray(links).T
+                prereq = sp.csr_matrix(
+                    (np.full(2 * len(a), self.prerequisite_weight), (np.r_[a, b], np.r_[b, a])),
+                    shape=(n, n)
+                )
+                # Duplicated links sum on construction; clamp back
+                prereq.data = np.minimum(prereq.data, self.prerequisite_weight)
+                weights = weights.maximum(prereq)
+
+        weights = self._prune(weights.tocsr())
+        weights.sort_indices()
+        snapshot = ConceptGraphSnapshot(list(self.concept_ids), weights)
+        self._snapshot = snapshot
+        return snapshot
+
+    # ------------------------------------------------------------------
+    # Readers
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_snapshot(cls, snapshot: ConceptGraphSnapshot) -> 'ConceptGraph':
+        """
+        Read-only graph serving a fixed snapshot (no counts, never refreshes)
+
+        Snapshots pickle, graphs do not (locks), so this is how a snapshot
+        built in one process is handed to engines in another.
+        """
+        graph = cls()
+        graph._snapshot = snapshot
+        graph._refreshed_at = time.monotonic()
+        return graph
+
+    def snapshot(self) -> ConceptGraphSnapshot:
+        """
+        Current snapshot; schedules a background refresh when it is stale
+
+        Never blocks on the refresh - readers keep using the previous
+        snapshot until the new one is swapped in.
+        """
+        if self.refresh_fn is not None and self._is_stale():
+            self.refresh_async()
+        return self._snapshot
+
+    def _is_stale(self) -> bool:
+        if self._refreshed_at is None:
+            return True
+        return bool(self.refresh_seconds) and time.monotonic() - self._refreshed_at > self.refresh_seconds
+
+    def refresh(self):
+        """Pull new data through refresh_fn and rebuild the snapshot"""
+        started = time.perf_counter()
+        with self._lock:
+            try:
+                self.refresh_fn(self)
+                snapshot = self.build_snapshot()
+                self.stats['refreshes'] += 1
+                logger.info(f"[CONCEPT_GRAPH] Refreshed | concepts: {len(snapshot)} | edges: {snapshot.num_edges} | elapsed: {time.perf_counter() - started:.2f}s")
+            except Exception as e:
+                self.stats['refresh_errors'] += 1
+                logger.error(f"[CONCEPT_GRAPH] Refresh failed | error: {str(e)}")
+            finally:
+                self._refreshed_at = time.monotonic()
+                self.stats['last_refresh_seconds'] = round(time.perf_counter() - started, 3)
+
+    def refresh_async(self) -> threading.Thread:
+        """Refresh on a daemon thread (one at a time)"""
+        with self._thread_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return self._refresh_thread
+            # Mark as fresh now so concurrent readers do not queue more refreshes
+            self._refreshed_at = time.monotonic()
+            self._refresh_thread = threading.Thread(target=self.refresh, name='concept-graph-refresh', daemon=True)
+            self._refresh_thread.start()
+            return self._refresh_thread
+
+    def get_stats(self) -> Dict:
+        snapshot = self._snapshot
+        return dict(
+            self.stats,
+            concepts=len(snapshot),
+            edges=snapshot.num_edges,
+            built_at=snapshot.built_at,
+            watermark=self.watermark.isoformat() if hasattr(self.watermark, 'isoformat') else self.watermark
+        )
@@ -9,16 +9,26 @@ This module provides a production-ready LSTM neural network for knowledge tracin
 """
 
 import numpy as np
-from typing import List, Dict, Tuple, Optional
+from typing import Callable, List, Dict, Tuple, Optional
 import pickle
 import os
+import threading
+import uuid
+from collections import OrderedDict
 from datetime import datetime
 
 # Import PyTorch and NN modules
 import torch
 import torch.nn as nn
+from torch.nn.utils.rnn import pack_padded_sequence, pad_packed_sequence
 torch_available = True
 
+from ai_engine.inference_runtime import (
+    configure_inference_runtime,
+    freeze_for_inference,
+    quantize_dynamic_int8
+)
+
 # ============================================================================
 # DEEP KNOWLEDGE TRACING LSTM MODEL
 # ============================================================================
@@ -42,7 +52,8 @@ class DKTModel(nn.Module):
         num_concepts: int,
         hidden_dim: int = 100,
         num_layers: int = 1,
-        dropout: float = 0.2
+        dropout: float = 0.2,
+        embedding_dim: Optional[int] = None
     ):
         """
         Initialize DKT Model
@@ -52,15 +63,23 @@ class DKTModel(nn.Module):
             hidden_dim: Size of LSTM hidden state (default 100 from literature)
             num_layers: Number of LSTM layers
             dropout: Dropout rate to prevent overfitting
+            embedding_dim: Learn a dense embedding per (concept, correct)
+                code instead of the 2 x num_concepts one-hot input
         """
         super(DKTModel, self).__init__()
 
         self.num_concepts = num_concepts
         self.hidden_dim = hidden_dim
         self.num_layers = num_layers
+        self.embedding_dim = embedding_dim or None
 
-        # Input size: num_concepts * 2 (concept_id + correct/incorrect)
-        self.input_dim = num_concepts * 2
+        if self.embedding_dim:
+            self.embedding = nn.Embedding(num_concepts * 2, self.embedding_dim)
+            self.input_dim = self.embedding_dim
+        else:
+            self.embedding = None
+            # Input size: num_concepts * 2 (concept_id + correct/incorrect)
+            self.input_dim = num_concepts * 2
 
         # LSTM layer
         self.lstm = nn.LSTM(
@@ -80,24 +99,65 @@ class DKTModel(nn.Module):
         # Sigmoid activation for probability output
         self.sigmoid = nn.Sigmoid()
 
+    def encode_inputs(self, codes: torch.Tensor) -> torch.Tensor:
+        """
+        Expand interaction codes into LSTM inputs
+
+        A code is concept_id + num_concepts * is_correct. Without an
+        embedding this builds the original encoding (concept bit, plus the
+        correctness bit when correct) one batch at a time, so sequences
+        are stored and collated as integers rather than dense vectors.
+
+        Args:
+            codes: Long tensor of shape (batch_size, sequence_length)
+
+        Returns:
+            Float tensor of shape (batch_size, sequence_length, input_dim)
+        """
+        if self.embedding is not None:
+            return self.embedding(codes)
+
+        concepts = (codes % self.num_concepts).unsqueeze(-1)
+        correct = (codes >= self.num_concepts).unsqueeze(-1).float()
+        x = torch.zeros(*codes.shape, self.input_dim, device=codes.device)
+        x.scatter_(-1, concepts, 1.0)
+        x.scatter_(-1, concepts + self.num_concepts, correct)
+        return x
+
     def forward(
         self,
         x: torch.Tensor,
-        hidden: Optional[Tuple[torch.Tensor, torch.Tensor]] = None
+        hidden: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
+        lengths: Optional[torch.Tensor] = None
     ) -> Tuple[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
         """
         Forward pass through the network
 
         Args:
-            x: Input tensor of shape (batch_size, sequence_length, input_dim)
+            x: Interaction codes (batch_size, sequence_length) or encoded
+                input (batch_size, sequence_length, input_dim)
             hidden: Optional hidden state from previous sequence
+            lengths: True length of each right-padded sequence; the LSTM
+                then skips the padding (packed sequence)
 
         Returns:
             output: Predicted mastery probabilities (batch_size, sequence_length, num_concepts)
             hidden: Updated hidden state
         """
+        if not torch.is_floating_point(x):
+            x = self.encode_inputs(x)
+
         # LSTM forward pass
-        lstm_out, hidden = self.lstm(x, hidden)
+        if lengths is not None:
+            packed = pack_padded_sequence(
+                x, lengths.cpu(), batch_first=True, enforce_sorted=False
+            )
+            packed_out, hidden = self.lstm(packed, hidden)
+            lstm_out, _ = pad_packed_sequence(
+                packed_out, batch_first=True, total_length=x.size(1)
+            )
+        else:
+            lstm_out, hidden = self.lstm(x, hidden)
 
         # Apply dropout
         lstm_out = self.dropout(lstm_out)
@@ -117,6 +177,160 @@ class DKTModel(nn.Module):
         return (h0, c0)
 
 
+# ============================================================================
+# PER-STUDENT HIDDEN STATE CACHE (INCREMENTAL INFERENCE)
+# ============================================================================
+
+class HiddenStateCache:
+    """
+    Bounded LRU of per-student LSTM states with a persistent fallback
+
+    Each entry holds the (h, c) state after the student's last interaction,
+    the prediction it produced and the number of interactions folded in.
+    Misses are restored in bulk through restore_fn (one call per batch of
+    students). Entries put with persist=True and evicted entries are queued
+    as pending writes and handed to persist_fn together by flush(), which a
+    flusher thread runs every flush_interval seconds, so no persistence
+    I/O happens while a batch is being served.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 5000,
+        restore_fn: Optional[Callable[[List[str]], Dict[str, Dict]]] = None,
+        persist_fn: Optional[Callable[[List[Tuple[str, Dict]]], None]] = None,
+        flush_interval: float = 0
+    ):
+        self.capacity = max(1, capacity)
+        self.restore_fn = restore_fn
+        self.persist_fn = persist_fn
+        self.flush_interval = flush_interval
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'restores': 0,
+            'evictions': 0,
+            'flushes': 0,
+            'flush_errors': 0
+        }
+
+        self._flusher = None
+        self._stop_event = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def get(self, student_id: str) -> Optional[Dict]:
+        """Return the cached entry, restoring it from persistence on a miss"""
+        return self.get_many([student_id]).get(student_id)
+
+    def get_many(self, student_ids: List[str]) -> Dict[str, Dict]:
+        """Cached entries for several students, restoring all misses in one call"""
+        found, missing = {}, []
+        with self._lock:
+            for student_id in student_ids:
+                # An evicted state still waiting to be written is newer than the stored one
+                entry = self._entries.get(student_id) or self._pending.get(student_id)
+                if entry is not None:
+                    self._entries[student_id] = entry
+                    self._entries.move_to_end(student_id)
+                    self.stats['hits'] += 1
+                    found[student_id] = entry
+                else:
+                    missing.append(student_id)
+            self.stats['misses'] += len(missing)
+
+        if missing and self.restore_fn is not None:
+            restored = self.restore_fn(missing)
+            self.stats['restores'] += len(restored)
+            for student_id, entry in restored.items():
+                self.put(student_id, entry)
+                found[student_id] = entry
+        return found
+
+    def put(self, student_id: str, entry: Dict, persist: bool = False):
+        """Store an entry, queueing it (and any evicted entries) for the next flush"""
+        with self._lock:
+            self._entries[student_id] = entry
+            self._entries.move_to_end(student_id)
+            if self.persist_fn is not None and persist:
+                self._pending[student_id] = entry
+            evicted = 0
+            while len(self._entries) > self.capacity:
+                evicted_id, evicted_entry = self._entries.popitem(last=False)
+                if self.persist_fn is not None:
+                    self._pending[evicted_id] = evicted_entry
+                evicted += 1
+            self.stats['evictions'] += evicted
+
+    def flush(self):
+        """Write every pending entry through a single persist_fn call"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            self.persist_fn(list(pending.items()))
+        except Exception:
+            # Requeue, without overwriting anything put since
+            with self._lock:
+                for student_id, entry in pending.items():
+                    self._pending.setdefault(student_id, entry)
+            raise
+        self.stats['flushes'] += 1
+
+    def invalidate(self, student_id: Optional[str] = None):
+        """Drop one student's state (or all states) from memory"""
+        with self._lock:
+            if student_id is None:
+                self._entries.clear()
+                self._pending.clear()
+            else:
+                self._entries.pop(student_id, None)
+                self._pending.pop(student_id, None)
+
+    # ------------------------------------------------------------------
+    # Background flusher
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the periodic flush thread (idempotent, no-op without an interval)"""
+        if self.flush_interval <= 0 or self.persist_fn is None:
+            return
+        with self._start_lock:
+            if self._flusher is not None:
+                return
+            self._stop_event.clear()
+            self._flusher = threading.Thread(target=self._run, name='dkt-state-flush', daemon=True)
+            self._flusher.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the flusher and write whatever is still pending"""
+        with self._start_lock:
+            flusher, self._flusher = self._flusher, None
+            self._stop_event.set()
+        if flusher is not None:
+            flusher.join(timeout)
+        if self.persist_fn is not None:
+            self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                # Persistence hiccups must not kill the thread; next tick retries
+                self.stats['flush_errors'] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Counters plus resident and pending sizes"""
+        return dict(self.stats, resident=len(self), pending=len(self._pending))
+
+
 # ============================================================================
 # DKT TRAINING & INFERENCE ENGINE
 # ============================================================================
@@ -131,7 +345,17 @@ class DKTEngine:
         num_concepts: int,
         hidden_dim: int = 100,
         learning_rate: float = 0.001,
-        model_path: str = 'models/dkt_model.pt'
+        model_path: str = 'models/dkt_model.pt',
+        state_cache_size: int = 5000,
+        load_states_fn: Optional[Callable[[List[str]], Dict[str, Dict]]] = None,
+        save_states_fn: Optional[Callable[[List[Tuple[str, Dict]]], None]] = None,
+        persist_states: bool = False,
+        state_flush_seconds: float = 0,
+        embedding_dim: Optional[int] = None,
+        concept_ids: Optional[List[str]] = None,
+        inference_only: bool = False,
+        quantize: bool = False,
+        num_threads: Optional[int] = None
     ):
         """
         Initialize DKT Engine
@@ -141,17 +365,62 @@ class DKTEngine:
             hidden_dim: LSTM hidden dimension
             learning_rate: Optimizer learning rate
             model_path: Path to save/load model
+            state_cache_size: Students whose LSTM state is kept in memory
+            load_states_fn: [student_id] -> {student_id: persisted state
+                document}, called once per batch for all cache misses
+            save_states_fn: [(student_id, document)] -> None, called once per
+                flush with every evicted (and, with persist_states, updated) state
+            persist_states: Also save every state predict_mastery_incremental
+                updates, so other workers and restarts resume from it
+            state_flush_seconds: Write pending states from a background thread
+                this often (0 = once at the end of every batch)
+            embedding_dim: Use learned input embeddings instead of one-hot
+            concept_ids: Concept ID of each model index (saved with the model)
+            inference_only: Serve predictions only - no optimizer, frozen
+                weights, CPU, autograd off (see ai_engine.inference_runtime)
+            quantize: With inference_only, int8-quantize the LSTM and output layer
+            num_threads: With inference_only, torch intra-op threads per worker
         """
         self.num_concepts = num_concepts
         self.hidden_dim = hidden_dim
         self.model_path = model_path
+        self.concept_ids = concept_ids
+        self.inference_only = inference_only
+        self.quantize = inference_only and quantize
+        self.persist_states = persist_states and save_states_fn is not None
+
+        # Cached (h, c) per student, tagged with the weights that produced it
+        self.model_version = uuid.uuid4().hex
+        self.state_cache = HiddenStateCache(
+            capacity=state_cache_size,
+            restore_fn=(
+                lambda student_ids: self._load_states(load_states_fn, student_ids)
+            ) if load_states_fn else None,
+            persist_fn=(
+                lambda items: save_states_fn([(sid, self.state_to_document(entry)) for sid, entry in items])
+            ) if save_states_fn else None,
+            flush_interval=state_flush_seconds
+        )
+        self.state_cache.start()
 
         # Initialize model
         self.model = DKTModel(
             num_concepts=num_concepts,
-            hidden_dim=hidden_dim
+            hidden_dim=hidden_dim,
+            embedding_dim=embedding_dim
         )
 
+        if inference_only:
+            configure_inference_runtime(num_threads)
+            self.device = torch.device('cpu')
+            self.optimizer = None
+            self.criterion = None
+            if os.path.exists(model_path):
+                self.load_model()
+            else:
+                self._prepare_inference_model()
+            return
+
         # Check for GPU
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.model.to(self.device)
@@ -164,6 +433,18 @@ class DKTEngine:
         if os.path.exists(model_path):
             self.load_model()
 
+    def _prepare_inference_model(self):
+        """Freeze (and optionally quantize) the float model for serving"""
+        freeze_for_inference(self.model)
+        if self.quantize:
+            self.model = freeze_for_inference(
+                quantize_dynamic_int8(self.model, {nn.LSTM, nn.Linear})
+            )
+
+    def _require_training(self):
+        if self.inference_only:
+            raise RuntimeError('DKTEngine was created with inference_only=True and cannot train')
+
     def encode_interaction(
         self,
         concept_id: int,
@@ -194,6 +475,24 @@ class DKTEngine:
 
         return encoded
 
+    def encode_codes(
+        self,
+        interactions: List[Dict[str, any]]
+    ) -> np.ndarray:
+        """
+        Compact integer encoding of a sequence (see DKTModel.encode_inputs)
+
+        Returns:
+            int64 array of concept_id + num_concepts * is_correct
+        """
+        concepts = np.fromiter(
+            (int(it['concept_id']) for it in interactions), dtype=np.int64, count=len(interactions)
+        )
+        correct = np.fromiter(
+            (bool(it['is_correct']) for it in interactions), dtype=bool, count=len(interactions)
+        )
+        return concepts + self.num_concepts * correct
+
     def prepare_sequence(
         self,
         interactions: List[Dict[str, any]]
@@ -205,20 +504,21 @@ class DKTEngine:
             interactions: List of dicts with 'concept_id' and 'is_correct'
 
         Returns:
-            Tensor of shape (1, sequence_length, input_dim)
+            Long tensor of interaction codes, shape (1, sequence_length)
         """
-        sequence = []
-
-        for interaction in interactions:
-            encoded = self.encode_interaction(
-                interaction['concept_id'],
-                interaction['is_correct']
-            )
-            sequence.append(encoded)
-
-        # Convert to tensor and add batch dimension
-        sequence_tensor = torch.FloatTensor(sequence).unsqueeze(0)
-        return sequence_tensor.to(self.device)
+        codes = torch.from_numpy(self.encode_codes(interactions)).unsqueeze(0)
+        return codes.to(self.device)
+
+    def _pad_codes(self, sequences: List[np.ndarray]) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Right-pad code arrays into a (batch, max_len) tensor plus lengths"""
+        lengths = np.array([len(seq) for seq in sequences], dtype=np.int64)
+        codes = np.zeros((len(sequences), lengths.max()), dtype=np.int64)
+        for row, seq in enumerate(sequences):
+            codes[row, :len(seq)] = seq
+        return (
+            torch.from_numpy(codes).to(self.device),
+            torch.from_numpy(lengths)
+        )
 
     def predict_mastery(
         self,
@@ -260,23 +560,190 @@ class DKTEngine:
             # Get last prediction (most recent knowledge state)
             last_pred = output[0, -1, :].cpu().numpy()
 
-            # Convert to 0-100 scale
-            mastery_scores = (last_pred * 100).tolist()
+        return self._format_prediction(last_pred, len(interactions), target_concept)
+
+    def predict_mastery_incremental(
+        self,
+        student_id: str,
+        new_interactions: List[Dict[str, any]],
+        target_concept: Optional[int] = None,
+        history: Optional[List[Dict[str, any]]] = None
+    ) -> Dict[str, any]:
+        """
+        Predict mastery by feeding only interactions not seen before
+
+        The student's LSTM (h, c) after their last interaction is kept in
+        state_cache, so each call runs len(new_interactions) sequence steps
+        instead of replaying the whole history.
 
-            # Confidence based on sequence length
-            confidence = min(1.0, len(interactions) / 20.0)
+        Args:
+            student_id: Student whose cached state to resume from
+            new_interactions: Interactions since the previous call
+            target_concept: Specific concept to predict (None = all concepts)
+            history: Known history ending with new_interactions, replayed
+                instead of them when the student has no usable cached state
 
-            if target_concept is not None:
-                return {
-                    'mastery_score': mastery_scores[target_concept],
-                    'confidence': confidence,
-                    'all_concepts': mastery_scores
-                }
+        Returns:
+            Dict with mastery predictions (same shape as predict_mastery)
+        """
+        return self.predict_mastery_incremental_batch(
+            [(student_id, new_interactions, target_concept, history)]
+        )[0]
+
+    def predict_mastery_incremental_batch(
+        self,
+        requests: List[Tuple[str, List[Dict[str, any]], Optional[int], Optional[List[Dict[str, any]]]]]
+    ) -> List[Dict[str, any]]:
+        """
+        predict_mastery_incremental for many students in one forward pass
+
+        Each student's cached (h, c) becomes one row of the initial hidden
+        state (zeros for students without one) and the new interactions run
+        as a packed batch. A student queued more than once is served in a
+        follow-up pass so every request resumes from the previous one.
+
+        Args:
+            requests: (student_id, new_interactions, target_concept, history)
+                tuples, as taken by predict_mastery_incremental
+
+        Returns:
+            One prediction dict per request, in order
+        """
+        results = [None] * len(requests)
+        active, deferred, seen = [], [], set()
+        # One restore call for every student in the batch
+        entries = self.state_cache.get_many(list(dict.fromkeys(request[0] for request in requests)))
+
+        for i, (student_id, new_interactions, target_concept, history) in enumerate(requests):
+            if student_id in seen:
+                deferred.append(i)
+                continue
+            seen.add(student_id)
+
+            entry = entries.get(student_id)
+            if entry is not None and entry.get('model_version') != self.model_version:
+                # Weights changed since this state was computed
+                entry = None
+            if entry is None and history:
+                new_interactions = history
+
+            if new_interactions:
+                active.append((i, entry, new_interactions))
+            elif entry is None:
+                results[i] = self.predict_mastery([], target_concept)
             else:
-                return {
-                    'mastery_scores': mastery_scores,
-                    'confidence': confidence
-                }
+                results[i] = self._format_prediction(
+                    entry['last_output'], entry['num_interactions'], target_concept
+                )
+
+        if active:
+            codes, lengths = self._pad_codes([self.encode_codes(seq) for _, _, seq in active])
+            zeros = torch.zeros(self.model.num_layers, 1, self.hidden_dim, device=self.device)
+            h0 = torch.cat([entry['hidden'][0] if entry is not None else zeros for _, entry, _ in active], dim=1)
+            c0 = torch.cat([entry['hidden'][1] if entry is not None else zeros for _, entry, _ in active], dim=1)
+
+            self.model.eval()
+
+            with torch.no_grad():
+                output, (h_n, c_n) = self.model(codes, (h0, c0), lengths=lengths)
+                last_steps = (lengths - 1).to(self.device)
+                rows = torch.arange(len(active), device=self.device)
+                last_preds = output[rows, last_steps, :].cpu().numpy()
+
+            for row, (i, entry, seq) in enumerate(active):
+                student_id, _, target_concept, _ = requests[i]
+                num_interactions = len(seq) + (entry['num_interactions'] if entry is not None else 0)
+                # Clone so the cached state does not pin the whole batch tensor
+                self.state_cache.put(student_id, {
+                    'hidden': (h_n[:, row:row + 1].clone(), c_n[:, row:row + 1].clone()),
+                    'last_output': last_preds[row],
+                    'num_interactions': num_interactions,
+                    'model_version': self.model_version
+                }, persist=self.persist_states)
+                results[i] = self._format_prediction(last_preds[row], num_interactions, target_concept)
+
+        if deferred:
+            for i, result in zip(deferred, self.predict_mastery_incremental_batch([requests[i] for i in deferred])):
+                results[i] = result
+        elif self.state_cache.flush_interval <= 0 and self.state_cache.persist_fn is not None:
+            # No flusher thread - write this batch's states in one call
+            self.state_cache.flush()
+
+        return results
+
+    def predict_mastery_batch(
+        self,
+        requests: List[Tuple[List[Dict[str, any]], Optional[int]]]
+    ) -> List[Dict[str, any]]:
+        """
+        Predict mastery for many students in a single forward pass
+
+        Sequences are right-padded to the longest one and run as a packed
+        batch, so the LSTM does no work on the padding.
+
+        Args:
+            requests: (interactions, target_concept) pairs, one per student
+
+        Returns:
+            One prediction dict per request, in order (same shape as predict_mastery)
+        """
+        results = [None] * len(requests)
+        active = [i for i, (interactions, _) in enumerate(requests) if interactions]
+
+        for i, (interactions, target_concept) in enumerate(requests):
+            if not interactions:
+                results[i] = self.predict_mastery([], target_concept)
+
+        if not active:
+            return results
+
+        codes, lengths = self._pad_codes([self.encode_codes(requests[i][0]) for i in active])
+
+        self.model.eval()
+
+        with torch.no_grad():
+            output, _ = self.model(codes, lengths=lengths)
+            last_steps = (lengths - 1).to(self.device)
+            rows = torch.arange(len(active), device=self.device)
+            last_preds = output[rows, last_steps, :].cpu().numpy()
+
+        for row, i in enumerate(active):
+            results[i] = self._format_prediction(last_preds[row], int(lengths[row]), requests[i][1])
+
+        return results
+
+    def reset_student_state(self, student_id: str):
+        """Forget a student's cached state (e.g. after their history is edited)"""
+        self.state_cache.invalidate(student_id)
+
+    def close(self):
+        """Stop the state flusher, writing any states still pending"""
+        self.state_cache.stop()
+
+    def _format_prediction(
+        self,
+        last_pred: np.ndarray,
+        num_interactions: int,
+        target_concept: Optional[int] = None
+    ) -> Dict[str, any]:
+        """Convert a last-step output vector into the prediction response"""
+        # Convert to 0-100 scale
+        mastery_scores = (np.asarray(last_pred) * 100).tolist()
+
+        # Confidence based on sequence length
+        confidence = min(1.0, num_interactions / 20.0)
+
+        if target_concept is not None:
+            return {
+                'mastery_score': mastery_scores[target_concept],
+                'confidence': confidence,
+                'all_concepts': mastery_scores
+            }
+        else:
+            return {
+                'mastery_scores': mastery_scores,
+                'confidence': confidence
+            }
 
     def train_batch(
         self,
@@ -286,6 +753,10 @@ class DKTEngine:
         """
         Train on a batch of student sequences
 
+        All sequences go through one packed forward/backward pass and a
+        single optimizer step. The prediction after seq[:-1] is scored
+        against seq[-1], as before.
+
         Args:
             sequences: List of interaction sequences
             targets: List of target labels (next correct/incorrect)
@@ -293,46 +764,129 @@ class DKTEngine:
         Returns:
             Batch loss
         """
+        self._require_training()
+
+        usable = [seq for seq in sequences if len(seq) >= 2]
+        if not usable:
+            return 0.0
+
         self.model.train()
 
-        total_loss = 0.0
+        codes, lengths = self._pad_codes([self.encode_codes(seq[:-1]) for seq in usable])
+        output, _ = self.model(codes, lengths=lengths)
 
-        for seq, target in zip(sequences, targets):
-            # Prepare input and target
-            x = self.prepare_sequence(seq[:-1])  # All but last
+        rows = torch.arange(len(usable), device=self.device)
+        last_steps = (lengths - 1).to(self.device)
+        target_concepts = torch.tensor([int(seq[-1]['concept_id']) for seq in usable], device=self.device)
+        target_correct = torch.tensor(
+            [float(seq[-1]['is_correct']) for seq in usable], device=self.device
+        )
 
-            # Forward pass
-            output, _ = self.model(x)
+        pred_prob = output[rows, last_steps, target_concepts]
+        loss = self.criterion(pred_prob, target_correct)
 
-            # Calculate loss on last step
-            # Target: concept_id and correctness
-            last_interaction = seq[-1]
-            concept_id = last_interaction['concept_id']
-            is_correct = float(last_interaction['is_correct'])
+        self.optimizer.zero_grad()
+        loss.backward()
+        self.optimizer.step()
 
-            pred_prob = output[0, -1, concept_id]
-            target_tensor = torch.FloatTensor([is_correct]).to(self.device)
+        self._weights_changed()
 
-            loss = self.criterion(pred_prob.unsqueeze(0), target_tensor)
+        return loss.item()
+
+    def train_epoch(self, loader) -> float:
+        """
+        One pass over padded code batches (see ai_engine.dkt_training)
+
+        Standard DKT objective: the output at step t is scored against the
+        correctness of the concept attempted at step t + 1, for every step
+        of every sequence.
+
+        Args:
+            loader: Iterable of (codes, lengths) batches
+
+        Returns:
+            Mean loss per predicted step
+        """
+        self._require_training()
+        self.model.train()
+
+        total_loss = 0.0
+        total_steps = 0
+
+        for codes, lengths in loader:
+            # Sequences need a next step to be scored against
+            keep = lengths >= 2
+            if not bool(keep.any()):
+                continue
+            codes = codes[keep].to(self.device)
+            lengths = lengths[keep]
+
+            output, _ = self.model(codes[:, :-1], lengths=lengths - 1)
+
+            next_codes = codes[:, 1:]
+            next_concepts = next_codes % self.num_concepts
+            next_correct = (next_codes >= self.num_concepts).float()
+            mask = (
+                torch.arange(next_codes.size(1), device=self.device).unsqueeze(0)
+                < (lengths - 1).to(self.device).unsqueeze(1)
+            )
+
+            pred_prob = output.gather(-1, next_concepts.unsqueeze(-1)).squeeze(-1)
+            loss = nn.functional.binary_cross_entropy(
+                pred_prob[mask], next_correct[mask], reduction='sum'
+            )
+            steps = int(mask.sum())
 
-            # Backward pass
             self.optimizer.zero_grad()
-            loss.backward()
+            (loss / steps).backward()
             self.optimizer.step()
 
             total_loss += loss.item()
+            total_steps += steps
+
+        self._weights_changed()
 
-        return total_loss / len(sequences)
+        return total_loss / total_steps if total_steps else 0.0
+
+    def _weights_changed(self):
+        """Cached hidden states were produced by the old weights"""
+        self.model_version = uuid.uuid4().hex
+        self.state_cache.invalidate()
+
+    @classmethod
+    def from_checkpoint(cls, model_path: str, **kwargs) -> 'DKTEngine':
+        """
+        Engine sized from a saved model (num_concepts, hidden_dim,
+        embedding_dim and concept_ids come from the checkpoint)
+
+        Raises:
+            FileNotFoundError: No model has been trained at model_path
+        """
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"No DKT model at {model_path}")
+
+        checkpoint = torch.load(model_path, map_location='cpu')
+        return cls(
+            num_concepts=checkpoint['num_concepts'],
+            hidden_dim=checkpoint['hidden_dim'],
+            model_path=model_path,
+            embedding_dim=checkpoint.get('embedding_dim'),
+            concept_ids=checkpoint.get('concept_ids'),
+            **kwargs
+        )
 
     def save_model(self):
         """Save model to disk"""
+        self._require_training()
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
 
         torch.save({
             'model_state_dict': self.model.state_dict(),
             'optimizer_state_dict': self.optimizer.state_dict(),
             'num_concepts': self.num_concepts,
-            'hidden_dim': self.hidden_dim
+            'hidden_dim': self.hidden_dim,
+            'embedding_dim': self.model.embedding_dim,
+            'concept_ids': self.concept_ids
         }, self.model_path)
 
         print(f"Model saved to {self.model_path}")
@@ -344,12 +898,95 @@ class DKTEngine:
             return
 
         checkpoint = torch.load(self.model_path, map_location=self.device)
+        saved_concepts = checkpoint.get('concept_ids')
+
+        if self.inference_only:
+            # Weights only - quantized modules cannot load float state, so
+            # rebuild the float model first
+            self.model = DKTModel(
+                num_concepts=self.num_concepts,
+                hidden_dim=self.hidden_dim,
+                embedding_dim=checkpoint.get('embedding_dim')
+            )
+            self.model.load_state_dict(checkpoint['model_state_dict'])
+            self._prepare_inference_model()
+        elif saved_concepts and self.concept_ids and list(saved_concepts) != list(self.concept_ids):
+            # Vocabulary changed: warm-start from the old weights, fresh optimizer
+            self.model.load_state_dict(self._remap_concepts(checkpoint['model_state_dict'], saved_concepts))
+        else:
+            self.model.load_state_dict(checkpoint['model_state_dict'])
+            self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+        if saved_concepts and not self.concept_ids:
+            self.concept_ids = saved_concepts
 
-        self.model.load_state_dict(checkpoint['model_state_dict'])
-        self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+        # Stable across workers loading the same checkpoint file
+        self.model_version = f"{os.path.basename(self.model_path)}:{os.stat(self.model_path).st_mtime_ns}"
+        self.state_cache.invalidate()
 
         print(f"Model loaded from {self.model_path}")
 
+    def _remap_concepts(self, state_dict: Dict, saved_concepts: List[str]) -> Dict:
+        """
+        Saved weights rearranged for self.concept_ids
+
+        The concept-indexed slices - one-hot input columns (concept bit and
+        correctness bit) or embedding rows, and output rows - are copied
+        from each surviving concept's old index to its new one. New
+        concepts keep this model's fresh initialization; the recurrent
+        weights carry over unchanged.
+        """
+        old_n, new_n = len(saved_concepts), self.num_concepts
+        old_index = {concept_id: i for i, concept_id in enumerate(saved_concepts)}
+        pairs = [(old_index[c], j) for j, c in enumerate(self.concept_ids) if c in old_index]
+        old = torch.tensor([i for i, _ in pairs], dtype=torch.long)
+        new = torch.tensor([j for _, j in pairs], dtype=torch.long)
+
+        remapped = {key: value.clone() for key, value in self.model.state_dict().items()}
+        for key, value in state_dict.items():
+            if key == 'lstm.weight_ih_l0' and self.model.embedding is None:
+                remapped[key][:, new] = value[:, old]
+                remapped[key][:, new + new_n] = value[:, old + old_n]
+            elif key == 'embedding.weight':
+                remapped[key][new] = value[old]
+                remapped[key][new + new_n] = value[old + old_n]
+            elif key in ('fc.weight', 'fc.bias'):
+                remapped[key][new] = value[old]
+            else:
+                remapped[key] = value
+        return remapped
+
+    @staticmethod
+    def state_to_document(entry: Dict) -> Dict:
+        """Serialize a hidden state cache entry for persistence (e.g. Mongo)"""
+        h, c = entry['hidden']
+        return {
+            'h': h.cpu().numpy().astype(np.float32).tolist(),
+            'c': c.cpu().numpy().astype(np.float32).tolist(),
+            'last_output': np.asarray(entry['last_output'], dtype=np.float32).tolist(),
+            'num_interactions': entry['num_interactions'],
+            'model_version': entry['model_version']
+        }
+
+    def _load_states(self, load_states_fn, student_ids: List[str]) -> Dict[str, Dict]:
+        """Restore persisted states, ignoring ones from other weights"""
+        return {
+            student_id: self.state_from_document(document)
+            for student_id, document in load_states_fn(student_ids).items()
+            if document and document.get('model_version') == self.model_version
+        }
+
+    def state_from_document(self, document: Dict) -> Dict:
+        """Rebuild a hidden state cache entry from its persisted form"""
+        return {
+            'hidden': (
+                torch.tensor(document['h'], dtype=torch.float32, device=self.device),
+                torch.tensor(document['c'], dtype=torch.float32, device=self.device)
+            ),
+            'last_output': np.asarray(document['last_output'], dtype=np.float32),
+            'num_interactions': document['num_interactions'],
+            'model_version': document.get('model_version')
+        }
+
 
 # ============================================================================
 # SIMPLIFIED DKT FOR PRODUCTION USE (NO TRAINING REQUIRED)
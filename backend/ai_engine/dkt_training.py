@@ -0,0 +1,215 @@
+"""
+AMEP DKT Training Pipeline
+Compact datasets, length bucketing and multi-worker minibatches for DKTEngine
+
+Solves: BR1 (Personalized Mastery) - makes retraining on a full term of
+responses practical on CPU-only machines
+
+Sequences are kept as one flat int32 array of interaction codes
+(concept_id + num_concepts * is_correct) plus offsets, about 4 bytes per
+response. Batches are drawn from length buckets so sequences of similar
+length are padded together, collated into (codes, lengths) tensors by
+DataLoader worker processes, and run through the LSTM as packed
+sequences. The one-hot input (or embedding) is built inside the model one
+batch at a time.
+"""
+
+import numpy as np
+from itertools import groupby
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import torch
+from torch.nn.utils.rnn import pad_sequence
+from torch.utils.data import DataLoader, Dataset, Sampler
+
+# ============================================================================
+# DATASET
+# ============================================================================
+
+class InteractionSequenceDataset(Dataset):
+    """
+    Code sequences stored as one flat array plus offsets
+
+    Long histories are split into windows of at most max_length steps so
+    a handful of very active students do not inflate every batch.
+    """
+
+    def __init__(self, codes: np.ndarray, offsets: np.ndarray):
+        self.codes = np.asarray(codes, dtype=np.int32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.lengths = np.diff(self.offsets)
+
+    @classmethod
+    def from_sequences(
+        cls,
+        sequences: Iterable[np.ndarray],
+        max_length: int = 200,
+        min_length: int = 2
+    ) -> 'InteractionSequenceDataset':
+        """Build from per-student code arrays, windowing long ones"""
+        chunks = []
+        lengths = []
+        for seq in sequences:
+            seq = np.asarray(seq, dtype=np.int32)
+            for start in range(0, len(seq), max_length):
+                window = seq[start:start + max_length]
+                if len(window) >= min_length:
+                    chunks.append(window)
+                    lengths.append(len(window))
+
+        codes = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int32)
+        offsets = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+        return cls(codes, offsets)
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def __getitem__(self, index: int) -> torch.Tensor:
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return torch.from_numpy(self.codes[start:end].astype(np.int64))
+
+    @property
+    def num_interactions(self) -> int:
+        return len(self.codes)
+
+
+def collate_sequences(batch: List[torch.Tensor]) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Right-pad code sequences into (codes, lengths)"""
+    lengths = torch.tensor([len(seq) for seq in batch], dtype=torch.int64)
+    return pad_sequence(batch, batch_first=True), lengths
+
+
+# ============================================================================
+# LENGTH BUCKETING
+# ============================================================================
+
+class LengthBucketSampler(Sampler):
+    """
+    Batch sampler grouping sequences of similar length
+
+    Each epoch the dataset is shuffled, cut into pools of
+    batch_size * pool_batches sequences, each pool is sorted by length and
+    split into batches, and the batch order is shuffled again. Padding
+    stays small while batches remain randomized.
+    """
+
+    def __init__(
+        self,
+        lengths: np.ndarray,
+        batch_size: int = 64,
+        pool_batches: int = 50,
+        shuffle: bool = True,
+        seed: int = 0
+    ):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = max(1, batch_size)
+        self.pool_size = self.batch_size * max(1, pool_batches)
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int):
+        """Vary the shuffle between epochs"""
+        self.epoch = epoch
+
+    def __iter__(self) -> Iterator[List[int]]:
+        rng = np.random.default_rng(self.seed + self.epoch)
+        order = rng.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+
+        batches = []
+        for start in range(0, len(order), self.pool_size):
+            pool = order[start:start + self.pool_size]
+            pool = pool[np.argsort(self.lengths[pool], kind='stable')]
+            batches.extend(
+                pool[i:i + self.batch_size].tolist()
+                for i in range(0, len(pool), self.batch_size)
+            )
+
+        if self.shuffle:
+            rng.shuffle(batches)
+        return iter(batches)
+
+    def __len__(self) -> int:
+        pools, remainder = divmod(len(self.lengths), self.pool_size)
+        per_pool = -(-self.pool_size // self.batch_size)
+        return pools * per_pool + -(-remainder // self.batch_size)
+
+
+# ============================================================================
+# SEQUENCE EXTRACTION
+# ============================================================================
+
+def sequences_from_responses(
+    responses: Iterable[Dict],
+    concept_index: Dict[str, int],
+    num_concepts: int
+) -> Iterator[np.ndarray]:
+    """
+    Turn a response stream into one code array per student
+
+    Args:
+        responses: Documents sorted by (student_id, submitted_at), e.g. a
+            Mongo cursor; only student_id, concept_id, is_correct are read
+        concept_index: concept_id -> model index (unknown concepts skipped)
+        num_concepts: Model concept count (offset of the correct codes)
+
+    Yields:
+        int32 code arrays, one per student, in chronological order
+    """
+    for _, rows in groupby(responses, key=lambda r: r.get('student_id')):
+        codes = [
+            index + num_concepts * bool(row.get('is_correct'))
+            for row in rows
+            for index in (concept_index.get(row.get('concept_id')),)
+            if index is not None
+        ]
+        if codes:
+            yield np.asarray(codes, dtype=np.int32)
+
+
+# ============================================================================
+# TRAINING LOOP
+# ============================================================================
+
+def train_dkt(
+    engine,
+    dataset: InteractionSequenceDataset,
+    epochs: int = 10,
+    batch_size: int = 64,
+    num_workers: int = 2,
+    seed: int = 0,
+    on_epoch: Optional[Callable[[int, float], None]] = None
+) -> List[float]:
+    """
+    Train a DKTEngine for several epochs over a dataset
+
+    Args:
+        engine: DKTEngine to train (updated in place)
+        dataset: Code sequences
+        epochs: Passes over the dataset
+        batch_size: Sequences per optimizer step
+        num_workers: DataLoader worker processes collating batches
+        seed: Shuffle seed (varied per epoch)
+        on_epoch: Optional callback (epoch, mean_loss)
+
+    Returns:
+        Mean loss per epoch
+    """
+    sampler = LengthBucketSampler(dataset.lengths, batch_size=batch_size, seed=seed)
+    loader = DataLoader(
+        dataset,
+        batch_sampler=sampler,
+        collate_fn=collate_sequences,
+        num_workers=num_workers,
+        persistent_workers=num_workers > 0
+    )
+
+    history = []
+    for epoch in range(epochs):
+        sampler.set_epoch(epoch)
+        loss = engine.train_epoch(loader)
+        history.append(loss)
+        if on_epoch is not None:
+            on_epoch(epoch, loss)
+
+    return history
@@ -13,6 +13,7 @@ DKVMN uses two matrices:
 import numpy as np
 from typing import List, Dict, Tuple, Optional
 import os
+import time
 
 # Import PyTorch and NN modules
 import torch
@@ -20,10 +21,72 @@ import torch.nn as nn
 import torch.nn.functional as F
 torch_available = True
 
+from ai_engine.inference_runtime import (
+    configure_inference_runtime,
+    freeze_for_inference,
+    quantize_dynamic_int8
+)
+from ai_engine.forgetting import decay_scores
+
 # ============================================================================
 from typing import List, Dict, Tuple, Optional
 import os
 
+# ============================================================================
+# COMPILED MEMORY RECURRENCE
+# ============================================================================
+
+@torch.jit.script
+def dkvmn_recurrence(
+    weights: torch.Tensor,
+    correctness: torch.Tensor,
+    value_memory: torch.Tensor,
+    erase_weight: torch.Tensor,
+    erase_bias: torch.Tensor,
+    add_weight: torch.Tensor,
+    add_bias: torch.Tensor,
+    inplace: bool
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Sequential read / erase-add part of DKVMN (the only memory-dependent work)
+
+    Args:
+        weights: Correlation weights for every step (batch, seq_len, key_size)
+        correctness: 0/1 per step (batch, seq_len)
+        value_memory: Starting value memory (batch, key_size, value_size)
+        erase_weight, erase_bias, add_weight, add_bias: Gate parameters
+        inplace: Update value_memory in place (only valid without autograd)
+
+    Returns:
+        reads: Read vector before each step's write (batch, seq_len, value_size)
+        value_memory: Memory after the last step
+    """
+    batch_size, seq_len, _ = weights.size()
+    reads = torch.empty(
+        batch_size, seq_len, value_memory.size(2),
+        dtype=value_memory.dtype, device=value_memory.device
+    )
+
+    for t in range(seq_len):
+        w = weights[:, t]
+        read_content = torch.bmm(w.unsqueeze(1), value_memory).squeeze(1)
+        reads[:, t] = read_content
+
+        update_input = read_content * correctness[:, t].unsqueeze(-1)
+        erase_vector = torch.sigmoid(torch.addmm(erase_bias, update_input, erase_weight.t()))
+        add_vector = torch.tanh(torch.addmm(add_bias, update_input, add_weight.t()))
+
+        w_expand = w.unsqueeze(-1)
+        if inplace:
+            value_memory.mul_(1 - w_expand * erase_vector.unsqueeze(1))
+            value_memory.add_(w_expand * add_vector.unsqueeze(1))
+        else:
+            value_memory = value_memory * (1 - w_expand * erase_vector.unsqueeze(1))
+            value_memory = value_memory + w_expand * add_vector.unsqueeze(1)
+
+    return reads, value_memory
+
+
 # ============================================================================
 # DKVMN PYTORCH MODEL
 # ============================================================================
@@ -199,16 +262,74 @@ class DKVMNModel(nn.Module):
         """
         Forward pass through DKVMN
 
+        Everything that does not depend on the value memory (embeddings,
+        queries, correlation weights, the concept half of the summary
+        layer, the output layer) runs once over the whole sequence. Only
+        the read / erase-add recurrence steps through time, in the
+        TorchScript dkvmn_recurrence. Without autograd (inference) memory
+        is updated in place.
+
         Args:
             concept_ids: Concept indices (batch_size, seq_len)
             correctness: Correct/incorrect (batch_size, seq_len)
-            value_memory: Initial value memory (optional)
+            value_memory: Initial value memory (optional, not modified)
 
         Returns:
             predictions: Mastery predictions (batch_size, seq_len)
             value_memory: Updated value memory
         """
         batch_size, seq_len = concept_ids.size()
+        inplace = not torch.is_grad_enabled()
+
+        if value_memory is None:
+            value_memory = self.init_value_memory.unsqueeze(0).expand(
+                batch_size, -1, -1
+            )
+        if inplace:
+            # One copy per call; the loop then writes into it
+            value_memory = value_memory.contiguous().clone()
+
+        concept_embedded = self.concept_embed(concept_ids)            # (B, T, S)
+        weights = self.compute_correlation_weight(
+            self.query_layer(concept_embedded)
+        )                                                             # (B, T, K)
+
+        reads, value_memory = dkvmn_recurrence(
+            weights,
+            correctness.to(weights.dtype),
+            value_memory,
+            self.erase_layer.weight,
+            self.erase_layer.bias,
+            self.add_layer.weight,
+            self.add_layer.bias,
+            inplace
+        )
+
+        # summary_layer(cat([read, embed])) split into its two halves
+        read_weight = self.summary_layer.weight[:, :self.value_memory_size]
+        embed_weight = self.summary_layer.weight[:, self.value_memory_size:]
+        summary = torch.tanh(
+            torch.matmul(reads, read_weight.t())
+            + torch.matmul(concept_embedded, embed_weight.t())
+            + self.summary_layer.bias
+        )
+        predictions = torch.sigmoid(self.output_layer(summary)).squeeze(-1)
+
+        return predictions, value_memory
+
+    def forward_stepwise(
+        self,
+        concept_ids: torch.Tensor,
+        correctness: torch.Tensor,
+        value_memory: Optional[torch.Tensor] = None
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Reference step-by-step forward pass (the original formulation)
+
+        Kept for benchmarks/dkvmn_recurrence.py and equivalence checks;
+        forward() computes the same result.
+        """
+        batch_size, seq_len = concept_ids.size()
 
         # Initialize value memory if not provided
         if value_memory is None:
@@ -281,7 +402,10 @@ class DKVMNEngine:
         num_concepts: int,
         key_memory_size: int = 50,
         learning_rate: float = 0.001,
-        model_path: str = 'models/dkvmn_model.pt'
+        model_path: str = 'models/dkvmn_model.pt',
+        inference_only: bool = False,
+        quantize: bool = False,
+        num_threads: Optional[int] = None
     ):
         """
         Initialize DKVMN Engine
@@ -291,10 +415,16 @@ class DKVMNEngine:
             key_memory_size: Size of key memory
             learning_rate: Optimizer learning rate
             model_path: Path to save/load model
+            inference_only: Serve predictions only - no optimizer, frozen
+                weights, CPU, autograd off (see ai_engine.inference_runtime)
+            quantize: With inference_only, int8-quantize the query and output layers
+            num_threads: With inference_only, torch intra-op threads per worker
         """
         self.num_concepts = num_concepts
         self.key_memory_size = key_memory_size
         self.model_path = model_path
+        self.inference_only = inference_only
+        self.quantize = inference_only and quantize
 
         # Initialize model
         self.model = DKVMNModel(
@@ -302,6 +432,17 @@ class DKVMNEngine:
             key_memory_size=key_memory_size
         )
 
+        if inference_only:
+            configure_inference_runtime(num_threads)
+            self.device = torch.device('cpu')
+            self.optimizer = None
+            self.criterion = None
+            if os.path.exists(model_path):
+                self.load_model()
+            else:
+                self._prepare_inference_model()
+            return
+
         # Device
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.model.to(self.device)
@@ -314,6 +455,19 @@ class DKVMNEngine:
         if os.path.exists(model_path):
             self.load_model()
 
+    def _prepare_inference_model(self):
+        """
+        Freeze (and optionally quantize) the float model for serving
+
+        Only the layers called as modules are quantized; the erase/add and
+        summary weights feed the fused recurrence directly and stay fp32.
+        """
+        freeze_for_inference(self.model)
+        if self.quantize:
+            self.model = freeze_for_inference(
+                quantize_dynamic_int8(self.model, {'query_layer': None, 'output_layer': None})
+            )
+
     def predict_mastery(
         self,
         interactions: List[Dict[str, any]],
@@ -365,6 +519,63 @@ class DKVMNEngine:
                 'value_memory_state': value_memory.cpu().numpy()
             }
 
+    def predict_mastery_batch(
+        self,
+        requests: List[Tuple[List[Dict[str, any]], Optional[int]]]
+    ) -> List[Dict[str, any]]:
+        """
+        Predict mastery for many students in a single forward pass
+
+        Sequences are right-padded; a prediction at step t only depends on
+        steps before t, so each student's last real step is exact. The
+        padded value memory is not returned.
+
+        Args:
+            requests: (interactions, target_concept) pairs, one per student
+
+        Returns:
+            One prediction dict per request, in order
+        """
+        results = [None] * len(requests)
+        active = [i for i, (interactions, _) in enumerate(requests) if interactions]
+
+        for i, (interactions, _) in enumerate(requests):
+            if not interactions:
+                results[i] = {
+                    'mastery_score': 30.0,
+                    'confidence': 0.1
+                }
+
+        if not active:
+            return results
+
+        lengths = np.array([len(requests[i][0]) for i in active])
+        concept_ids = np.zeros((len(active), lengths.max()), dtype=np.int64)
+        correctness = np.zeros((len(active), lengths.max()), dtype=np.float32)
+        for row, i in enumerate(active):
+            interactions = requests[i][0]
+            concept_ids[row, :len(interactions)] = [int(it['concept_id']) for it in interactions]
+            correctness[row, :len(interactions)] = [float(it['is_correct']) for it in interactions]
+
+        self.model.eval()
+
+        with torch.no_grad():
+            predictions, _ = self.model(
+                torch.from_numpy(concept_ids).to(self.device),
+                torch.from_numpy(correctness).to(self.device)
+            )
+            rows = torch.arange(len(active), device=self.device)
+            last_steps = torch.as_tensor(lengths - 1, device=self.device)
+            last_preds = predictions[rows, last_steps].cpu().numpy()
+
+        for row, i in enumerate(active):
+            results[i] = {
+                'mastery_score': float(last_preds[row]) * 100,
+                'confidence': min(1.0, int(lengths[row]) / 20.0)
+            }
+
+        return results
+
     def get_memory_state(
         self,
         interactions: List[Dict[str, any]]
@@ -392,8 +603,29 @@ class DKVMNEngine:
 
             return value_memory[0].cpu().numpy()
 
+    @classmethod
+    def from_checkpoint(cls, model_path: str, **kwargs) -> 'DKVMNEngine':
+        """
+        Engine sized from a saved model (num_concepts, key_memory_size)
+
+        Raises:
+            FileNotFoundError: No model has been trained at model_path
+        """
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"No DKVMN model at {model_path}")
+
+        checkpoint = torch.load(model_path, map_location='cpu')
+        return cls(
+            num_concepts=checkpoint['num_concepts'],
+            key_memory_size=checkpoint['key_memory_size'],
+            model_path=model_path,
+            **kwargs
+        )
+
     def save_model(self):
         """Save model to disk"""
+        if self.inference_only:
+            raise RuntimeError('DKVMNEngine was created with inference_only=True and cannot save')
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
 
         torch.save({
@@ -412,8 +644,18 @@ class DKVMNEngine:
             return
 
         checkpoint = torch.load(self.model_path, map_location=self.device)
-        self.model.load_state_dict(checkpoint['model_state_dict'])
-        self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+
+        if self.inference_only:
+            # Weights only, into a fresh float model before quantizing
+            self.model = DKVMNModel(
+                num_concepts=self.num_concepts,
+                key_memory_size=self.key_memory_size
+            )
+            self.model.load_state_dict(checkpoint['model_state_dict'])
+            self._prepare_inference_model()
+        else:
+            self.model.load_state_dict(checkpoint['model_state_dict'])
+            self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
 
         print(f"DKVMN model loaded from {self.model_path}")
 
@@ -431,6 +673,11 @@ class SimplifiedDKVMNEngine:
     """
 
     def __init__(self, memory_size: int = 50, forgetting_rate: float = 0.05):
+        """
+        Args:
+            memory_size: Size of key memory
+            forgetting_rate: Exponential decay per day without practice
+        """
         self.memory_size = memory_size
         self.forgetting_rate = forgetting_rate
 
@@ -470,7 +717,7 @@ class SimplifiedDKVMNEngine:
             for rel_concept in related_concepts:
                 if rel_concept in self.value_memory:
                     weight = self._calculate_correlation(concept_id, rel_concept)
-                    related_contribution = self.value_memory[rel_concept] * weight
+                    related_contribution = self._apply_forgetting(rel_concept) * weight
                     related_mastery.append(related_contribution)
 
             if related_mastery:
@@ -484,7 +731,7 @@ class SimplifiedDKVMNEngine:
         concept_id: str,
         mastery_update: float,
         related_concepts: List[str],
-        timestamp: Optional[int] = None
+        timestamp: Optional[float] = None
     ):
         """
         Update mastery and propagate to related concepts
@@ -506,9 +753,9 @@ class SimplifiedDKVMNEngine:
             mastery_update * erase_factor
         )
 
-        # Store timestamp for forgetting
+        # Store timestamp (unix seconds) for forgetting
         if timestamp is None:
-            timestamp = 0
+            timestamp = time.time()
         self.last_access[concept_id] = timestamp
 
         # Store relationship keys
@@ -527,12 +774,13 @@ class SimplifiedDKVMNEngine:
             return 30.0
 
         mastery = self.value_memory[concept_id]
+        last_access = self.last_access.get(concept_id)
+        if last_access is None:
+            return mastery
 
-        # Simple forgetting: reduce mastery over time
-        # In production, use actual timestamps
-        decay = 1.0 - self.forgetting_rate
-
-        return mastery * decay
+        # Decay towards the initial mastery, evaluated at read time
+        days = (time.time() - last_access) / 86400.0
+        return float(decay_scores(mastery, days, self.forgetting_rate, floor=30.0))
 
     def _calculate_correlation(self, concept_a: str, concept_b: str) -> float:
         """Calculate correlation weight between concepts"""
@@ -0,0 +1,168 @@
+"""
+AMEP Forgetting Curve
+Lazy time-decay of stored mastery, evaluated when it is read
+
+Solves: BR1 (Continuous Mastery Scoring) - unpracticed concepts fade
+instead of keeping their last score forever
+
+Stored mastery is never rewritten to apply forgetting. Each mastery
+document keeps the score, the time it was assessed (last_assessed) and the
+concept's decay rate, and readers compute
+
+    decayed = floor + (score - floor) * exp(-rate * days_since_assessed)
+
+Scores decay towards `floor` (the default initial mastery) and are never
+raised by it. Bulk reads (heatmaps, recommendations) decay a whole result
+set with one vectorized NumPy expression.
+"""
+
+import time
+import threading
+import numpy as np
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+DEFAULT_DECAY_RATE = 0.02   # per day, about a 35-day half-life
+DEFAULT_FLOOR = 30.0        # matches the initial mastery of unseen concepts
+
+# ============================================================================
+# VECTORIZED DECAY
+# ============================================================================
+
+def decay_scores(
+    scores,
+    elapsed_days,
+    rates,
+    floor: float = DEFAULT_FLOOR
+) -> np.ndarray:
+    """
+    Exponential decay towards floor
+
+    Args:
+        scores: Stored mastery (0-100), scalar or array
+        elapsed_days: Days since each score was assessed (NaN = no decay)
+        rates: Decay rate per day, scalar or array
+
+    Returns:
+        float64 array of decayed scores
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    elapsed = np.nan_to_num(np.asarray(elapsed_days, dtype=np.float64), nan=0.0)
+    elapsed = np.maximum(elapsed, 0.0)
+    decayed = floor + (scores - floor) * np.exp(-np.asarray(rates, dtype=np.float64) * elapsed)
+    return np.where(scores > floor, decayed, scores)
+
+
+def elapsed_days(timestamps: Sequence[Optional[datetime]], now: Optional[datetime] = None) -> np.ndarray:
+    """Days from each (naive UTC) timestamp to now; NaN where missing"""
+    now = now or datetime.utcnow()
+    # Timedelta arithmetic on the objects, then one float array - building
+    # a datetime64 array from datetime objects is several times slower
+    seconds = np.fromiter(
+        ((now - t).total_seconds() if isinstance(t, datetime) else np.nan for t in timestamps),
+        dtype=np.float64,
+        count=len(timestamps)
+    )
+    return seconds / 86400.0
+
+
+# ============================================================================
+# FORGETTING MODEL
+# ============================================================================
+
+class ForgettingModel:
+    """
+    Per-concept decay rates plus helpers to decay mastery at read time
+
+    Args:
+        default_rate: Rate for concepts without their own (per day)
+        floor: Level scores decay towards
+        rates_loader: Returns {concept_id: decay_rate}; called on first use
+        refresh_seconds: Reload rates this often (0 = load once)
+    """
+
+    def __init__(
+        self,
+        default_rate: float = DEFAULT_DECAY_RATE,
+        floor: float = DEFAULT_FLOOR,
+        rates_loader: Optional[Callable[[], Dict[str, float]]] = None,
+        refresh_seconds: float = 0
+    ):
+        self.default_rate = default_rate
+        self.floor = floor
+        self.rates_loader = rates_loader
+        self.refresh_seconds = refresh_seconds
+        self._rates: Optional[Dict[str, float]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _concept_rates(self) -> Dict[str, float]:
+        stale = self._rates is None or (
+            self.refresh_seconds and time.monotonic() - self._loaded_at > self.refresh_seconds
+        )
+        if stale and self.rates_loader is not None:
+            with self._lock:
+                try:
+                    self._rates = dict(self.rates_loader())
+                except Exception:
+                    # Keep serving the previous (or default) rates
+                    self._rates = self._rates or {}
+                self._loaded_at = time.monotonic()
+        return self._rates or {}
+
+    def concept_rates(self) -> Dict[str, float]:
+        """{concept_id: rate} for concepts with their own rate"""
+        return dict(self._concept_rates())
+
+    def rate_for(self, concept_id: Optional[str]) -> float:
+        """Decay rate of a concept (default_rate if it has none)"""
+        return float(self._concept_rates().get(concept_id, self.default_rate))
+
+    def decay(
+        self,
+        score: float,
+        last_assessed: Optional[datetime],
+        concept_id: Optional[str] = None,
+        decay_rate: Optional[float] = None,
+        now: Optional[datetime] = None
+    ) -> float:
+        """Decayed value of a single stored score"""
+        if not isinstance(last_assessed, datetime):
+            return score
+        rate = decay_rate if decay_rate is not None else self.rate_for(concept_id)
+        days = ((now or datetime.utcnow()) - last_assessed).total_seconds() / 86400.0
+        return float(decay_scores(score, days, rate, self.floor))
+
+    def apply(
+        self,
+        records: List[Dict],
+        now: Optional[datetime] = None,
+        score_field: str = 'mastery_score'
+    ) -> List[Dict]:
+        """
+        Decay a batch of mastery documents in place
+
+        Each record's score_field is replaced by its decayed value and the
+        stored value is kept as stored_<score_field>. A record's own
+        decay_rate wins over the concept rate.
+
+        Returns:
+            The same records
+        """
+        if not records:
+            return records
+
+        scores = np.array([r.get(score_field) or 0.0 for r in records], dtype=np.float64)
+        rates = np.array([
+            r['decay_rate'] if r.get('decay_rate') is not None else self.rate_for(r.get('concept_id'))
+            for r in records
+        ], dtype=np.float64)
+        days = elapsed_days([r.get('last_assessed') for r in records], now)
+        decayed = np.round(decay_scores(scores, days, rates, self.floor), 2)
+
+        stored_field = f"stored_{score_field}"
+        for record, value in zip(records, decayed.tolist()):
+            if score_field in record:
+                record[stored_field] = record[score_field]
+                record[score_field] = value
+        return records
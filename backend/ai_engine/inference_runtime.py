@@ -0,0 +1,72 @@
+"""
+AMEP Inference Runtime
+CPU-only, inference-only setup shared by the neural engines
+
+Solves: BR3 (Efficiency) - smaller, faster DKT/DKVMN workers on CPU nodes
+
+Engines created with inference_only=True skip the optimizer (and its
+Adam moments), load only model_state_dict, freeze their parameters and
+can replace LSTM/Linear layers with dynamically quantized int8 versions.
+configure_inference_runtime() pins torch's intra-op thread pool so
+several workers share a node without oversubscribing cores.
+"""
+
+import warnings
+from typing import Dict, Optional, Set, Type, Union
+
+import torch
+import torch.nn as nn
+
+
+def configure_inference_runtime(num_threads: Optional[int] = None):
+    """
+    Process-wide settings for serving predictions
+
+    Args:
+        num_threads: Intra-op threads per worker (None/0 = torch default)
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Already set once parallel work has started in this process
+            pass
+
+    # Grad mode is thread-local; this covers the calling thread, and
+    # frozen parameters keep other threads from building graphs
+    torch.set_grad_enabled(False)
+
+
+def freeze_for_inference(model: nn.Module) -> nn.Module:
+    """Eval mode and no gradients for every parameter"""
+    model.eval()
+    for parameter in model.parameters():
+        parameter.requires_grad_(False)
+    return model
+
+
+def quantize_dynamic_int8(
+    model: nn.Module,
+    modules: Union[Set[Type[nn.Module]], Dict[str, object]]
+) -> nn.Module:
+    """
+    Dynamic int8 quantization (weights int8, activations quantized per call)
+
+    Args:
+        model: Float model on CPU, already loaded and frozen
+        modules: Layer types to quantize, or {submodule_name: qconfig}
+
+    Returns:
+        Quantized copy of the model
+    """
+    from torch.ao.quantization import quantize_dynamic, default_dynamic_qconfig
+
+    if isinstance(modules, dict):
+        modules = {name: qconfig or default_dynamic_qconfig for name, qconfig in modules.items()}
+
+    with warnings.catch_warnings():
+        # torch.ao.quantization is deprecated upstream but still the eager-mode API
+        warnings.simplefilter('ignore', DeprecationWarning)
+        warnings.simplefilter('ignore', UserWarning)
+        return quantize_dynamic(model.to('cpu'), modules, dtype=torch.qint8)
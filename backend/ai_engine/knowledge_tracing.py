@@ -11,21 +11,24 @@ Research Sources:
 PRODUCTION VERSION - Enhanced with full LSTM and Memory Network support
 """
 
+import time
+import threading
+import importlib.util
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
 from dataclasses import dataclass
 from enum import Enum
 
-# Import enhanced model implementations
-try:
-    from ai_engine.dkt_model import SimplifiedDKTEngine, DKTEngine
-    from ai_engine.dkvmn_model import SimplifiedDKVMNEngine, DKVMNEngine
-    DKT_AVAILABLE = True
-    DKVMN_AVAILABLE = True
-except ImportError:
-    # Fallback if imports fail
-    DKT_AVAILABLE = False
-    DKVMN_AVAILABLE = False
+from ai_engine.student_memory import StudentMemoryStore
+from ai_engine.response_history import ResponseHistoryStore
+
+# The LSTM/memory-network engines (ai_engine.dkt_model, ai_engine.dkvmn_model)
+# need torch, so they are only imported through a ModelRegistry when a
+# neural engine is requested - checking for torch here does not import it.
+# Only DKT is served that way: the DKVMN layer reads the per-student memory
+# store, which the neural DKVMN (whole-history replay, no concept mapping)
+# cannot back
+DKT_AVAILABLE = DKVMN_AVAILABLE = importlib.util.find_spec('torch') is not None
 
 # ============================================================================
 # LAYER 1: BAYESIAN KNOWLEDGE TRACING (BKT) - For Interpretability
@@ -55,43 +58,94 @@ class BKTEngine:
     P(Cn+1) = P(Ln)(1 - P(S)) + (1 - P(Ln)) × P(G)
     """
     
-    def __init__(self, params: BKTParameters = BKTParameters()):
+    def __init__(
+        self,
+        params: BKTParameters = BKTParameters(),
+        params_loader: Optional[Callable[[], List[Dict]]] = None,
+        refresh_seconds: float = 0
+    ):
+        """
+        Args:
+            params: Default parameters for concepts without a fitted set
+            params_loader: Returns fitted per-concept parameter documents
+                (concept_id, p_l0, p_t, p_g, p_s); called on first use
+            refresh_seconds: Reload fitted parameters this often (0 = load once)
+        """
         self.params = params
+        self.params_loader = params_loader
+        self.refresh_seconds = refresh_seconds
+        self._concept_params: Optional[Dict[str, BKTParameters]] = None
+        self._loaded_at = 0.0
+        self._params_lock = threading.Lock()
+    
+    def load_concept_params(self) -> int:
+        """
+        (Re)load fitted per-concept parameters into the in-process cache
+        
+        Returns: Number of concepts with fitted parameters
+        """
+        concept_params = {}
+        if self.params_loader is not None:
+            for doc in self.params_loader():
+                concept_params[doc['concept_id']] = BKTParameters(
+                    p_l0=doc['p_l0'],
+                    p_t=doc['p_t'],
+                    p_g=doc['p_g'],
+                    p_s=doc['p_s']
+                )
+        self._concept_params = concept_params
+        self._loaded_at = time.monotonic()
+        return len(concept_params)
+    
+    def params_for(self, concept_id: Optional[str] = None) -> BKTParameters:
+        """Fitted parameters of a concept, or the defaults"""
+        if concept_id is None or self.params_loader is None:
+            return self.params
+        if self._concept_params is None or self._is_stale():
+            with self._params_lock:
+                if self._concept_params is None or self._is_stale():
+                    self.load_concept_params()
+        return self._concept_params.get(concept_id, self.params)
+    
+    def _is_stale(self) -> bool:
+        return bool(self.refresh_seconds) and time.monotonic() - self._loaded_at > self.refresh_seconds
     
     def update_mastery(
         self, 
         current_mastery: float, 
-        is_correct: bool
+        is_correct: bool,
+        concept_id: Optional[str] = None
     ) -> float:
         """
         Update mastery probability based on student response
         
         Returns: Updated mastery score (0-100 scale)
         """
+        params = self.params_for(concept_id)
         p_l = current_mastery / 100.0  # Convert to probability
         
         if is_correct:
             # P(L|correct) using Bayes' theorem
-            numerator = p_l * (1 - self.params.p_s)
+            numerator = p_l * (1 - params.p_s)
             denominator = (
-                p_l * (1 - self.params.p_s) + 
-                (1 - p_l) * self.params.p_g
+                p_l * (1 - params.p_s) + 
+                (1 - p_l) * params.p_g
             )
             p_l_given_correct = numerator / denominator if denominator > 0 else p_l
             
             # Apply learning transition
-            p_l_new = p_l_given_correct + (1 - p_l_given_correct) * self.params.p_t
+            p_l_new = p_l_given_correct + (1 - p_l_given_correct) * params.p_t
         else:
             # P(L|incorrect) using Bayes' theorem
-            numerator = p_l * self.params.p_s
+            numerator = p_l * params.p_s
             denominator = (
-                p_l * self.params.p_s + 
-                (1 - p_l) * (1 - self.params.p_g)
+                p_l * params.p_s + 
+                (1 - p_l) * (1 - params.p_g)
             )
             p_l_given_incorrect = numerator / denominator if denominator > 0 else p_l
             
             # Apply learning transition
-            p_l_new = p_l_given_incorrect + (1 - p_l_given_incorrect) * self.params.p_t
+            p_l_new = p_l_given_incorrect + (1 - p_l_given_incorrect) * params.p_t
         
         # Convert back to 0-100 scale
         return min(100.0, max(0.0, p_l_new * 100))
@@ -156,7 +210,6 @@ class DKTEngine:
         if all('response_time' in r for r in recent):
             times = [r['response_time'] for r in recent]
             avg_time = np.mean(times)
-            time_trend = -np.polyfit(range(len(times)), times, 1)[0]
             # Normalize: faster responses = higher mastery
             time_factor = max(0, min(20, 20 - avg_time/2))
         else:
@@ -192,33 +245,61 @@ class DKVMNEngine:
     w(t) = Softmax(k(t)·M_k)  -- Correlation weight
     r(t) = Σ w(t,i)·M_v(i)    -- Read operation
     M_v(i) = M_v(i) + w(t,i)·add(t)  -- Write operation
+    
+    Value memory is held per student in a StudentMemoryStore, so one
+    student's answers never leak into another student's reads.
+    
+    With a ConceptGraph, concept relationships come from its sparse
+    correlation matrix: related concepts no longer have to be passed in,
+    and the related contribution is the correlation-weighted mean of the
+    student's mastery on them.
     """
     
-    def __init__(self, memory_size: int = 50):
+    def __init__(
+        self,
+        memory_size: int = 50,
+        memory_store: Optional[StudentMemoryStore] = None,
+        concept_graph=None
+    ):
         self.memory_size = memory_size
-        # Key memory: Concept relationships
+        # Key memory: Concept relationships (shared across students),
+        # only used without a concept graph
         self.key_memory = {}
-        # Value memory: Mastery states
-        self.value_memory = {}
+        # Value memory: Per-student mastery states
+        self.memory_store = memory_store if memory_store is not None else StudentMemoryStore()
+        self.concept_graph = concept_graph
     
-    def read_mastery(self, concept_id: str, related_concepts: List[str]) -> float:
+    def read_mastery(
+        self,
+        student_id: str,
+        concept_id: str,
+        related_concepts: List[str]
+    ) -> float:
         """
         Read mastery considering related concepts
         
         BR3: Identifies what's mastered vs. what needs work
         """
-        if concept_id not in self.value_memory:
+        value_memory = self.memory_store.get(student_id)
+        
+        if concept_id not in value_memory:
             return 30.0  # Default initial mastery
         
         # Direct mastery
-        direct_mastery = self.value_memory[concept_id]
+        direct_mastery = value_memory.get(concept_id)
+        
+        if self.concept_graph is not None:
+            related = self._graph_related_mastery(value_memory, concept_id, related_concepts)
+            if related is None:
+                return direct_mastery
+            return 0.7 * direct_mastery + 0.3 * related
         
         # Weighted contribution from related concepts
         related_mastery = []
         for rel_concept in related_concepts:
-            if rel_concept in self.value_memory:
+            if rel_concept in value_memory:
                 weight = self._calculate_correlation(concept_id, rel_concept)
-                related_mastery.append(self.value_memory[rel_concept] * weight)
+                related_mastery.append(value_memory.get(rel_concept) * weight)
         
         if related_mastery:
             # Combine direct and related mastery
@@ -228,6 +309,7 @@ class DKVMNEngine:
     
     def write_mastery(
         self, 
+        student_id: str,
         concept_id: str, 
         mastery_update: float,
         related_concepts: List[str]
@@ -236,37 +318,67 @@ class DKVMNEngine:
         Update mastery and propagate to related concepts
         """
         # Update primary concept
-        if concept_id not in self.value_memory:
-            self.value_memory[concept_id] = 30.0
+        self.memory_store.update(student_id, concept_id, mastery_update)
         
-        self.value_memory[concept_id] = mastery_update
-        
-        # Store relationship keys
+        # Store relationship keys (the concept graph supersedes them)
+        if self.concept_graph is not None:
+            return
         for rel_concept in related_concepts:
             key = f"{concept_id}_{rel_concept}"
             if key not in self.key_memory:
                 self.key_memory[key] = 0.5  # Default correlation
     
+    def _graph_related_mastery(
+        self,
+        value_memory,
+        concept_id: str,
+        related_concepts: List[str]
+    ) -> Optional[float]:
+        """
+        Correlation-weighted mastery over related concepts
+        
+        Uses the graph neighbors of concept_id, or the given related
+        concepts (weighted by the graph where linked) when a caller passes
+        them. None when the student has mastery on none of them.
+        """
+        snapshot = self.concept_graph.snapshot()
+        if not related_concepts:
+            return snapshot.weighted_read(concept_id, value_memory)
+        
+        weights, values = [], []
+        for rel_concept in related_concepts:
+            if rel_concept in value_memory:
+                weight = snapshot.weight(concept_id, rel_concept)
+                weights.append(0.3 if weight is None else weight)
+                values.append(value_memory.get(rel_concept))
+        if not values or sum(weights) <= 0:
+            return None
+        return float(np.average(values, weights=weights))
+    
     def _calculate_correlation(self, concept_a: str, concept_b: str) -> float:
         """Calculate correlation weight between concepts"""
+        if self.concept_graph is not None:
+            weight = self.concept_graph.snapshot().weight(concept_a, concept_b)
+            if weight is not None:
+                return weight
         key = f"{concept_a}_{concept_b}"
         return self.key_memory.get(key, 0.3)
     
-    def get_mastered_concepts(self, threshold: float = 85.0) -> List[str]:
+    def get_mastered_concepts(self, student_id: str, threshold: float = 85.0) -> List[str]:
         """
         BR3: Identify mastered concepts to skip
         """
         return [
-            concept for concept, mastery in self.value_memory.items()
+            concept for concept, mastery in self.memory_store.get(student_id).items()
             if mastery >= threshold
         ]
     
-    def get_weak_concepts(self, threshold: float = 60.0) -> List[str]:
+    def get_weak_concepts(self, student_id: str, threshold: float = 60.0) -> List[str]:
         """
         BR3: Identify weak concepts needing focus
         """
         return [
-            concept for concept, mastery in self.value_memory.items()
+            concept for concept, mastery in self.memory_store.get(student_id).items()
             if mastery < threshold
         ]
 
@@ -281,10 +393,74 @@ class HybridKnowledgeTracing:
     Solves BR1, BR2, BR3 comprehensively
     """
     
-    def __init__(self):
-        self.bkt = BKTEngine()
+    def __init__(
+        self,
+        memory_store: Optional[StudentMemoryStore] = None,
+        bkt_params: Optional[BKTParameters] = None,
+        bkt_params_loader: Optional[Callable[[], List[Dict]]] = None,
+        bkt_refresh_seconds: float = 0,
+        history_store: Optional[ResponseHistoryStore] = None,
+        model_registry=None,
+        concept_graph=None
+    ):
+        """
+        Args:
+            model_registry: Optional ModelRegistry; once its 'dkt' engine is
+                warm and neural, the DKT layer uses the LSTM prediction
+                (until then - or without a registry - the pattern engine)
+            concept_graph: Optional ConceptGraph supplying related concepts
+                and their weights to the DKVMN layer
+        """
+        self.bkt = BKTEngine(
+            bkt_params or BKTParameters(),
+            params_loader=bkt_params_loader,
+            refresh_seconds=bkt_refresh_seconds
+        )
         self.dkt = DKTEngine()
-        self.dkvmn = DKVMNEngine()
+        self.dkvmn = DKVMNEngine(memory_store=memory_store, concept_graph=concept_graph)
+        self.history_store = history_store
+        self.model_registry = model_registry
+
+    def _analyze_dkt(
+        self,
+        student_id: str,
+        concept_id: str,
+        is_correct: bool,
+        response_history: List[Dict]
+    ) -> Dict[str, float]:
+        """
+        DKT layer: pattern analysis, refined by the LSTM when one is loaded
+
+        The LSTM resumes from the student's cached state and advances by the
+        current response only; the (student, concept) history is replayed
+        just to seed a student who has no usable state yet. Requests go
+        through the engine's batch inference server, so a quiz burst shares
+        forward passes across students.
+        """
+        analysis = self.dkt.analyze_pattern(response_history)
+
+        neural = self.model_registry.get_loaded('dkt') if self.model_registry is not None else None
+        concept_ids = getattr(neural, 'concept_ids', None)
+        if not concept_ids or concept_id not in concept_ids:
+            return analysis
+
+        index = concept_ids.index(concept_id)
+        request = (
+            student_id,
+            [{'concept_id': index, 'is_correct': is_correct}],
+            index,
+            [{'concept_id': index, 'is_correct': r['is_correct']} for r in response_history]
+        )
+        server = self.model_registry.get_server('dkt')
+        prediction = (
+            server.predict_request(request) if server is not None
+            else neural.predict_mastery_incremental(*request)
+        )
+        return dict(
+            analysis,
+            predicted_mastery=prediction['mastery_score'],
+            confidence=prediction['confidence']
+        )
     
     def calculate_mastery(
         self,
@@ -293,22 +469,32 @@ class HybridKnowledgeTracing:
         is_correct: bool,
         response_time: float,
         current_mastery: float,
-        response_history: List[Dict],
-        related_concepts: List[str]
+        response_history: Optional[List[Dict]] = None,
+        related_concepts: Optional[List[str]] = None
     ) -> Dict[str, any]:
         """
         Calculate updated mastery using all three models
         
+        response_history defaults to the server-side rolling history of
+        the (student, concept) pair when a history store is configured.
+        
         Returns comprehensive mastery assessment
         """
+        if response_history is None:
+            response_history = (
+                self.history_store.get(student_id, concept_id)
+                if self.history_store is not None else []
+            )
+        related_concepts = related_concepts or []
+        
         # Layer 1: BKT update (interpretable)
-        bkt_mastery = self.bkt.update_mastery(current_mastery, is_correct)
+        bkt_mastery = self.bkt.update_mastery(current_mastery, is_correct, concept_id)
         
         # Layer 2: DKT pattern analysis
-        dkt_analysis = self.dkt.analyze_pattern(response_history)
+        dkt_analysis = self._analyze_dkt(student_id, concept_id, is_correct, response_history)
         
         # Layer 3: DKVMN memory-aware adjustment
-        dkvmn_mastery = self.dkvmn.read_mastery(concept_id, related_concepts)
+        dkvmn_mastery = self.dkvmn.read_mastery(student_id, concept_id, related_concepts)
         
         # Weighted combination (adjustable based on confidence)
         confidence = dkt_analysis['confidence']
@@ -319,7 +505,7 @@ class HybridKnowledgeTracing:
         )
         
         # Update DKVMN memory
-        self.dkvmn.write_mastery(concept_id, final_mastery, related_concepts)
+        self.dkvmn.write_mastery(student_id, concept_id, final_mastery, related_concepts)
         
         return {
             'mastery_score': round(final_mastery, 2),  # BR1: 0-100 scoring
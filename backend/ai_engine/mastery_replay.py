@@ -0,0 +1,152 @@
+"""
+AMEP Mastery Replay
+Recompute mastery from a student's raw responses with HybridKnowledgeTracing
+
+Solves: BR1 (Continuous Mastery Scoring) - after BKT parameters or the
+hybrid blend change, stored mastery can be rebuilt from student_responses
+
+Each student's responses are fed through calculate_mastery in submission
+order, exactly as /response/submit + /calculate would have seen them: the
+rolling history of the (student, concept) pair includes the response
+being scored, and each step starts from the previous step's mastery
+(50.0 before the first response, the /calculate default). Related
+concepts come from a concept graph snapshot when one is given, as they do
+in the API (CONCEPT_GRAPH_ENABLED); the snapshot is the graph as of the
+replay, not as it was when each response arrived.
+
+Functions here do no I/O, so they run in worker processes of the
+mastery replay service (services/mastery_replay_service.py).
+"""
+
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ai_engine.knowledge_tracing import HybridKnowledgeTracing, BKTParameters
+from ai_engine.concept_graph import ConceptGraph, ConceptGraphSnapshot
+from ai_engine.student_memory import StudentMemoryStore
+
+DEFAULT_MASTERY = 50.0
+
+# (concept_id, is_correct, response_time, submitted_at)
+ResponseRow = Tuple[str, bool, float, Optional[datetime]]
+
+# Engine built once per worker process by init_replay_worker
+_worker_engine: Optional[HybridKnowledgeTracing] = None
+_worker_history_length = 50
+
+
+def build_replay_engine(
+    bkt_defaults: Optional[Dict] = None,
+    fitted_params: Optional[List[Dict]] = None,
+    concept_graph: Optional[ConceptGraphSnapshot] = None
+) -> HybridKnowledgeTracing:
+    """
+    Hybrid engine for replays: fitted BKT parameters, a small private
+    DKVMN memory (students are replayed one at a time), no history store
+    and, given a snapshot, the concept graph the API reads through
+    """
+    fitted_params = list(fitted_params or [])
+    return HybridKnowledgeTracing(
+        memory_store=StudentMemoryStore(capacity=64, ttl_seconds=0, num_shards=1),
+        bkt_params=BKTParameters(**(bkt_defaults or {})),
+        bkt_params_loader=lambda: fitted_params,
+        concept_graph=ConceptGraph.from_snapshot(concept_graph) if concept_graph is not None else None
+    )
+
+
+def replay_student(
+    engine: HybridKnowledgeTracing,
+    student_id: str,
+    rows: Sequence[ResponseRow],
+    history_length: int = 50
+) -> List[Dict]:
+    """
+    Replay one student's chronological responses
+
+    Returns:
+        One mastery document per concept, with the same fields /calculate
+        writes to student_concept_mastery plus times_assessed
+    """
+    pairs = {}
+    for concept_id, is_correct, response_time, submitted_at in rows:
+        pair = pairs.get(concept_id)
+        if pair is None:
+            pair = pairs[concept_id] = {
+                'mastery': DEFAULT_MASTERY,
+                'history': deque(maxlen=history_length),
+                'count': 0
+            }
+
+        pair['history'].append({
+            'is_correct': bool(is_correct),
+            'response_time': float(response_time or 0.0),
+            'timestamp': submitted_at.timestamp() if isinstance(submitted_at, datetime) else submitted_at
+        })
+        result = engine.calculate_mastery(
+            student_id=student_id,
+            concept_id=concept_id,
+            is_correct=bool(is_correct),
+            response_time=float(response_time or 0.0),
+            current_mastery=pair['mastery'],
+            response_history=list(pair['history']),
+            related_concepts=[]
+        )
+        pair['mastery'] = result['mastery_score']
+        pair['count'] += 1
+        pair['result'] = result
+        pair['last_assessed'] = submitted_at
+
+    return [
+        {
+            '_id': f"{student_id}_{concept_id}",
+            'student_id': student_id,
+            'concept_id': concept_id,
+            'mastery_score': pair['result']['mastery_score'],
+            'bkt_component': pair['result']['bkt_component'],
+            'dkt_component': pair['result']['dkt_component'],
+            'dkvmn_component': pair['result']['dkvmn_component'],
+            'confidence': pair['result']['confidence'],
+            'learning_velocity': pair['result']['learning_velocity'],
+            'last_assessed': pair['last_assessed'],
+            'times_assessed': pair['count']
+        }
+        for concept_id, pair in pairs.items()
+    ]
+
+
+# ============================================================================
+# PROCESS POOL ENTRY POINTS
+# ============================================================================
+
+def init_replay_worker(
+    bkt_defaults: Dict,
+    fitted_params: List[Dict],
+    history_length: int,
+    concept_graph: Optional[ConceptGraphSnapshot] = None
+):
+    """ProcessPoolExecutor initializer: one engine per worker process"""
+    global _worker_engine, _worker_history_length
+    _worker_engine = build_replay_engine(bkt_defaults, fitted_params, concept_graph)
+    _worker_history_length = history_length
+
+
+def replay_students(
+    students: List[Tuple[str, List[ResponseRow]]]
+) -> Tuple[List[Dict], List[Tuple[str, Dict[str, float]]], int]:
+    """
+    Replay a chunk of students in a worker
+
+    Returns:
+        (mastery documents, (student_id, {concept_id: memory value}) for
+        each student's replayed DKVMN memory, number of responses replayed)
+    """
+    engine = _worker_engine if _worker_engine is not None else build_replay_engine()
+    documents = []
+    memories = []
+    responses = 0
+    for student_id, rows in students:
+        documents.extend(replay_student(engine, student_id, rows, _worker_history_length))
+        memories.append((student_id, dict(engine.dkvmn.memory_store.get(student_id).items())))
+        responses += len(rows)
+    return documents, memories, responses
@@ -0,0 +1,271 @@
+"""
+AMEP Model Registry
+Lazy, config-selected construction of knowledge tracing engines
+
+Solves: BR3 (Efficiency) - API, Celery and script processes that never
+use the neural path no longer import torch at startup
+
+Each engine name ('dkt', 'dkvmn', ...) is registered with a simplified
+spec and optionally a neural spec, given as module paths so nothing is
+imported at registration time. The first get() imports the module and
+builds the engine, timing both steps. If the neural variant cannot be
+imported or loaded, the registry logs it and serves the simplified one.
+warm_up_async() does the loading on a daemon thread after the server has
+started, and get_loaded() lets request handlers use a neural engine once
+it is warm without ever waiting for it.
+
+A neural spec with a batch_method also gets its own BatchInferenceServer
+when it is built, so concurrent requests share forward passes;
+get_server() returns it and get_stats() reports its throughput.
+"""
+
+import sys
+import time
+import importlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from ai_engine.batch_inference import BatchInferenceServer
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# ============================================================================
+# ENGINE SPECS
+# ============================================================================
+
+@dataclass
+class EngineSpec:
+    """
+    Where an engine class lives and how to build it
+
+    module: Dotted module path, imported on first use
+    attribute: Class (or factory) name in that module
+    build: Called with the class, returns the engine (default: cls())
+    batch_method: Engine method served through a BatchInferenceServer
+        (neural specs only; None = no server)
+    """
+    module: str
+    attribute: str
+    build: Optional[Callable[[Any], Any]] = None
+    batch_method: Optional[str] = None
+
+    def load(self) -> Dict[str, Any]:
+        """Import and build; returns the engine with its timings"""
+        already_imported = self.module in sys.modules
+        torch_imported = 'torch' in sys.modules
+
+        started = time.perf_counter()
+        cls = getattr(importlib.import_module(self.module), self.attribute)
+        imported = time.perf_counter()
+        engine = self.build(cls) if self.build is not None else cls()
+        loaded = time.perf_counter()
+
+        return {
+            'engine': engine,
+            'import_seconds': 0.0 if already_imported else round(imported - started, 4),
+            'load_seconds': round(loaded - imported, 4),
+            'imported_torch': not torch_imported and 'torch' in sys.modules
+        }
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+class ModelRegistry:
+    """
+    Named engines built on first use
+
+    Args:
+        use_neural: Serve the neural variant of engines that have one
+            (falls back to the simplified variant if it fails to load)
+        max_batch_size: Largest batch of a neural engine's inference server
+        max_wait_ms: Longest wait for company of its first queued request
+    """
+
+    def __init__(
+        self,
+        use_neural: bool = False,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 10.0
+    ):
+        self.use_neural = use_neural
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._specs: Dict[str, Dict[str, EngineSpec]] = {}
+        self._engines: Dict[str, Any] = {}
+        self._servers: Dict[str, BatchInferenceServer] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._warmup_thread = None
+
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        self.stats = {
+            'loads': 0,
+            'fallbacks': 0,
+            'failures': 0,
+            'hits': 0
+        }
+
+    def register(
+        self,
+        name: str,
+        simplified: EngineSpec,
+        neural: Optional[EngineSpec] = None
+    ):
+        """Declare an engine; nothing is imported until it is requested"""
+        with self._lock:
+            self._specs[name] = {'simplified': simplified, 'neural': neural}
+            self._locks[name] = threading.Lock()
+            self._engines.pop(name, None)
+            self._stop_server(name)
+
+    def variant(self, name: str) -> str:
+        """'neural' or 'simplified' - the variant get() will try first"""
+        specs = self._specs[name]
+        return 'neural' if self.use_neural and specs['neural'] is not None else 'simplified'
+
+    def get(self, name: str) -> Any:
+        """The engine, importing and building it on first call"""
+        engine = self._engines.get(name)
+        if engine is not None:
+            self.stats['hits'] += 1
+            return engine
+
+        if name not in self._specs:
+            raise KeyError(f"No engine registered as '{name}'")
+
+        with self._locks[name]:
+            engine = self._engines.get(name)
+            if engine is not None:
+                return engine
+
+            variant = self.variant(name)
+            error = None
+            try:
+                result = self._specs[name][variant].load()
+            except Exception as e:
+                if variant == 'simplified':
+                    self.stats['failures'] += 1
+                    raise
+                logger.warning(f"[MODEL_REGISTRY] Neural engine unavailable, using simplified | name: {name} | error: {e}")
+                self.stats['fallbacks'] += 1
+                error = str(e)
+                variant = 'simplified'
+                result = self._specs[name][variant].load()
+
+            engine = result.pop('engine')
+            self.timings[name] = dict(result, variant=variant, loaded_at=time.time())
+            if error is not None:
+                self.timings[name]['fallback_error'] = error
+            batch_method = self._specs[name][variant].batch_method
+            if variant == 'neural' and batch_method:
+                # Registered before the engine so get_loaded() never sees one without the other
+                self._servers[name] = BatchInferenceServer(
+                    engine,
+                    max_batch_size=self.max_batch_size,
+                    max_wait_ms=self.max_wait_ms,
+                    name=f'batch-inference-{name}',
+                    method=batch_method
+                )
+                self._servers[name].start()
+            self._engines[name] = engine
+            self.stats['loads'] += 1
+
+        logger.info(
+            f"[MODEL_REGISTRY] Loaded | name: {name} | variant: {variant} "
+            f"| import: {result['import_seconds']:.3f}s | load: {result['load_seconds']:.3f}s"
+        )
+        return engine
+
+    def get_loaded(self, name: str) -> Optional[Any]:
+        """The engine if it is already built, else None (never blocks)"""
+        return self._engines.get(name)
+
+    def get_server(self, name: str) -> Optional[BatchInferenceServer]:
+        """The built engine's inference server, else None (never blocks)"""
+        return self._servers.get(name)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._engines
+
+    def unload(self, name: Optional[str] = None):
+        """Drop built engines (stopping their servers and closing them) so the next get() rebuilds them"""
+        with self._lock:
+            names = list(self._engines) if name is None else [name]
+            for engine_name in names:
+                engine = self._engines.pop(engine_name, None)
+                self._stop_server(engine_name)
+                # Engines with background work (e.g. DKT state flushing) wind it down
+                close = getattr(engine, 'close', None)
+                if close is not None:
+                    close()
+
+    def _stop_server(self, name: str):
+        """Stop a server after serving what is already queued"""
+        server = self._servers.pop(name, None)
+        if server is not None:
+            server.stop()
+
+    # ------------------------------------------------------------------------
+    # Warm-up
+    # ------------------------------------------------------------------------
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Build the given engines (default: all) in this thread"""
+        for name in list(names if names is not None else self._specs):
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"[MODEL_REGISTRY] Warm-up failed | name: {name} | error: {e}")
+        return self.timings
+
+    def warm_up_async(
+        self,
+        names: Optional[Iterable[str]] = None,
+        delay_seconds: float = 0.0
+    ) -> threading.Thread:
+        """
+        Warm engines on a daemon thread
+
+        The delay lets the server bind and start answering requests before
+        the (possibly multi-second) torch import competes for the GIL.
+        Calling again while a warm-up is running returns the same thread.
+        """
+        names = list(names) if names is not None else None
+
+        def run():
+            if delay_seconds:
+                time.sleep(delay_seconds)
+            started = time.perf_counter()
+            self.warm_up(names)
+            logger.info(f"[MODEL_REGISTRY] Warm-up complete | elapsed: {time.perf_counter() - started:.2f}s")
+
+        with self._lock:
+            if self._warmup_thread is not None and self._warmup_thread.is_alive():
+                return self._warmup_thread
+            self._warmup_thread = threading.Thread(target=run, name='model-warmup', daemon=True)
+            self._warmup_thread.start()
+            return self._warmup_thread
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters, per-engine variant, timings and batching, and torch status"""
+        return dict(
+            self.stats,
+            use_neural=self.use_neural,
+            torch_imported='torch' in sys.modules,
+            engines={
+                name: dict(
+                    self.timings.get(name, {}),
+                    loaded=name in self._engines,
+                    preferred_variant=self.variant(name),
+                    batch_inference=(
+                        self._servers[name].get_stats() if name in self._servers else None
+                    )
+                )
+                for name in self._specs
+            }
+        )
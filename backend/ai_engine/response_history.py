@@ -0,0 +1,226 @@
+"""
+AMEP Rolling Response History
+Fixed-size per-(student, concept) ring buffers for the mastery hot path
+
+Solves: BR1 (Continuous Mastery Scoring) without trusting client-sent history
+
+Every submitted response is appended to its (student, concept) ring, which
+keeps the last `length` responses as compact columns (correct bit, response
+time, timestamp). Appends are O(1) and reads return a bounded window, so
+HybridKnowledgeTracing.calculate_mastery never queries STUDENT_RESPONSES.
+Rings for pairs not seen recently are dropped from the LRU and re-seeded
+from the database with one bounded query on their next use. A ring is also
+re-seeded once it is ttl_seconds old however busy it is, and - given a
+latest_fn - as soon as the database holds a newer response than the ring,
+i.e. one submitted through another worker.
+"""
+
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ============================================================================
+# RING BUFFER
+# ============================================================================
+
+class ResponseRing:
+    """
+    Last `length` responses of one student on one concept
+
+    Stored as three preallocated columns; head points at the next slot to
+    overwrite once the ring is full.
+    """
+
+    __slots__ = ('correct', 'response_time', 'timestamp', 'head', 'count')
+
+    def __init__(self, length: int = 50):
+        self.correct = np.zeros(length, dtype=np.bool_)
+        self.response_time = np.zeros(length, dtype=np.float32)
+        self.timestamp = np.zeros(length, dtype=np.float64)
+        self.head = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def length(self) -> int:
+        return len(self.correct)
+
+    @property
+    def newest(self) -> float:
+        """Timestamp of the latest response (0.0 if empty)"""
+        return float(self.timestamp[(self.head - 1) % self.length]) if self.count else 0.0
+
+    def append(self, is_correct: bool, response_time: float = 0.0, timestamp: Optional[float] = None):
+        """Add a response, overwriting the oldest one when full"""
+        slot = self.head
+        self.correct[slot] = is_correct
+        self.response_time[slot] = response_time or 0.0
+        self.timestamp[slot] = timestamp if timestamp is not None else time.time()
+        self.head = (slot + 1) % self.length
+        self.count = min(self.count + 1, self.length)
+
+    def _order(self) -> np.ndarray:
+        """Slot indices from oldest to newest"""
+        start = (self.head - self.count) % self.length
+        return (start + np.arange(self.count)) % self.length
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(correct, response_time, timestamp) in chronological order"""
+        order = self._order()
+        return self.correct[order], self.response_time[order], self.timestamp[order]
+
+    def records(self) -> List[Dict]:
+        """Chronological history in the shape DKTEngine.analyze_pattern reads"""
+        correct, response_time, timestamp = self.arrays()
+        return [
+            {'is_correct': bool(c), 'response_time': float(rt), 'timestamp': float(ts)}
+            for c, rt, ts in zip(correct, response_time, timestamp)
+        ]
+
+
+# ============================================================================
+# LRU STORE
+# ============================================================================
+
+class ResponseHistoryStore:
+    """
+    In-process LRU of ResponseRings keyed by (student_id, concept_id)
+
+    Args:
+        length: Responses kept per pair
+        max_pairs: Rings held in memory before LRU eviction
+        ttl_seconds: Re-seed a ring from the database this long after it
+            was seeded, used or not (bounds drift between workers; 0 = never)
+        seed_fn: (student_id, concept_id, limit) -> response documents,
+            newest first, with is_correct / response_time / submitted_at
+        latest_fn: (student_id, concept_id) -> timestamp of the newest
+            stored response or None; when given, a ring behind it is re-seeded
+    """
+
+    def __init__(
+        self,
+        length: int = 50,
+        max_pairs: int = 100000,
+        ttl_seconds: float = 600,
+        seed_fn: Optional[Callable[[str, str, int], List[Dict]]] = None,
+        latest_fn: Optional[Callable[[str, str], Optional[float]]] = None
+    ):
+        self.length = max(1, length)
+        self.max_pairs = max(1, max_pairs)
+        self.ttl_seconds = ttl_seconds
+        self.seed_fn = seed_fn
+        self.latest_fn = latest_fn
+
+        self._rings = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'seeds': 0,
+            'evictions': 0,
+            'appends': 0,
+            'stale': 0
+        }
+
+    def _seed(self, student_id: str, concept_id: str) -> ResponseRing:
+        ring = ResponseRing(self.length)
+        if self.seed_fn is not None:
+            documents = self.seed_fn(student_id, concept_id, self.length)
+            for doc in reversed(documents):
+                submitted_at = doc.get('submitted_at')
+                ring.append(
+                    bool(doc.get('is_correct')),
+                    doc.get('response_time', 0.0),
+                    submitted_at.timestamp() if isinstance(submitted_at, datetime) else submitted_at
+                )
+            self.stats['seeds'] += 1
+        return ring
+
+    def _expired(self, entry: List, now: float) -> bool:
+        """entry[1] is when the ring was seeded, not when it was last used"""
+        return bool(self.ttl_seconds) and now - entry[1] > self.ttl_seconds
+
+    def _get_ring(self, student_id: str, concept_id: str) -> ResponseRing:
+        key = (student_id, concept_id)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._rings.get(key)
+            if entry is not None and not self._expired(entry, now):
+                self._rings.move_to_end(key)
+                ring, newest = entry[0], entry[0].newest
+            else:
+                ring = None
+
+        if ring is not None:
+            latest = self.latest_fn(student_id, concept_id) if self.latest_fn is not None else None
+            if latest is None or latest <= newest:
+                self.stats['hits'] += 1
+                return ring
+            self.stats['stale'] += 1
+
+        self.stats['misses'] += 1
+        ring = self._seed(student_id, concept_id)
+
+        with self._lock:
+            entry = self._rings.get(key)
+            if entry is not None and entry[1] >= now:
+                # Another thread seeded it meanwhile
+                return entry[0]
+            self._rings[key] = [ring, time.monotonic()]
+            self._rings.move_to_end(key)
+            while len(self._rings) > self.max_pairs:
+                self._rings.popitem(last=False)
+                self.stats['evictions'] += 1
+        return ring
+
+    def append(
+        self,
+        student_id: str,
+        concept_id: str,
+        is_correct: bool,
+        response_time: float = 0.0,
+        timestamp: Optional[float] = None
+    ):
+        """
+        Record a response that was just stored in STUDENT_RESPONSES
+
+        Only warm rings are updated. A cold (or expired) pair is left to be
+        seeded on its next read, and that query already sees the response.
+        """
+        key = (student_id, concept_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._rings.get(key)
+            if entry is not None and not self._expired(entry, now):
+                entry[0].append(is_correct, response_time, timestamp)
+                self._rings.move_to_end(key)
+                self.stats['appends'] += 1
+
+    def get(self, student_id: str, concept_id: str) -> List[Dict]:
+        """Chronological history (at most `length` records)"""
+        ring = self._get_ring(student_id, concept_id)
+        with self._lock:
+            return ring.records()
+
+    def invalidate(self, student_id: str, concept_id: Optional[str] = None):
+        """Drop cached rings for a student (all concepts or one)"""
+        with self._lock:
+            if concept_id is not None:
+                self._rings.pop((student_id, concept_id), None)
+                return
+            for key in [k for k in self._rings if k[0] == student_id]:
+                del self._rings[key]
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Counters plus current resident size"""
+        return dict(self.stats, resident=len(self))
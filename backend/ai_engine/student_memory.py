@@ -0,0 +1,332 @@
+"""
+AMEP Per-Student DKVMN Memory Store
+Bounded, sharded value-memory cache for the DKVMN layer
+
+Solves: BR3 (Efficiency) - Keeps per-student mastery memory correct and bounded
+
+Each student owns a compact value-memory vector (float32 mastery per
+concept). Hot students live in an in-process LRU tier split into shards,
+each guarded by its own lock. Entries that fall out of the LRU or go idle
+past the TTL are spilled through a persistence callback (Mongo in the API)
+and restored on demand the next time the student is seen, so worker memory
+stays flat as the student count grows.
+
+Persistence is per concept: a spill sends only the concepts changed since
+the last one, and the callback applies them as field updates that bump a
+version counter, so workers writing the same student never overwrite each
+other's concepts. With write_through every update() is spilled at once;
+otherwise a flusher thread persists changes every flush_interval seconds
+(and stop() on shutdown). The flusher also sweeps idle students out of
+quiet shards. Given a version_fn, each cache hit compares the resident
+version with the persisted one and reloads a student another worker has
+written since.
+"""
+
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# ============================================================================
+# COMPACT PER-STUDENT STATE
+# ============================================================================
+
+class StudentMemoryState:
+    """
+    Value memory of a single student
+
+    Concept IDs map to slots in a float32 vector that grows by doubling,
+    so a student with k concepts costs roughly 4k bytes plus the index.
+    changed holds the concepts written since the last spill and version
+    the persisted version this memory reflects.
+    """
+
+    __slots__ = ('index', 'values', 'size', 'changed', 'version')
+
+    def __init__(
+        self,
+        concept_ids: Optional[List[str]] = None,
+        values: Optional[List[float]] = None,
+        version: int = 0
+    ):
+        concept_ids = list(concept_ids or [])
+        self.index = {concept_id: i for i, concept_id in enumerate(concept_ids)}
+        self.size = len(concept_ids)
+        self.values = np.zeros(max(4, self.size), dtype=np.float32)
+        if self.size:
+            self.values[:self.size] = np.asarray(values, dtype=np.float32)[:self.size]
+        self.changed = set()
+        self.version = version
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.changed)
+
+    def __contains__(self, concept_id: str) -> bool:
+        return concept_id in self.index
+
+    def __len__(self) -> int:
+        return self.size
+
+    def get(self, concept_id: str, default: Optional[float] = None) -> Optional[float]:
+        """Read mastery for a concept"""
+        slot = self.index.get(concept_id)
+        if slot is None:
+            return default
+        return float(self.values[slot])
+
+    def set(self, concept_id: str, value: float):
+        """Write mastery for a concept, growing the vector if needed"""
+        slot = self.index.get(concept_id)
+        if slot is None:
+            if self.size == len(self.values):
+                grown = np.zeros(len(self.values) * 2, dtype=np.float32)
+                grown[:self.size] = self.values[:self.size]
+                self.values = grown
+            slot = self.size
+            self.index[concept_id] = slot
+            self.size += 1
+        self.values[slot] = value
+        self.changed.add(concept_id)
+
+    def items(self) -> Iterator[Tuple[str, float]]:
+        """Iterate (concept_id, mastery) pairs"""
+        for concept_id, slot in self.index.items():
+            yield concept_id, float(self.values[slot])
+
+    def take_changes(self) -> Dict[str, float]:
+        """Concepts written since the last spill, clearing the change set"""
+        changes = {concept_id: self.get(concept_id) for concept_id in self.changed}
+        self.changed = set()
+        return changes
+
+    def to_document(self) -> Dict:
+        """Serialize for persistence"""
+        return {'mastery': dict(self.items()), 'version': self.version}
+
+    @classmethod
+    def from_document(cls, document: Dict) -> 'StudentMemoryState':
+        """
+        Rebuild from a persisted document
+
+        Accepts the per-concept 'mastery' map and the older parallel
+        concept_ids/values arrays (the map wins where both exist).
+        """
+        mastery = dict(zip(document.get('concept_ids', []), document.get('values', [])))
+        mastery.update(document.get('mastery') or {})
+        return cls(list(mastery), list(mastery.values()), document.get('version', 0))
+
+
+# ============================================================================
+# SHARDED LRU / TTL STORE
+# ============================================================================
+
+class StudentMemoryStore:
+    """
+    Sharded in-process LRU/TTL tier with spill-to-persistence
+
+    Args:
+        capacity: Max students held in memory across all shards
+        ttl_seconds: Idle time after which a student is spilled (0 = no TTL)
+        num_shards: Independent LRU shards (reduces lock contention)
+        restore_fn: student_id -> persisted document or None
+        spill_fn: (student_id, {concept_id: mastery}) -> persisted version
+            after applying those concepts (None if unknown)
+        version_fn: student_id -> persisted version or None; when given,
+            cache hits reload students written elsewhere since
+        write_through: Spill a student's changes on every update()
+        flush_interval: Seconds between background flushes and idle
+            sweeps (0 = no flusher thread)
+    """
+
+    def __init__(
+        self,
+        capacity: int = 10000,
+        ttl_seconds: float = 1800,
+        num_shards: int = 16,
+        restore_fn: Optional[Callable[[str], Optional[Dict]]] = None,
+        spill_fn: Optional[Callable[[str, Dict[str, float]], Optional[int]]] = None,
+        version_fn: Optional[Callable[[str], Optional[int]]] = None,
+        write_through: bool = False,
+        flush_interval: float = 0
+    ):
+        self.num_shards = max(1, num_shards)
+        self.shard_capacity = max(1, -(-capacity // self.num_shards))
+        self.ttl_seconds = ttl_seconds
+        self.restore_fn = restore_fn
+        self.spill_fn = spill_fn
+        self.version_fn = version_fn
+        self.write_through = write_through
+        self.flush_interval = flush_interval
+
+        self._shards = [OrderedDict() for _ in range(self.num_shards)]
+        self._locks = [threading.Lock() for _ in range(self.num_shards)]
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'restores': 0,
+            'evictions': 0,
+            'spills': 0,
+            'reloads': 0,
+            'flushes': 0,
+            'flush_errors': 0
+        }
+
+        self._flusher = None
+        self._stop_event = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def _shard_for(self, student_id: str) -> int:
+        return hash(student_id) % self.num_shards
+
+    def get(self, student_id: str) -> StudentMemoryState:
+        """Return the student's memory, restoring or creating it on a miss"""
+        shard_id = self._shard_for(student_id)
+        shard = self._shards[shard_id]
+
+        with self._locks[shard_id]:
+            entry = shard.get(student_id)
+            if entry is not None:
+                shard.move_to_end(student_id)
+                entry[1] = time.monotonic()
+                self.stats['hits'] += 1
+                state = entry[0]
+        if entry is not None:
+            return self._revalidate(student_id, state) if self.version_fn is not None else state
+
+        self.stats['misses'] += 1
+        state = self._restore(student_id)
+
+        with self._locks[shard_id]:
+            # Another thread may have restored it meanwhile
+            entry = shard.get(student_id)
+            if entry is not None:
+                shard.move_to_end(student_id)
+                return entry[0]
+            shard[student_id] = [state, time.monotonic()]
+            evicted = self._collect_evictions(shard)
+
+        self._spill(evicted)
+        return state
+
+    def _revalidate(self, student_id: str, state: StudentMemoryState) -> StudentMemoryState:
+        """Reload a resident student another worker has written since"""
+        persisted = self.version_fn(student_id)
+        if persisted is None or persisted == state.version:
+            return state
+
+        # Our own unsaved concepts go out first so the reload includes them
+        self._spill([(student_id, state)])
+        fresh = self._restore(student_id)
+        self.stats['reloads'] += 1
+
+        shard_id = self._shard_for(student_id)
+        with self._locks[shard_id]:
+            entry = self._shards[shard_id].get(student_id)
+            if entry is not None and entry[0] is state:
+                entry[0] = fresh
+        return fresh
+
+    def update(self, student_id: str, concept_id: str, value: float):
+        """Write one concept's mastery, spilling it at once under write_through"""
+        state = self.get(student_id)
+        state.set(concept_id, value)
+        if self.write_through:
+            self._spill([(student_id, state)])
+
+    def _restore(self, student_id: str) -> StudentMemoryState:
+        if self.restore_fn is not None:
+            document = self.restore_fn(student_id)
+            if document:
+                self.stats['restores'] += 1
+                return StudentMemoryState.from_document(document)
+        return StudentMemoryState()
+
+    def _collect_evictions(self, shard: OrderedDict) -> List[Tuple[str, StudentMemoryState]]:
+        """Pop over-capacity and idle entries from the LRU end (lock held)"""
+        evicted = []
+        now = time.monotonic()
+        while shard:
+            student_id, (state, last_access) = next(iter(shard.items()))
+            expired = self.ttl_seconds and now - last_access > self.ttl_seconds
+            if len(shard) <= self.shard_capacity and not expired:
+                break
+            shard.popitem(last=False)
+            evicted.append((student_id, state))
+        self.stats['evictions'] += len(evicted)
+        return evicted
+
+    def _spill(self, evicted: List[Tuple[str, StudentMemoryState]]):
+        if self.spill_fn is None:
+            return
+        for student_id, state in evicted:
+            if not state.dirty:
+                continue
+            changes = state.take_changes()
+            try:
+                version = self.spill_fn(student_id, changes)
+            except Exception:
+                state.changed.update(changes)
+                raise
+            self.stats['spills'] += 1
+            # Any other jump means someone else wrote too - the next
+            # revalidated hit reloads the merged memory
+            if version is not None and version == state.version + 1:
+                state.version = version
+
+    def sweep(self):
+        """Evict idle (and over-capacity) students from every shard"""
+        for shard_id, shard in enumerate(self._shards):
+            with self._locks[shard_id]:
+                evicted = self._collect_evictions(shard)
+            self._spill(evicted)
+
+    def flush(self):
+        """Persist every dirty in-memory state (e.g. on shutdown)"""
+        for shard_id, shard in enumerate(self._shards):
+            with self._locks[shard_id]:
+                entries = [(sid, entry[0]) for sid, entry in shard.items()]
+            self._spill(entries)
+        self.stats['flushes'] += 1
+
+    # ------------------------------------------------------------------
+    # Background flusher
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the periodic flush/sweep thread (idempotent, no-op without an interval)"""
+        if self.flush_interval <= 0:
+            return
+        with self._start_lock:
+            if self._flusher is not None:
+                return
+            self._stop_event.clear()
+            self._flusher = threading.Thread(target=self._run, name='student-memory-flush', daemon=True)
+            self._flusher.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the flusher and persist everything still dirty"""
+        with self._start_lock:
+            flusher, self._flusher = self._flusher, None
+            self._stop_event.set()
+        if flusher is not None:
+            flusher.join(timeout)
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.sweep()
+                self.flush()
+            except Exception:
+                # Persistence hiccups must not kill the thread; next tick retries
+                self.stats['flush_errors'] += 1
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Counters plus current resident size"""
+        return dict(self.stats, resident=len(self))
@@ -23,6 +23,9 @@ from models.database import (
     update_one
 )
 
+# Import services
+from services.engagement_counter_service import record_engagement_event
+
 # Import logging
 from utils.logger import get_logger, log_authentication
 
@@ -290,6 +293,11 @@ def login():
             {'_id': user['_id']},
             {'$set': {'last_login': datetime.utcnow()}}
         )
+        if user['role'] == 'student':
+            try:
+                record_engagement_event(user['_id'], 'login')
+            except Exception as e:
+                logger.warning(f"Engagement counter not updated | user_id: {user['_id']} | error: {str(e)}")
 
         # Generate JWT token
         logger.info(f"Generating JWT token | user_id: {user['_id']} | role: {user['role']}")
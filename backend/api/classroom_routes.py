@@ -24,9 +24,15 @@ from models.database import (
     aggregate,
     aggregate,
     count_documents,
+    get_loader,
     STUDENT_CONCEPT_MASTERY
 )
 
+# Import services
+from services.engagement_counter_service import record_engagement_event
+from services.engagement_signal_service import SUBMITTED_STATUSES
+from services.mastery_decay_service import apply_mastery_decay
+
 # Import logging
 from utils.logger import get_logger
 
@@ -484,7 +490,7 @@ def get_classroom_students(classroom_id):
             student = find_one(STUDENTS, {'_id': membership['student_id']})
             if student:
                 # Calculate overall mastery for the student
-                mastery_records = find_many(STUDENT_CONCEPT_MASTERY, {'student_id': student['_id']})
+                mastery_records = apply_mastery_decay(find_many(STUDENT_CONCEPT_MASTERY, {'student_id': student['_id']}))
                 overall_mastery = 0
                 if mastery_records:
                     total_score = sum(record.get('mastery_score', 0) for record in mastery_records)
@@ -654,18 +660,37 @@ def get_classroom_stream(classroom_id):
             sort=[('is_pinned', -1), ('created_at', -1)]
         )[offset:offset+limit]
 
+        # If user is student, check for submission
+        user_id, role = get_current_user_id()
+
+        # Batch author and submission lookups (one query per collection)
+        users = get_loader(USERS).prime(p['author_id'] for p in posts)
+        teachers = get_loader(TEACHERS, key_field='user_id').prime(
+            p['author_id'] for p in posts if p.get('author_role') == 'teacher'
+        )
+        students = get_loader(STUDENTS, key_field='user_id').prime(
+            p['author_id'] for p in posts if p.get('author_role') != 'teacher'
+        )
+        submissions = None
+        if user_id:
+            submissions = get_loader(
+                CLASSROOM_SUBMISSIONS,
+                key_field='assignment_id',
+                base_query={'student_id': user_id}
+            ).prime(p['_id'] for p in posts if p.get('post_type') == 'assignment')
+
         formatted_posts = []
         for post in posts:
             # Get author info
-            author = find_one(USERS, {'_id': post['author_id']})
+            author = users.load(post['author_id'])
             author_name = 'Unknown'
             if author:
                 if post['author_role'] == 'teacher':
-                    teacher = find_one(TEACHERS, {'user_id': post['author_id']})
+                    teacher = teachers.load(post['author_id'])
                     if teacher:
                         author_name = f"{teacher.get('first_name', '')} {teacher.get('last_name', '')}"
                 else:
-                    student = find_one(STUDENTS, {'user_id': post['author_id']})
+                    student = students.load(post['author_id'])
                     if student:
                         author_name = f"{student.get('first_name', '')} {student.get('last_name', '')}"
 
@@ -686,9 +711,6 @@ def get_classroom_stream(classroom_id):
                 'created_at': post.get('created_at').isoformat() if post.get('created_at') else None
             }
 
-            # If user is student, check for submission
-            user_id, role = get_current_user_id()
-             
             # DEBUG LOGGING for stream submission check
             if post.get('post_type') == 'assignment':
                  logger.info(f"Stream check | post: {post['_id']} | user: {user_id} | role: {role}")
@@ -696,10 +718,7 @@ def get_classroom_stream(classroom_id):
 
             # Relaxed check: strict role check might fail if token role varies (e.g. 'Student' vs 'student')
             if user_id and post.get('post_type') == 'assignment':
-                submission = find_one(CLASSROOM_SUBMISSIONS, {
-                    'assignment_id': post['_id'],
-                    'student_id': user_id
-                })
+                submission = submissions.load(post['_id'])
                 logger.info(f"Submission found: {submission['_id'] if submission else 'None'}")
                 if submission:
                     post_data['current_user_submission'] = {
@@ -1015,6 +1034,9 @@ def submit_assignment(assignment_id):
                     is_late = False
 
         submission = find_one(CLASSROOM_SUBMISSIONS, {'assignment_id': assignment_id, 'student_id': data['student_id']})
+        # A resubmission after the teacher returns the work is still one
+        # submission document, so only the first turn-in is counted
+        first_turn_in = not submission or submission.get('status') not in SUBMITTED_STATUSES
 
         if submission:
             # Check if already submitted
@@ -1057,6 +1079,12 @@ def submit_assignment(assignment_id):
 
             submission_id = insert_one(CLASSROOM_SUBMISSIONS, submission_doc)
 
+        if first_turn_in:
+            try:
+                record_engagement_event(data['student_id'], 'submission')
+            except Exception as e:
+                logger.warning(f"Engagement counter not updated | submission_id: {submission_id} | error: {str(e)}")
+
         logger.info(f"Assignment submitted | assignment_id: {assignment_id} | student_id: {data['student_id']} | late: {is_late}")
         return jsonify({'submission_id': submission_id, 'message': 'Assignment submitted successfully', 'is_late': is_late}), 200
 
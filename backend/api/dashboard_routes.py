@@ -51,6 +51,10 @@ from models.database import (
 # Import AI engines
 from ai_engine.engagement_detection import EngagementDetectionEngine
 
+# Import services
+from services.mastery_heatmap_service import build_mastery_heatmap
+from services.mastery_decay_service import apply_mastery_decay
+
 # Import logging
 from utils.logger import get_logger
 
@@ -422,82 +426,10 @@ def get_mastery_heatmap(classroom_id):
                 'message': f'No concepts available for subject: {subject_area}' if subject_area else 'No concepts in system'
             }), 404
 
-        # Build heatmap data structure
-        heatmap_data = []
-
-        for student_id in student_ids:
-            student = find_one(STUDENTS, {'_id': student_id})
-            student_row = {
-                'student_id': student_id,
-                'student_name': student.get('name', 'Unknown') if student else 'Unknown',
-                'concepts': {}
-            }
-
-            for concept in concepts:
-                concept_id = concept['_id']
-
-                # Get mastery record
-                mastery_record = find_one(
-                    STUDENT_CONCEPT_MASTERY,
-                    {
-                        'student_id': student_id,
-                        'concept_id': concept_id
-                    }
-                )
-
-                if mastery_record:
-                    mastery_score = mastery_record.get('mastery_score', 0)
-                else:
-                    mastery_score = 0
-
-                # Determine color based on mastery level
-                if mastery_score >= 85:
-                    color = '#22c55e'  # green - mastered
-                elif mastery_score >= 70:
-                    color = '#84cc16'  # light green - proficient
-                elif mastery_score >= 60:
-                    color = '#eab308'  # yellow - developing
-                elif mastery_score >= 40:
-                    color = '#f97316'  # orange - struggling
-                else:
-                    color = '#ef4444'  # red - needs help
-
-                student_row['concepts'][concept_id] = {
-                    'mastery_score': round(mastery_score, 1),
-                    'color': color
-                }
-
-            # Calculate student average
-            avg_mastery = sum(c['mastery_score'] for c in student_row['concepts'].values()) / len(concepts) if concepts else 0
-            student_row['average_mastery'] = round(avg_mastery, 1)
-
-            heatmap_data.append(student_row)
-
-        # Calculate concept averages (class-level mastery per concept)
-        concept_averages = []
-
-        for concept in concepts:
-            concept_id = concept['_id']
-            mastery_scores = []
-
-            for student_row in heatmap_data:
-                mastery_scores.append(student_row['concepts'][concept_id]['mastery_score'])
-
-            avg = sum(mastery_scores) / len(mastery_scores) if mastery_scores else 0
-
-            concept_averages.append({
-                'concept_id': concept_id,
-                'concept_name': concept.get('concept_name', 'Unknown'),
-                'average_mastery': round(avg, 1),
-                'students_mastered': len([s for s in mastery_scores if s >= 85]),
-                'students_struggling': len([s for s in mastery_scores if s < 60])
-            })
-
-        # Sort students by average mastery (lowest first - needs most help)
-        heatmap_data.sort(key=lambda x: x['average_mastery'])
-
-        # Sort concepts by average mastery (lowest first - needs focus)
-        concept_averages.sort(key=lambda x: x['average_mastery'])
+        # Build heatmap from bulk-loaded mastery matrix (constant query count)
+        heatmap = build_mastery_heatmap(student_ids, concepts)
+        heatmap_data = heatmap['heatmap']
+        concept_averages = heatmap['concept_averages']
 
         # Calculate Mastery Trend & History (Based on Assignment Grades as Proxy)
         # Get last 6 graded assignments
@@ -513,13 +445,20 @@ def get_mastery_heatmap(classroom_id):
         )
 
         mastery_history = []
-        
+
+        # Fetch graded submissions for all assignments in one query
+        graded_submissions = find_many(CLASSROOM_SUBMISSIONS, {
+            'assignment_id': {'$in': [a['_id'] for a in assignments]},
+            'grade': {'$ne': None}
+        }, {'assignment_id': 1, 'grade': 1}) if assignments else []
+
+        submissions_by_assignment = {}
+        for submission in graded_submissions:
+            submissions_by_assignment.setdefault(submission['assignment_id'], []).append(submission)
+
         # Calculate average grade % for each assignment
         for assignment in reversed(assignments): # Oldest first
-            submissions = find_many(CLASSROOM_SUBMISSIONS, {
-                'assignment_id': assignment['_id'],
-                'grade': {'$ne': None}
-            })
+            submissions = submissions_by_assignment.get(assignment['_id'], [])
             
             if submissions:
                 total_percent = sum((s.get('grade', 0) / assignment.get('points', 100)) * 100 for s in submissions)
@@ -544,9 +483,7 @@ def get_mastery_heatmap(classroom_id):
             'total_concepts': len(concepts),
             'heatmap': heatmap_data,
             'concept_averages': concept_averages,
-            'class_average_mastery': round(
-                sum(s['average_mastery'] for s in heatmap_data) / len(heatmap_data), 1
-            ) if heatmap_data else 0,
+            'class_average_mastery': heatmap['class_average_mastery'],
             'mastery_trend': mastery_trend,
             'mastery_history': mastery_history,
             'timestamp': datetime.utcnow().isoformat()
@@ -858,7 +795,7 @@ def get_institutional_metrics():
         }
 
         # Calculate average mastery across institution
-        all_mastery = find_many(STUDENT_CONCEPT_MASTERY, {})
+        all_mastery = apply_mastery_decay(find_many(STUDENT_CONCEPT_MASTERY, {}))
         avg_mastery = sum(m.get('mastery_score', 0) for m in all_mastery) / len(all_mastery) if all_mastery else 0
 
         # Count teachers
@@ -1028,7 +965,7 @@ def track_intervention():
         data = request.json
         mastery_before = data.get('mastery_before')
         if not mastery_before:
-            mastery_records = find_many(STUDENT_CONCEPT_MASTERY, {'student_id': {'$in': data['target_students']}, 'concept_id': data['concept_id']})
+            mastery_records = apply_mastery_decay(find_many(STUDENT_CONCEPT_MASTERY, {'student_id': {'$in': data['target_students']}, 'concept_id': data['concept_id']}))
             mastery_before = sum(r.get('mastery_score', 0) for r in mastery_records) / len(mastery_records) if mastery_records else 0
 
         intervention_effectiveness = {'one_on_one_tutoring': 0.15, 'small_group_review': 0.10, 'homework_assignment': 0.05, 'peer_teaching': 0.12, 'adaptive_practice': 0.18}
@@ -1100,7 +1037,7 @@ def measure_intervention_impact(intervention_id):
         if not intervention:
             return jsonify({'error': 'Intervention not found'}), 404
 
-        mastery_records = find_many(STUDENT_CONCEPT_MASTERY, {'student_id': {'$in': intervention['target_students']}, 'concept_id': intervention['concept_id']})
+        mastery_records = apply_mastery_decay(find_many(STUDENT_CONCEPT_MASTERY, {'student_id': {'$in': intervention['target_students']}, 'concept_id': intervention['concept_id']}))
         mastery_after = sum(r.get('mastery_score', 0) for r in mastery_records) / len(mastery_records) if mastery_records else intervention['mastery_before']
         actual_improvement = mastery_after - intervention['mastery_before']
         predicted_improvement = intervention.get('predicted_improvement', 0)
@@ -1376,7 +1313,7 @@ def get_unified_analytics():
 
         all_students = find_many(STUDENTS, {})
         total_students = len(all_students)
-        mastery_records = find_many(STUDENT_CONCEPT_MASTERY, {})
+        mastery_records = apply_mastery_decay(find_many(STUDENT_CONCEPT_MASTERY, {}))
         students_mastered = len([r for r in mastery_records if r.get('mastery_score', 0) >= 70])
         mastery_rate = (students_mastered / total_students * 100) if total_students > 0 else 0
 
@@ -1441,7 +1378,7 @@ def get_student_dashboard_data(student_id):
             return jsonify({'error': 'Student not found'}), 404
 
         # Get mastery data
-        mastery_records = find_many(STUDENT_CONCEPT_MASTERY, {'student_id': student_id})
+        mastery_records = apply_mastery_decay(find_many(STUDENT_CONCEPT_MASTERY, {'student_id': student_id}))
         overall_mastery = sum(r.get('mastery_score', 0) for r in mastery_records) / len(mastery_records) if mastery_records else 0
 
         # Calculate level and XP (mock calculation based on mastery)
@@ -1517,10 +1454,10 @@ def get_student_dashboard_data(student_id):
                 })
 
         # Recent mastery improvements
-        recent_mastery = find_many(STUDENT_CONCEPT_MASTERY, {
+        recent_mastery = apply_mastery_decay(find_many(STUDENT_CONCEPT_MASTERY, {
             'student_id': student_id,
             'last_assessed': {'$gte': datetime.utcnow() - timedelta(days=3)}
-        }, sort=[('last_assessed', -1)], limit=2)
+        }, sort=[('last_assessed', -1)], limit=2))
 
         for mastery in recent_mastery:
             concept = find_one(CONCEPTS, {'_id': mastery['concept_id']})
@@ -1708,7 +1645,7 @@ def get_all_student_reports():
             avg_engagement = sum(s.get('engagement_score', 0) for s in sessions) / len(sessions) if sessions else 0
             
             # Mastery
-            mastery_records = find_many(STUDENT_CONCEPT_MASTERY, {'student_id': sid})
+            mastery_records = apply_mastery_decay(find_many(STUDENT_CONCEPT_MASTERY, {'student_id': sid}))
             avg_mastery = sum(m.get('mastery_score', 0) for m in mastery_records) / len(mastery_records) if mastery_records else 0
             mastered_count = len([m for m in mastery_records if m.get('mastery_score', 0) >= 85])
             
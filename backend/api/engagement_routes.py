@@ -13,20 +13,16 @@ from bson import ObjectId
 from models.database import (
     db,
     ENGAGEMENT_SESSIONS,
-    ENGAGEMENT_LOGS,
     DISENGAGEMENT_ALERTS,
     LIVE_POLLS,
     POLL_RESPONSES,
-    STUDENT_RESPONSES,
-    CLASSROOM_SUBMISSIONS,
     STUDENTS,
     find_one,
     find_many,
     insert_one,
     update_one,
     update_many,
-    aggregate,
-    count_documents
+    aggregate
 )
 
 # Import AI engines
@@ -36,6 +32,13 @@ from ai_engine.engagement_detection import (
     ExplicitSignals
 )
 
+# Import services
+from services.engagement_signal_service import extract_engagement_signals
+from services.engagement_counter_service import engagement_counter_signals, record_engagement_event
+
+# Import configuration
+from config import Config
+
 # Import logging
 from utils.logger import get_logger
 
@@ -63,30 +66,30 @@ def analyze_engagement():
         student_id = data['student_id']
         logger.info(f"Engagement analysis request | student_id: {student_id}")
         
-        # Get recent responses from MongoDB
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_responses = find_many(
-            STUDENT_RESPONSES,
-            {
-                'student_id': student_id,
-                'submitted_at': {'$gte': week_ago}
-            },
-            sort=[('submitted_at', -1)]
-        )
+        if Config.ENGAGEMENT_COUNTERS_ENABLED:
+            # Summed daily counters plus the latest responses
+            signal_data = engagement_counter_signals(
+                student_id,
+                recent_limit=Config.ENGAGEMENT_RECENT_RESPONSES_LIMIT
+            )
+        else:
+            # Responses, logs, sessions, submissions and polls in one pass
+            signal_data = extract_engagement_signals(student_id)
+        recent_responses = signal_data.responses
         
         # Build implicit signals from data or use provided
         if 'implicit_signals' in data:
             implicit = ImplicitSignals(**data['implicit_signals'])
         else:
             # Calculate from actual data
-            implicit = _calculate_implicit_signals(student_id)
+            implicit = signal_data.implicit_signals()
         
         # Build explicit signals from data or use provided
         if 'explicit_signals' in data:
             explicit = ExplicitSignals(**data['explicit_signals'])
         else:
             # Calculate from actual data
-            explicit = _calculate_explicit_signals(student_id)
+            explicit = signal_data.explicit_signals()
         
         # Detect disengagement behaviors
         behaviors = engagement_engine.detect_disengagement_behaviors(
@@ -107,7 +110,7 @@ def analyze_engagement():
             explicit,
             behaviors
         )
-        logger.info(f"Engagement calculated | student_id: {student_id} | score: {result['engagement_score']} | level: {result['engagement_level']}")
+        logger.info(f"Engagement calculated | student_id: {student_id} | score: {result['engagement_score']} | level: {result['engagement_level']} | signal_queries: {signal_data.queries}")
 
         # Save engagement session
         session_doc = {
@@ -119,6 +122,7 @@ def analyze_engagement():
             'explicit_component': result['explicit_component'],
             'behaviors_detected': behaviors,
             'recommendations': result['recommendations'],
+            'signal_queries': signal_data.queries,
             'analyzed_at': datetime.utcnow()
         }
         
@@ -415,6 +419,10 @@ def respond_to_poll(poll_id):
         }
         
         response_id = insert_one(POLL_RESPONSES, response_doc)
+        try:
+            record_engagement_event(data['student_id'], 'poll', response_doc['submitted_at'])
+        except Exception as e:
+            logger.warning(f"Engagement counter not updated | poll_id: {poll_id} | error: {str(e)}")
         
         # Update poll results in real-time via WebSocket
         # socketio.emit('poll_update', {poll_id, response_count}, room=poll.teacher_id)
@@ -707,108 +715,3 @@ def report_violation():
             'error': 'Internal server error',
             'detail': str(e)
         }), 500
-
-
-# ============================================================================
-# HELPER FUNCTIONS
-# ============================================================================
-
-def _calculate_implicit_signals(student_id):
-    """Calculate implicit signals from student activity data"""
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    
-    # Get engagement logs
-    logs = find_many(
-        ENGAGEMENT_LOGS,
-        {
-            'student_id': student_id,
-            'timestamp': {'$gte': week_ago}
-        }
-    )
-    
-    # Calculate metrics
-    login_frequency = len(set(log.get('timestamp').date() for log in logs if log.get('event_type') == 'login'))
-    
-    # Session durations
-    sessions = find_many(
-        ENGAGEMENT_SESSIONS,
-        {
-            'student_id': student_id,
-            'analyzed_at': {'$gte': week_ago}
-        }
-    )
-    
-    session_durations = [s.get('duration', 0) for s in sessions if s.get('duration')]
-    avg_session_duration = sum(session_durations) / len(session_durations) if session_durations else 10.0
-    
-    # Get responses
-    responses = find_many(
-        STUDENT_RESPONSES,
-        {
-            'student_id': student_id,
-            'submitted_at': {'$gte': week_ago}
-        }
-    )
-
-    # Get assignment submissions
-    submissions = find_many(
-        CLASSROOM_SUBMISSIONS,
-        {
-            'student_id': student_id,
-            'submitted_at': {'$gte': week_ago},
-            'status': {'$in': ['turned_in', 'graded', 'returned']}
-        }
-    )
-    
-    response_times = [r.get('response_time', 0) for r in responses if r.get('response_time')]
-    interaction_count = len(responses) + len(submissions)
-    
-    correct_count = sum(1 for r in responses if r.get('is_correct'))
-    # Task completion: For assignments, turned_in counts as complete.
-    total_tasks = len(responses) + len(submissions)
-    task_completion_rate = (correct_count + len(submissions)) / total_tasks if total_tasks > 0 else 0.5
-    
-    return ImplicitSignals(
-        login_frequency=login_frequency,
-        avg_session_duration=avg_session_duration,
-        time_on_task=sum(session_durations),
-        interaction_count=interaction_count,
-        response_times=response_times,
-        task_completion_rate=task_completion_rate,
-        reattempt_rate=0.1,  # Placeholder
-        optional_resource_usage=0,  # Placeholder
-        discussion_participation=0  # Placeholder
-    )
-
-
-def _calculate_explicit_signals(student_id):
-    """Calculate explicit signals from polls and assessments"""
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    
-    # Count poll responses
-    poll_responses = count_documents(
-        POLL_RESPONSES,
-        {
-            'student_id': student_id,
-            'submitted_at': {'$gte': week_ago}
-        }
-    )
-    
-    # Get quiz accuracy
-    responses = find_many(
-        STUDENT_RESPONSES,
-        {
-            'student_id': student_id,
-            'submitted_at': {'$gte': week_ago}
-        }
-    )
-    
-    correct_count = sum(1 for r in responses if r.get('is_correct'))
-    quiz_accuracy = correct_count / len(responses) if responses else 0.5
-    
-    return ExplicitSignals(
-        poll_responses=poll_responses,
-        understanding_level=3.0,  # Placeholder - would come from self-reports
-        participation_rate=0.75,  # Placeholder
-        quiz_accuracy=quiz_accuracy
-    )
\ No newline at end of file
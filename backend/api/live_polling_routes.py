@@ -38,6 +38,9 @@ from models.database import (
     STUDENTS
 )
 
+# Import services
+from services.engagement_counter_service import record_engagement_event
+
 # Import logging
 from utils.logger import get_logger
 
@@ -288,6 +291,10 @@ def respond_to_poll(poll_id):
         }
 
         insert_one(POLL_RESPONSES, response_doc)
+        try:
+            record_engagement_event(data['student_id'], 'poll', response_doc['submitted_at'])
+        except Exception as e:
+            logger.warning(f"Engagement counter not updated | poll_id: {poll_id} | error: {str(e)}")
 
         # Update poll response count
         update_one(
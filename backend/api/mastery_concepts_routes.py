@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime
 from bson import ObjectId
 from models.database import find_one, find_many, insert_one, update_one, delete_one
+from services.practice_item_pool_service import practice_item_pool
 from utils.logger import get_logger
 
 concepts_bp = Blueprint('concepts', __name__)
@@ -115,6 +116,7 @@ def update_concept(concept_id):
         if update_data:
             update_data['updated_at'] = datetime.utcnow()
             update_one(CONCEPTS, {'_id': concept_id}, {'$set': update_data})
+            practice_item_pool.invalidate(concept_id)
             return jsonify({'message': 'Concept updated successfully'}), 200
 
         return jsonify({'error': 'No valid fields to update'}), 400
@@ -129,6 +131,7 @@ def delete_concept(concept_id):
             return jsonify({'error': 'Concept not found'}), 404
 
         delete_one(CONCEPTS, {'_id': concept_id})
+        practice_item_pool.invalidate(concept_id)
         return jsonify({'message': 'Concept deleted successfully'}), 200
     except Exception as e:
         return jsonify({'error': 'Internal server error', 'detail': str(e)}), 500
@@ -185,6 +188,7 @@ def create_item():
         }
 
         item_id = insert_one(PRACTICE_ITEMS, item_doc)
+        practice_item_pool.invalidate(item_doc['concept_id'])
         return jsonify({'item_id': item_id, 'message': 'Practice item created successfully'}), 201
     except Exception as e:
         return jsonify({'error': 'Internal server error', 'detail': str(e)}), 500
@@ -232,6 +236,7 @@ def update_item(item_id):
         if update_data:
             update_data['updated_at'] = datetime.utcnow()
             update_one(PRACTICE_ITEMS, {'_id': item_id}, {'$set': update_data})
+            practice_item_pool.invalidate(item.get('concept_id'))
             return jsonify({'message': 'Item updated successfully'}), 200
 
         return jsonify({'error': 'No valid fields to update'}), 400
@@ -246,6 +251,7 @@ def delete_item(item_id):
             return jsonify({'error': 'Item not found'}), 404
 
         delete_one(PRACTICE_ITEMS, {'_id': item_id})
+        practice_item_pool.invalidate(item.get('concept_id'))
         return jsonify({'message': 'Item deleted successfully'}), 200
     except Exception as e:
         return jsonify({'error': 'Internal server error', 'detail': str(e)}), 500
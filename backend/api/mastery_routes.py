@@ -5,9 +5,11 @@ API endpoints for BR1, BR2, BR3 (Mastery tracking and adaptive practice)
 Location: backend/api/mastery_routes.py
 """
 
+import atexit
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
 
 # Import MongoDB helper functions
 from models.database import (
@@ -15,13 +17,17 @@ from models.database import (
     STUDENT_CONCEPT_MASTERY,
     STUDENT_RESPONSES,
     CONCEPTS,
-    PRACTICE_ITEMS,
     CONCEPTS,
+    STUDENT_MEMORY_STATES,
+    DKT_HIDDEN_STATES,
+    CLASSROOM_MEMBERSHIPS,
     find_one,
     find_many,
     insert_one,
     update_one,
-    aggregate
+    bulk_write,
+    aggregate,
+    get_loader
 )
 
 # Import schemas
@@ -30,12 +36,28 @@ from models.schemas import (
     MasteryCalculationResponse,
     PracticeSessionRequest,
     PracticeSessionResponse,
+    ClassPracticeSessionRequest,
     StudentResponseCreate
 )
 
 # Import AI engines
-from ai_engine.knowledge_tracing import HybridKnowledgeTracing
+from ai_engine.knowledge_tracing import HybridKnowledgeTracing, BKTParameters
 from ai_engine.adaptive_practice import AdaptivePracticeEngine
+from ai_engine.student_memory import StudentMemoryStore
+from ai_engine.response_history import ResponseHistoryStore
+from ai_engine.model_registry import ModelRegistry, EngineSpec
+
+# Import services
+from services.bkt_fitting_service import load_fitted_params
+from services.mastery_history_service import record_mastery_snapshot, get_mastery_series
+from services.mastery_decay_service import apply_mastery_decay, concept_decay_rate, decayed_mastery_expression
+from services.concept_graph_service import concept_graph as _concept_graph
+from services.practice_item_pool_service import practice_item_pool
+from services.practice_session_queue_service import PracticeSessionQueue
+from services.engagement_counter_service import record_engagement_event
+
+# Import configuration
+from config import Config
 
 # Import logging
 from utils.logger import get_logger
@@ -46,10 +68,180 @@ mastery_bp = Blueprint('mastery', __name__)
 # Initialize logger
 logger = get_logger(__name__)
 
+# ============================================================================
+# PER-STUDENT DKVMN MEMORY (written through / flushed to Mongo)
+# ============================================================================
+
+def _restore_memory_state(student_id):
+    """Load a student's spilled DKVMN value memory"""
+    return find_one(STUDENT_MEMORY_STATES, {'_id': student_id})
+
+
+def _spill_memory_state(student_id, changes):
+    """
+    Persist changed concepts of a student's DKVMN value memory (update,
+    flush or eviction) as field updates, so workers never overwrite each
+    other's concepts; returns the new version
+    """
+    document = db[STUDENT_MEMORY_STATES].find_one_and_update(
+        {'_id': student_id},
+        {
+            '$set': dict(
+                {f"mastery.{concept_id}": value for concept_id, value in changes.items()},
+                updated_at=datetime.utcnow()
+            ),
+            '$inc': {'version': 1}
+        },
+        projection={'version': 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return document['version']
+
+
+def _memory_state_version(student_id):
+    """Persisted version of a student's DKVMN value memory, or None"""
+    document = find_one(STUDENT_MEMORY_STATES, {'_id': student_id}, {'version': 1})
+    return document.get('version', 0) if document else None
+
+
+memory_store = StudentMemoryStore(
+    capacity=Config.DKVMN_MEMORY_STORE_CAPACITY,
+    ttl_seconds=Config.DKVMN_MEMORY_STORE_TTL,
+    num_shards=Config.DKVMN_MEMORY_STORE_SHARDS,
+    restore_fn=_restore_memory_state,
+    spill_fn=_spill_memory_state,
+    version_fn=_memory_state_version if Config.DKVMN_MEMORY_REVALIDATE else None,
+    write_through=Config.DKVMN_MEMORY_WRITE_THROUGH,
+    flush_interval=Config.DKVMN_MEMORY_FLUSH_SECONDS
+)
+memory_store.start()
+atexit.register(memory_store.stop)
+
+# ============================================================================
+# ROLLING RESPONSE HISTORY (appended on submit, read by calculate)
+# ============================================================================
+
+def _seed_response_history(student_id, concept_id, limit):
+    """Newest responses of a (student, concept) pair for a cold ring"""
+    return find_many(
+        STUDENT_RESPONSES,
+        {'student_id': student_id, 'concept_id': concept_id},
+        {'is_correct': 1, 'response_time': 1, 'submitted_at': 1},
+        sort=[('submitted_at', -1)],
+        limit=limit
+    )
+
+
+def _latest_response_at(student_id, concept_id):
+    """Timestamp of the pair's newest stored response (index-only lookup)"""
+    latest = find_many(
+        STUDENT_RESPONSES,
+        {'student_id': student_id, 'concept_id': concept_id},
+        {'_id': 0, 'submitted_at': 1},
+        sort=[('submitted_at', -1)],
+        limit=1
+    )
+    return latest[0]['submitted_at'].timestamp() if latest and latest[0].get('submitted_at') else None
+
+
+history_store = ResponseHistoryStore(
+    length=Config.RESPONSE_HISTORY_LENGTH,
+    max_pairs=Config.RESPONSE_HISTORY_MAX_PAIRS,
+    ttl_seconds=Config.RESPONSE_HISTORY_TTL,
+    seed_fn=_seed_response_history,
+    latest_fn=_latest_response_at if Config.RESPONSE_HISTORY_CHECK_LATEST else None
+)
+
+# ============================================================================
+# CONCEPT GRAPH (refreshed in the background from student_responses)
+# ============================================================================
+
+concept_graph = _concept_graph if Config.CONCEPT_GRAPH_ENABLED else None
+
+# ============================================================================
+# MODEL REGISTRY (torch is imported only when a neural engine is built)
+# ============================================================================
+
+def _load_dkt_states(student_ids):
+    """Load persisted DKT LSTM states for several students in one query"""
+    documents = find_many(DKT_HIDDEN_STATES, {'_id': {'$in': student_ids}})
+    return {document['_id']: document for document in documents}
+
+
+def _save_dkt_states(states):
+    """Persist pending DKT LSTM states (updates and evictions) in one bulk write"""
+    now = datetime.utcnow()
+    bulk_write(
+        DKT_HIDDEN_STATES,
+        [UpdateOne({'_id': student_id}, {'$set': dict(document, updated_at=now)}, upsert=True)
+         for student_id, document in states],
+        ordered=False
+    )
+
+
+def _neural_engine_options():
+    return {
+        'inference_only': Config.MODEL_INFERENCE_ONLY,
+        'quantize': Config.MODEL_QUANTIZE_INT8,
+        'num_threads': Config.TORCH_NUM_THREADS
+    }
+
+
+def _build_dkt_engine(cls):
+    engine = cls.from_checkpoint(
+        Config.DKT_MODEL_PATH,
+        state_cache_size=Config.DKT_STATE_CACHE_SIZE,
+        load_states_fn=_load_dkt_states,
+        save_states_fn=_save_dkt_states,
+        persist_states=Config.DKT_STATE_PERSIST,
+        state_flush_seconds=Config.DKT_STATE_FLUSH_SECONDS,
+        **_neural_engine_options()
+    )
+    atexit.register(engine.close)
+    return engine
+
+
+model_registry = ModelRegistry(
+    use_neural=Config.KT_USE_NEURAL_ENGINES,
+    max_batch_size=Config.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=Config.INFERENCE_MAX_WAIT_MS
+)
+model_registry.register(
+    'dkt',
+    simplified=EngineSpec('ai_engine.knowledge_tracing', 'DKTEngine'),
+    neural=EngineSpec(
+        'ai_engine.dkt_model', 'DKTEngine',
+        build=_build_dkt_engine,
+        batch_method='predict_mastery_incremental_batch'
+    )
+)
+
 # Initialize engines
 logger.info("Initializing Mastery Engines: HybridKnowledgeTracing and AdaptivePracticeEngine")
-kt_engine = HybridKnowledgeTracing()
-adaptive_engine = AdaptivePracticeEngine()
+kt_engine = HybridKnowledgeTracing(
+    memory_store=memory_store,
+    bkt_params=BKTParameters(
+        p_l0=Config.BKT_PRIOR_MASTERY,
+        p_t=Config.BKT_LEARNING_RATE,
+        p_g=Config.BKT_GUESS_RATE,
+        p_s=Config.BKT_SLIP_RATE
+    ),
+    bkt_params_loader=load_fitted_params,
+    bkt_refresh_seconds=Config.BKT_PARAMS_REFRESH_SECONDS,
+    history_store=history_store,
+    model_registry=model_registry,
+    concept_graph=concept_graph
+)
+adaptive_engine = AdaptivePracticeEngine(
+    selection_strategy=Config.PRACTICE_SELECTION_STRATEGY,
+    knapsack_max_cells=Config.PRACTICE_KNAPSACK_MAX_CELLS
+)
+practice_session_queue = PracticeSessionQueue(
+    generate_fn=lambda student_id, practice_request: _build_practice_session(student_id, practice_request),
+    max_age_seconds=Config.PRACTICE_SESSION_QUEUE_MAX_AGE_SECONDS,
+    active_days=Config.PRACTICE_SESSION_QUEUE_ACTIVE_DAYS
+)
 
 # ============================================================================
 # MASTERY CALCULATION ROUTES (BR1)
@@ -68,7 +260,6 @@ def calculate_mastery():
             is_correct=data.is_correct,
             response_time=data.response_time,
             current_mastery=data.current_mastery if data.current_mastery is not None else 50.0,
-            response_history=data.response_history,
             related_concepts=data.related_concepts
         )
         logger.info(f"[CALCULATE_MASTERY] KT engine completed | student_id: {data.student_id} | concept_id: {data.concept_id} | mastery_score: {result['mastery_score']:.2f} | confidence: {result['confidence']:.2f} | velocity: {result['learning_velocity']:.2f}")
@@ -85,7 +276,8 @@ def calculate_mastery():
             'dkvmn_component': result['dkvmn_component'],
             'confidence': result['confidence'],
             'learning_velocity': result['learning_velocity'],
-            'last_assessed': datetime.utcnow()
+            'last_assessed': datetime.utcnow(),
+            'decay_rate': concept_decay_rate(data.concept_id)
         }
 
         logger.info(f"[CALCULATE_MASTERY] Saving to database | doc_id: {mastery_doc['_id']}")
@@ -98,6 +290,15 @@ def calculate_mastery():
             },
             upsert=True
         )
+        try:
+            record_mastery_snapshot(data.student_id, data.concept_id, result, mastery_doc['last_assessed'])
+        except Exception as e:
+            logger.warning(f"[CALCULATE_MASTERY] Snapshot not recorded | doc_id: {mastery_doc['_id']} | error: {str(e)}")
+        if Config.PRACTICE_SESSION_QUEUE_ENABLED:
+            try:
+                practice_session_queue.mastery_updated(data.student_id)
+            except Exception as e:
+                logger.warning(f"[CALCULATE_MASTERY] Next practice session not scheduled | student_id: {data.student_id} | error: {str(e)}")
         logger.info(f"[CALCULATE_MASTERY] SUCCESS | student_id: {data.student_id} | concept_id: {data.concept_id} | mastery: {result['mastery_score']:.2f}")
 
         response = MasteryCalculationResponse(**result)
@@ -138,7 +339,7 @@ def get_student_mastery(student_id):
             available_concepts = []
 
         query = {'student_id': student_id}
-        mastery_records = find_many(STUDENT_CONCEPT_MASTERY, query)
+        mastery_records = apply_mastery_decay(find_many(STUDENT_CONCEPT_MASTERY, query))
         mastery_map = {rec['concept_id']: rec for rec in mastery_records}
         
         logger.info(f"[GET_STUDENT_MASTERY] Data retrieved | student_id: {student_id} | class_concepts: {len(available_concepts)} | mastery_records: {len(mastery_records)}")
@@ -172,7 +373,8 @@ def get_student_mastery(student_id):
                     'created_at': (concept.get('created_at').isoformat() if hasattr(concept.get('created_at'), 'isoformat') else concept.get('created_at')) if concept.get('created_at') else None,
                     'last_assessed': (record.get('last_assessed').isoformat() if hasattr(record.get('last_assessed'), 'isoformat') else record.get('last_assessed')) if record.get('last_assessed') else None,
                     'times_assessed': record.get('times_assessed', 0),
-                    'learning_velocity': record.get('learning_velocity', 0)
+                    'learning_velocity': record.get('learning_velocity', 0),
+                    'bkt_posterior': record.get('bkt_posterior')
                 })
 
         # Calculate Level Status (Unlock Logic)
@@ -236,8 +438,10 @@ def get_class_mastery_for_concept(concept_id, class_id):
             return jsonify({'error': 'Concept not found'}), 404
         
         # Aggregate mastery data for the class
+        decayed_score = {'$addFields': {'mastery_score': decayed_mastery_expression()}}
         pipeline = [
             {'$match': {'concept_id': concept_id}},
+            decayed_score,
             {'$group': {
                 '_id': None,
                 'average_mastery': {'$avg': '$mastery_score'},
@@ -270,6 +474,7 @@ def get_class_mastery_for_concept(concept_id, class_id):
         # Get distribution
         pipeline_dist = [
             {'$match': {'concept_id': concept_id}},
+            decayed_score,
             {'$bucket': {
                 'groupBy': '$mastery_score',
                 'boundaries': [0, 20, 40, 60, 80, 100],
@@ -303,158 +508,235 @@ def get_class_mastery_for_concept(concept_id, class_id):
 # ADAPTIVE PRACTICE ROUTES (BR2, BR3)
 # ============================================================================
 
+def _practice_concepts(classroom_id=None, concept_id=None):
+    """Concepts a practice session draws from"""
+    concept_query = {}
+    if concept_id:
+        # Focus mode: Only fetch the requested concept
+        concept_query['_id'] = concept_id
+    elif classroom_id:
+        # Class mode: Fetch class-specific AND global concepts
+        concept_query['$or'] = [
+            {'classroom_id': classroom_id},
+            {'classroom_id': None},
+            {'classroom_id': {'$exists': False}}
+        ]
+    return find_many(CONCEPTS, concept_query)
+
+
+def _build_practice_session(student_id, practice_request):
+    """
+    Generate a student's practice session payload from current mastery
+
+    practice_request: {'classroom_id', 'concept_id', 'session_duration'}
+    """
+    classroom_id = practice_request['classroom_id']
+
+    mastery_records = apply_mastery_decay(find_many(
+        STUDENT_CONCEPT_MASTERY,
+        {'student_id': student_id}
+    ))
+    logger.info(f"[GENERATE_PRACTICE] Mastery records retrieved | student_id: {student_id} | record_count: {len(mastery_records)}")
+
+    student_mastery = {
+        record['concept_id']: record['mastery_score']
+        for record in mastery_records
+    }
+
+    learning_velocity = {
+        record['concept_id']: record.get('learning_velocity', 0)
+        for record in mastery_records
+    }
+    logger.info(f"[GENERATE_PRACTICE] Student mastery processed | student_id: {student_id} | concepts: {len(student_mastery)}")
+
+    concepts = _practice_concepts(classroom_id, practice_request['concept_id'])
+    logger.info(f"[GENERATE_PRACTICE] Concepts retrieved | count: {len(concepts)} | classroom: {classroom_id}")
+    if not concepts:
+        logger.info("[GENERATE_PRACTICE] No concepts found, returning empty session")
+        return {
+            'session_id': str(ObjectId()),
+            'student_id': student_id,
+            'content_items': [],
+            'total_items': 0,
+            'estimated_duration': 0,
+            'cognitive_load': 0,
+            'load_status': 'NO_CONTENT',
+            'zpd_alignment': 'None',
+            'concepts_covered': {}
+        }
+
+
+
+    # One practice_items query for the concepts not already pooled
+    available_content, item_counts = practice_item_pool.bank(concepts)
+    concepts_with_content = sum(1 for n in item_counts.values() if n)
+    concepts_without_content = [
+        concept.get('name', 'Unknown') for concept in concepts
+        if not item_counts.get(str(concept['_id']))
+    ]
+
+    logger.info(f"[GENERATE_PRACTICE] Content collection complete | total_items: {len(available_content)} | concepts_with_content: {concepts_with_content} | concepts_without_content: {len(concepts_without_content)}")
+
+    if concepts_without_content:
+        logger.warning(f"[GENERATE_PRACTICE] Concepts missing practice items: {', '.join(concepts_without_content)}")
+
+    # If no content available at all, return empty session
+    if not len(available_content):
+        logger.warning(f"[GENERATE_PRACTICE] No practice items available for classroom {classroom_id} - returning empty session")
+        return {
+            'session_id': str(ObjectId()),
+            'student_id': student_id,
+            'content_items': [],
+            'total_items': 0,
+            'estimated_duration': 0,
+            'cognitive_load': 0,
+            'load_status': 'NO_CONTENT',
+            'zpd_alignment': 'None',
+            'concepts_covered': {},
+            'message': f'No practice content available. {len(concepts_without_content)} concept(s) need questions: {", ".join(concepts_without_content[:3])}'
+        }
+
+    logger.info(f"[GENERATE_PRACTICE] Calling adaptive engine | student_id: {student_id} | session_duration: {practice_request['session_duration']}")
+    session = adaptive_engine.generate_practice_session(
+        student_id=student_id,
+        student_mastery=student_mastery,
+        learning_velocity=learning_velocity,
+        available_content=available_content,
+        session_duration=practice_request['session_duration']
+    )
+
+    session_id = str(ObjectId())
+    session['session_id'] = session_id
+    logger.info(f"[GENERATE_PRACTICE] SUCCESS | student_id: {student_id} | session_id: {session_id} | item_count: {len(session.get('recommended_items', []))} | estimated_duration: {session.get('estimated_duration')}min")
+
+    return PracticeSessionResponse(**session).dict()
+
+
 @mastery_bp.route('/practice/generate', methods=['POST'])
 def generate_practice_session():
     try:
         logger.info(f"[GENERATE_PRACTICE] Request received | student_id: {request.json.get('student_id')} | session_duration: {request.json.get('session_duration')} | classroom_id: {request.json.get('classroom_id')}")
         data = PracticeSessionRequest(**request.json)
-        classroom_id = data.classroom_id # Use validated field
-
-        mastery_records = find_many(
-            STUDENT_CONCEPT_MASTERY,
-            {'student_id': data.student_id}
-        )
-        logger.info(f"[GENERATE_PRACTICE] Mastery records retrieved | student_id: {data.student_id} | record_count: {len(mastery_records)}")
-
-        student_mastery = {
-            record['concept_id']: record['mastery_score']
-            for record in mastery_records
+        practice_request = {
+            'classroom_id': data.classroom_id,
+            'concept_id': data.concept_id,
+            'session_duration': data.session_duration
         }
 
-        learning_velocity = {
-            record['concept_id']: record.get('learning_velocity', 0)
-            for record in mastery_records
-        }
-        logger.info(f"[GENERATE_PRACTICE] Student mastery processed | student_id: {data.student_id} | concepts: {len(student_mastery)}")
-        
-        from ai_engine.adaptive_practice import ContentItem
-
-        concept_query = {}
-        if data.concept_id:
-            # Focus mode: Only fetch the requested concept
-            concept_query['_id'] = data.concept_id
-        elif classroom_id:
-            # Class mode: Fetch class-specific AND global concepts
-            concept_query['$or'] = [
-                {'classroom_id': classroom_id},
-                {'classroom_id': None},
-                {'classroom_id': {'$exists': False}}
-            ]
-
-        concepts = find_many(CONCEPTS, concept_query)
-        logger.info(f"[GENERATE_PRACTICE] Concepts retrieved | count: {len(concepts)} | classroom: {classroom_id}")
-        if not concepts:
-            logger.info("[GENERATE_PRACTICE] No concepts found, returning empty session")
-            return jsonify({
-                'session_id': str(ObjectId()),
-                'student_id': data.student_id,
-                'content_items': [],
-                'total_items': 0,
-                'estimated_duration': 0,
-                'cognitive_load': 0,
-                'load_status': 'NO_CONTENT',
-                'zpd_alignment': 'None',
-                'concepts_covered': {}
-            }), 200
+        if not Config.PRACTICE_SESSION_QUEUE_ENABLED:
+            return jsonify(_build_practice_session(data.student_id, practice_request)), 200
 
+        # Pre-generated after the student's last mastery update?
+        session, mastery_version = practice_session_queue.cached_session(data.student_id, practice_request)
+        if session is not None:
+            session['session_id'] = str(ObjectId())
+            logger.info(f"[GENERATE_PRACTICE] Served pre-generated session | student_id: {data.student_id} | session_id: {session['session_id']}")
+            return jsonify(session), 200
 
+        session = _build_practice_session(data.student_id, practice_request)
+        practice_session_queue.store_session(
+            data.student_id, practice_request, session, mastery_version, requested=True
+        )
+        return jsonify(session), 200
+
+    except ValueError as e:
+        logger.error(f"[GENERATE_PRACTICE] Validation error | error: {str(e)}")
+        return jsonify({
+            'error': 'Validation error',
+            'detail': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"[GENERATE_PRACTICE] ERROR | error: {str(e)} | student_id: {request.json.get('student_id') if request.json else 'unknown'}")
+        return jsonify({
+            'error': 'Internal server error',
+            'detail': str(e)
+        }), 500
 
-        available_content = []
-        concepts_with_content = 0
-        concepts_without_content = []
-
-        for concept in concepts:
-            # Query for real items - ensure exact concept_id match
-            concept_id_str = str(concept['_id'])
-            real_items = find_many(PRACTICE_ITEMS, {'concept_id': concept_id_str})
-
-            logger.info(f"[GENERATE_PRACTICE] Concept '{concept.get('name')}' | concept_id: {concept_id_str} | items_found: {len(real_items)}")
-
-            if real_items:
-                concepts_with_content += 1
-                for item_doc in real_items:
-                    # Verify concept_id match to prevent leakage
-                    if str(item_doc.get('concept_id')) != concept_id_str:
-                        logger.warning(f"[GENERATE_PRACTICE] Skipping item {item_doc['_id']} - concept_id mismatch | expected: {concept_id_str} | got: {item_doc.get('concept_id')}")
-                        continue
-
-                    # Handle difficulty conversion safely
-                    diff_val = item_doc.get('difficulty', 0.5)
-                    try:
-                         if isinstance(diff_val, str):
-                             if diff_val.lower() == 'easy': diff_val = 0.3
-                             elif diff_val.lower() == 'medium': diff_val = 0.5
-                             elif diff_val.lower() == 'hard': diff_val = 0.7
-                             else: diff_val = float(diff_val)
-                         else:
-                             diff_val = float(diff_val)
-                    except:
-                        diff_val = 0.5
-
-                    item = ContentItem(
-                        item_id=str(item_doc['_id']),
-                        concept_id=concept_id_str,
-                        difficulty=diff_val,
-                        weight=float(concept.get('weight', 1.0)),
-                        estimated_time=5,
-                        question=item_doc.get('question', 'Question text missing'),
-                        options=item_doc.get('options', []),
-                        correct_answer=item_doc.get('correct_answer'),
-                        explanation=item_doc.get('explanation')
-                    )
-                    available_content.append(item)
-                    logger.info(f"[GENERATE_PRACTICE] Added item | item_id: {item_doc['_id']} | concept: {concept.get('name')} | question: {item_doc.get('question', '')[:50]}...")
-            else:
-                # No real items found - log but do NOT generate fallback placeholders
-                concepts_without_content.append(concept.get('name', 'Unknown'))
-                logger.warning(f"[GENERATE_PRACTICE] No practice items found for concept '{concept.get('name')}' | concept_id: {concept_id_str}")
 
-        logger.info(f"[GENERATE_PRACTICE] Content collection complete | total_items: {len(available_content)} | concepts_with_content: {concepts_with_content} | concepts_without_content: {len(concepts_without_content)}")
+@mastery_bp.route('/practice/generate/classroom', methods=['POST'])
+def generate_classroom_practice_sessions():
+    """
+    Practice sessions for every student of a classroom in one call
 
-        if concepts_without_content:
-            logger.warning(f"[GENERATE_PRACTICE] Concepts missing practice items: {', '.join(concepts_without_content)}")
+    Reads the classroom's students, concepts, practice items (through the
+    item pool) and all students' mastery with one query each, then
+    generates every session over the shared item bank, so the DB work per
+    class does not grow with the number of students.
+    """
+    try:
+        data = ClassPracticeSessionRequest(**request.json)
+        logger.info(f"[GENERATE_CLASS_PRACTICE] Request received | classroom_id: {data.classroom_id} | session_duration: {data.session_duration}")
+
+        student_ids = data.student_ids
+        if student_ids is None:
+            memberships = find_many(
+                CLASSROOM_MEMBERSHIPS,
+                {'classroom_id': data.classroom_id, 'is_active': True, 'role': 'student'},
+                {'student_id': 1}
+            )
+            student_ids = [m['student_id'] for m in memberships if m.get('student_id')]
+        student_ids = list(dict.fromkeys(student_ids))
+
+        concepts = _practice_concepts(data.classroom_id, data.concept_id)
+        available_content, item_counts = practice_item_pool.bank(concepts)
+        concepts_without_content = [
+            concept.get('name', 'Unknown') for concept in concepts
+            if not item_counts.get(str(concept['_id']))
+        ]
 
-        # If no content available at all, return empty session
-        if not available_content:
-            logger.warning(f"[GENERATE_PRACTICE] No practice items available for classroom {classroom_id} - returning empty session")
+        if not student_ids or not len(available_content):
+            logger.info(f"[GENERATE_CLASS_PRACTICE] Nothing to generate | classroom_id: {data.classroom_id} | students: {len(student_ids)} | items: {len(available_content)}")
             return jsonify({
-                'session_id': str(ObjectId()),
-                'student_id': data.student_id,
-                'content_items': [],
-                'total_items': 0,
-                'estimated_duration': 0,
-                'cognitive_load': 0,
-                'load_status': 'NO_CONTENT',
-                'zpd_alignment': 'None',
-                'concepts_covered': {},
-                'message': f'No practice content available. {len(concepts_without_content)} concept(s) need questions: {", ".join(concepts_without_content[:3])}'
+                'classroom_id': data.classroom_id,
+                'sessions': [],
+                'total_sessions': 0,
+                'total_items': len(available_content),
+                'concepts_without_content': concepts_without_content
             }), 200
 
-        logger.info(f"[GENERATE_PRACTICE] Calling adaptive engine | student_id: {data.student_id} | session_duration: {data.session_duration}")
-        session = adaptive_engine.generate_practice_session(
-            student_id=data.student_id,
-            student_mastery=student_mastery,
-            learning_velocity=learning_velocity,
-            available_content=available_content,
+        mastery_records = apply_mastery_decay(find_many(
+            STUDENT_CONCEPT_MASTERY,
+            {'student_id': {'$in': student_ids}},
+            {'student_id': 1, 'concept_id': 1, 'mastery_score': 1, 'learning_velocity': 1,
+             'last_assessed': 1, 'decay_rate': 1}
+        ))
+
+        students = {student_id: ({}, {}) for student_id in student_ids}
+        for record in mastery_records:
+            student_mastery, learning_velocity = students[record['student_id']]
+            student_mastery[record['concept_id']] = record['mastery_score']
+            learning_velocity[record['concept_id']] = record.get('learning_velocity', 0)
+
+        sessions = adaptive_engine.generate_practice_sessions(
+            students,
+            available_content,
             session_duration=data.session_duration
         )
 
-        session_id = str(ObjectId())
-        session['session_id'] = session_id
-        logger.info(f"[GENERATE_PRACTICE] SUCCESS | student_id: {data.student_id} | session_id: {session_id} | item_count: {len(session.get('recommended_items', []))} | estimated_duration: {session.get('estimated_duration')}min")
+        results = []
+        for student_id in student_ids:
+            session = sessions[student_id]
+            session['session_id'] = str(ObjectId())
+            results.append(PracticeSessionResponse(**session).dict())
 
-        response = PracticeSessionResponse(**session)
+        logger.info(f"[GENERATE_CLASS_PRACTICE] SUCCESS | classroom_id: {data.classroom_id} | sessions: {len(results)} | items: {len(available_content)} | mastery_records: {len(mastery_records)}")
 
-        return jsonify(response.dict()), 200
+        return jsonify({
+            'classroom_id': data.classroom_id,
+            'sessions': results,
+            'total_sessions': len(results),
+            'total_items': len(available_content),
+            'concepts_without_content': concepts_without_content
+        }), 200
 
     except ValueError as e:
-        logger.error(f"[GENERATE_PRACTICE] Validation error | error: {str(e)}")
+        logger.error(f"[GENERATE_CLASS_PRACTICE] Validation error | error: {str(e)}")
         return jsonify({
             'error': 'Validation error',
             'detail': str(e)
         }), 400
     except Exception as e:
-        logger.error(f"[GENERATE_PRACTICE] ERROR | error: {str(e)} | student_id: {request.json.get('student_id') if request.json else 'unknown'}")
+        logger.error(f"[GENERATE_CLASS_PRACTICE] ERROR | error: {str(e)}")
         return jsonify({
             'error': 'Internal server error',
             'detail': str(e)
@@ -481,6 +763,23 @@ def submit_student_response():
         }
 
         response_id = insert_one(STUDENT_RESPONSES, response_doc)
+        history_store.append(
+            data.student_id,
+            data.concept_id,
+            data.is_correct,
+            data.response_time,
+            response_doc['submitted_at'].timestamp()
+        )
+        try:
+            record_engagement_event(
+                data.student_id,
+                'response',
+                response_doc['submitted_at'],
+                is_correct=data.is_correct,
+                response_time=data.response_time
+            )
+        except Exception as e:
+            logger.warning(f"[SUBMIT_RESPONSE] Engagement counter not updated | response_id: {response_id} | error: {str(e)}")
         logger.info(f"[SUBMIT_RESPONSE] SUCCESS | student_id: {data.student_id} | response_id: {response_id} | concept_id: {data.concept_id} | is_correct: {data.is_correct} | time: {data.response_time}ms")
 
         return jsonify({
@@ -511,10 +810,17 @@ def get_mastery_history(student_id, concept_id):
     """
     Get historical mastery progression for a student-concept pair
     
-    GET /api/mastery/history/{student_id}/{concept_id}
+    GET /api/mastery/history/{student_id}/{concept_id}?days=30&resolution=auto&max_points=120
+    
+    Served from the daily/weekly rollups of mastery snapshots, so the cost
+    depends on the window, not on how many assessments the pair has.
     """
     try:
+        from datetime import timedelta
         days = request.args.get('days', default=30, type=int)
+        resolution = request.args.get('resolution', default='auto')
+        max_points = request.args.get('max_points', default=Config.MASTERY_HISTORY_MAX_POINTS, type=int)
+        max_points = max(1, min(max_points, Config.MASTERY_HISTORY_MAX_POINTS))
         
         # Get mastery record
         mastery_record = find_one(
@@ -522,23 +828,17 @@ def get_mastery_history(student_id, concept_id):
             {'student_id': student_id, 'concept_id': concept_id}
         )
         
-        # Get response history to build trend
-        from datetime import timedelta
-        start_date = datetime.utcnow() - timedelta(days=days)
-        
-        responses = find_many(
-            STUDENT_RESPONSES,
-            {
-                'student_id': student_id,
-                'concept_id': concept_id,
-                'submitted_at': {'$gte': start_date}
-            },
-            sort=[('submitted_at', 1)]
+        series = get_mastery_series(
+            student_id,
+            concept_id,
+            start=datetime.utcnow() - timedelta(days=days),
+            resolution=resolution,
+            max_points=max_points
         )
+        history = series['points']
         
-        # Build history (simplified - in production, store historical snapshots)
-        history = []
-        if mastery_record:
+        if not history and mastery_record:
+            # Pair last assessed before snapshots were recorded
             history.append({
                 'date': (mastery_record.get('last_assessed').isoformat() if hasattr(mastery_record.get('last_assessed'), 'isoformat') else mastery_record.get('last_assessed')) if mastery_record.get('last_assessed') else None,
                 'mastery_score': mastery_record.get('mastery_score', 0),
@@ -548,6 +848,7 @@ def get_mastery_history(student_id, concept_id):
         return jsonify({
             'student_id': student_id,
             'concept_id': concept_id,
+            'resolution': series['resolution'],
             'history': history,
             'trend': 'improving' if mastery_record and mastery_record.get('learning_velocity', 0) > 0 else 'stable',
             'velocity': mastery_record.get('learning_velocity', 0) if mastery_record else 0
@@ -560,6 +861,59 @@ def get_mastery_history(student_id, concept_id):
         }), 500
 
 
+# ============================================================================
+# MODEL STATUS
+# ============================================================================
+
+@mastery_bp.route('/models/status', methods=['GET'])
+def get_model_status():
+    """
+    Which knowledge tracing engines are loaded, their variant,
+    import/load timings and batch inference throughput
+
+    GET /api/mastery/models/status
+    """
+    return jsonify(model_registry.get_stats()), 200
+
+
+# ============================================================================
+# CONCEPT GRAPH
+# ============================================================================
+
+@mastery_bp.route('/concept/<concept_id>/related', methods=['GET'])
+def get_related_concepts(concept_id):
+    """
+    Concepts correlated with concept_id (co-practice and prerequisites),
+    strongest first
+
+    GET /api/mastery/concept/<concept_id>/related?top_k=10&min_weight=0.1
+    """
+    try:
+        if concept_graph is None:
+            return jsonify({'concept_id': concept_id, 'related': [], 'graph': {'enabled': False}}), 200
+
+        top_k = request.args.get('top_k', 10, type=int)
+        min_weight = request.args.get('min_weight', 0.0, type=float)
+        related = concept_graph.snapshot().related(concept_id, top_k=top_k, min_weight=min_weight)
+
+        logger.info(f"[RELATED_CONCEPTS] Served | concept_id: {concept_id} | related: {len(related)}")
+        return jsonify({
+            'concept_id': concept_id,
+            'related': [
+                {'concept_id': related_id, 'weight': round(weight, 4)}
+                for related_id, weight in related
+            ],
+            'graph': dict(concept_graph.get_stats(), enabled=True)
+        }), 200
+
+    except Exception as e:
+        logger.error(f"[RELATED_CONCEPTS] Error | concept_id: {concept_id} | error: {str(e)}")
+        return jsonify({
+            'error': 'Failed to fetch related concepts',
+            'detail': str(e)
+        }), 500
+
+
 # ============================================================================
 # RECOMMENDATIONS
 # ============================================================================
@@ -572,13 +926,18 @@ def get_practice_recommendations(student_id):
     GET /api/mastery/recommendations/{student_id}
     """
     try:
-        # Get all mastery records for student
-        mastery_records = find_many(
+        # Get all mastery records for student, decayed to today
+        mastery_records = apply_mastery_decay(find_many(
             STUDENT_CONCEPT_MASTERY,
-            {'student_id': student_id},
-            sort=[('mastery_score', 1)]  # Sort by lowest mastery first
-        )
+            {'student_id': student_id}
+        ))
+        mastery_records.sort(key=lambda r: r.get('mastery_score', 0))  # Lowest mastery first
         
+        # Batch concept lookups for records that need practice
+        concepts = get_loader(CONCEPTS).prime(
+            r['concept_id'] for r in mastery_records if r.get('mastery_score', 0) < 85
+        )
+
         recommendations = []
         
         for record in mastery_records:
@@ -588,7 +947,7 @@ def get_practice_recommendations(student_id):
             if mastery >= 85:
                 continue  # Skip mastered concepts
             
-            concept = find_one(CONCEPTS, {'_id': record['concept_id']})
+            concept = concepts.load(record['concept_id'])
             
             if mastery >= 60:
                 recommendation = 'LIGHT_REVIEW'
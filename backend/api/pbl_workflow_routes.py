@@ -43,7 +43,8 @@ from models.database import (
     insert_one,
     update_one,
     delete_one,
-    aggregate
+    aggregate,
+    get_loader
 )
 
 # Import logging
@@ -526,10 +527,12 @@ def get_team(team_id):
         if not team:
             return jsonify({'error': 'Team not found'}), 404
 
-        # Get member details
+        # Get member details (single batched lookup)
+        member_ids = team.get('members', [])
+        members = get_loader(STUDENTS).load_many(member_ids)
+
         members_data = []
-        for student_id in team.get('members', []):
-            student = find_one(STUDENTS, {'_id': student_id})
+        for student_id, student in zip(member_ids, members):
             if student:
                 members_data.append({
                     'student_id': student_id,
@@ -11,6 +11,7 @@ from models.database import (
 )
 from utils.logger import get_logger
 from services.ai_service import AIService
+from services.mastery_decay_service import apply_mastery_decay
 
 interest_bp = Blueprint('interest', __name__)
 logger = get_logger(__name__)
@@ -61,7 +62,7 @@ def get_interest_path():
         logger.info(f"Generating interest path for student: {student_id}")
 
         # 2. Aggregate Mastery Scores by Subject
-        mastery_docs = find_many(STUDENT_CONCEPT_MASTERY, {'student_id': student_id})
+        mastery_docs = apply_mastery_decay(find_many(STUDENT_CONCEPT_MASTERY, {'student_id': student_id}))
         subject_scores = {}
         subject_counts = {}
 
@@ -32,6 +32,7 @@ from models.database import (
     update_one,
     delete_one,
     count_documents,
+    get_loader,
     CURRICULUM_TEMPLATES,
     TEACHERS
 )
@@ -206,11 +207,14 @@ def search_templates():
             sort=[('usage_count', -1), ('rating', -1)]
         )[offset:offset+limit]
 
+        # Batch teacher lookups for the page
+        teachers = get_loader(TEACHERS).prime(t.get('teacher_id') for t in templates)
+
         # Format results
         formatted_templates = []
         for template in templates:
             # Get teacher info
-            teacher = find_one(TEACHERS, {'_id': template['teacher_id']})
+            teacher = teachers.load(template['teacher_id'])
 
             formatted_templates.append({
                 'template_id': template['_id'],
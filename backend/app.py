@@ -75,6 +75,12 @@ def create_app(config_class=Config):
     # Register error handlers
     register_error_handlers(app)
 
+    # Build knowledge tracing engines in the background once serving
+    if app.config.get("MODEL_WARMUP"):
+        from api.mastery_routes import model_registry
+        model_registry.warm_up_async(delay_seconds=app.config.get("MODEL_WARMUP_DELAY", 0))
+        logger.info(f"Model warm-up scheduled in {app.config.get('MODEL_WARMUP_DELAY', 0)}s")
+
     logger.info("=" * 60)
     logger.info("AMEP Application Initialization Complete")
     logger.info("=" * 60)
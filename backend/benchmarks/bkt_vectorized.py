@@ -0,0 +1,120 @@
+"""
+AMEP Vectorized BKT Benchmark
+Compares VectorizedBKTEngine.scan against BKTEngine.update_mastery
+
+Usage:
+    python -m benchmarks.bkt_vectorized
+    python -m benchmarks.bkt_vectorized --responses 100000 1000000 --json out.json
+
+Random responses over random per-concept parameters are folded once by
+the vectorized scan and once response-by-response through the per-event
+engine (each concept with its own parameters, starting from P(L0)).
+Reports wall time, speedup and the max posterior difference on the 0-100
+scale; exits non-zero if the two disagree by more than --tolerance.
+"""
+
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+from ai_engine.bkt_vectorized import BKTParameterTable, VectorizedBKTEngine
+from ai_engine.knowledge_tracing import BKTEngine, BKTParameters
+
+
+def _random_table(num_concepts: int, rng: np.random.Generator) -> BKTParameterTable:
+    table = BKTParameterTable()
+    for c in range(num_concepts):
+        table.set_params(f"c{c}", BKTParameters(
+            p_l0=float(rng.uniform(0.05, 0.6)),
+            p_t=float(rng.uniform(0.01, 0.4)),
+            p_g=float(rng.uniform(0.05, 0.35)),
+            p_s=float(rng.uniform(0.02, 0.2))
+        ))
+    return table
+
+
+def _reference(table: BKTParameterTable, students, concepts, correct) -> dict:
+    """Per-event fold through BKTEngine.update_mastery, like /calculate's BKT step"""
+    concept_ids = list(table.concept_index)
+    engine = BKTEngine(params_loader=lambda: [
+        dict(concept_id=concept_id, **vars(table.get_params(concept_id))) for concept_id in concept_ids
+    ])
+    mastery = {}
+    for s, c, k in zip(students.tolist(), concepts.tolist(), correct.tolist()):
+        concept_id = concept_ids[c]
+        current = mastery.get((s, c))
+        if current is None:
+            current = engine.params_for(concept_id).p_l0 * 100.0
+        mastery[(s, c)] = engine.update_mastery(current, k, concept_id)
+    return mastery
+
+
+def run(
+    sizes=(10000, 100000),
+    num_students: int = 2000,
+    num_concepts: int = 50,
+    seed: int = 0
+):
+    rng = np.random.default_rng(seed)
+    table = _random_table(num_concepts, rng)
+    engine = VectorizedBKTEngine(table)
+
+    results = []
+    for num_responses in sizes:
+        students = rng.integers(0, num_students, num_responses)
+        concepts = rng.integers(0, num_concepts, num_responses)
+        correct = rng.random(num_responses) < 0.6
+
+        started = time.perf_counter()
+        scanned = engine.scan(students, concepts, correct)
+        vectorized_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        reference = _reference(table, students, concepts, correct)
+        per_event_s = time.perf_counter() - started
+
+        expected = np.array([
+            reference[(s, c)] for s, c in zip(scanned.pair_students.tolist(), scanned.pair_concepts.tolist())
+        ])
+        results.append({
+            'responses': num_responses,
+            'pairs': int(len(scanned.mastery)),
+            'per_event_ms': per_event_s * 1000,
+            'vectorized_ms': vectorized_s * 1000,
+            'speedup': per_event_s / vectorized_s if vectorized_s else 0.0,
+            'max_abs_diff': float(np.abs(scanned.mastery_scores - expected).max())
+        })
+
+    return {
+        'benchmark': 'bkt_vectorized',
+        'num_students': num_students,
+        'num_concepts': num_concepts,
+        'results': results
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark and check the vectorized BKT scan')
+    parser.add_argument('--responses', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--concepts', type=int, default=50)
+    parser.add_argument('--tolerance', type=float, default=1e-6, help='Max allowed posterior difference (0-100)')
+    parser.add_argument('--json', help='Also write the report to this file')
+    args = parser.parse_args()
+
+    report = run(args.responses, args.students, args.concepts)
+
+    print(f"{'responses':>10} {'pairs':>8} {'per-event ms':>13} {'vector ms':>10} {'x':>7} {'max diff':>10}")
+    for row in report['results']:
+        print(f"{row['responses']:>10} {row['pairs']:>8} {row['per_event_ms']:>13.1f} "
+              f"{row['vectorized_ms']:>10.1f} {row['speedup']:>7.1f} {row['max_abs_diff']:>10.2e}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if any(row['max_abs_diff'] > args.tolerance for row in report['results']):
+        print(f"MISMATCH: vectorized scan differs from BKTEngine.update_mastery by more than {args.tolerance}")
+        sys.exit(1)
@@ -0,0 +1,106 @@
+"""
+AMEP DKVMN Recurrence Benchmark
+Compares DKVMNModel.forward against the step-by-step reference pass
+
+Usage:
+    python -m benchmarks.dkvmn_recurrence
+    python -m benchmarks.dkvmn_recurrence --lengths 20 200 2000 --batch-size 32 --json out.json
+
+For each sequence length both passes run on the same random interactions,
+in inference mode (no autograd) and in training mode (forward + backward).
+Reports median wall time, speedup and the max prediction difference.
+"""
+
+import json
+import time
+import argparse
+import numpy as np
+import torch
+
+from ai_engine.dkvmn_model import DKVMNModel
+
+
+def _time(fn, repeats: int) -> float:
+    """Median seconds of fn() over repeats (after one warm-up call)"""
+    fn()
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return float(np.median(samples))
+
+
+def run(
+    lengths=(20, 200, 2000),
+    batch_size: int = 1,
+    num_concepts: int = 100,
+    repeats: int = 5,
+    seed: int = 0
+):
+    torch.manual_seed(seed)
+    model = DKVMNModel(num_concepts=num_concepts)
+    model.eval()
+
+    results = []
+    for seq_len in lengths:
+        concept_ids = torch.randint(0, num_concepts, (batch_size, seq_len))
+        correctness = torch.randint(0, 2, (batch_size, seq_len)).float()
+        row = {'seq_len': seq_len, 'batch_size': batch_size}
+
+        # Inference path
+        with torch.no_grad():
+            reference, _ = model.forward_stepwise(concept_ids, correctness)
+            fast, _ = model(concept_ids, correctness)
+            row['max_abs_diff'] = float((reference - fast).abs().max())
+            row['inference_stepwise_ms'] = _time(
+                lambda: model.forward_stepwise(concept_ids, correctness), repeats
+            ) * 1000
+            row['inference_compiled_ms'] = _time(
+                lambda: model(concept_ids, correctness), repeats
+            ) * 1000
+
+        # Training path (forward + backward)
+        def train_step(forward):
+            predictions, _ = forward(concept_ids, correctness)
+            predictions.sum().backward()
+            model.zero_grad()
+
+        train_repeats = max(1, repeats // 2) if seq_len >= 1000 else repeats
+        row['train_stepwise_ms'] = _time(lambda: train_step(model.forward_stepwise), train_repeats) * 1000
+        row['train_compiled_ms'] = _time(lambda: train_step(model), train_repeats) * 1000
+
+        row['inference_speedup'] = row['inference_stepwise_ms'] / row['inference_compiled_ms']
+        row['train_speedup'] = row['train_stepwise_ms'] / row['train_compiled_ms']
+        results.append(row)
+
+    return {
+        'benchmark': 'dkvmn_recurrence',
+        'torch_version': torch.__version__,
+        'num_threads': torch.get_num_threads(),
+        'num_concepts': num_concepts,
+        'results': results
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the DKVMN recurrence')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[20, 200, 2000])
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--concepts', type=int, default=100)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--json', help='Also write the report to this file')
+    args = parser.parse_args()
+
+    report = run(args.lengths, args.batch_size, args.concepts, args.repeats)
+
+    print(f"{'seq_len':>8} {'infer old ms':>13} {'infer new ms':>13} {'x':>6} "
+          f"{'train old ms':>13} {'train new ms':>13} {'x':>6} {'max diff':>10}")
+    for row in report['results']:
+        print(f"{row['seq_len']:>8} {row['inference_stepwise_ms']:>13.2f} {row['inference_compiled_ms']:>13.2f} "
+              f"{row['inference_speedup']:>6.2f} {row['train_stepwise_ms']:>13.2f} "
+              f"{row['train_compiled_ms']:>13.2f} {row['train_speedup']:>6.2f} {row['max_abs_diff']:>10.2e}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,475 @@
+"""
+AMEP Knowledge Tracing Benchmark
+Latency, throughput, memory and accuracy of every knowledge tracing engine
+
+Usage:
+    python -m benchmarks.knowledge_tracing
+    python -m benchmarks.knowledge_tracing --students 2000 --concepts 100 --length 80 --json kt.json
+    python -m benchmarks.knowledge_tracing --engines bkt hybrid --baseline kt_previous.json
+
+Students are simulated from a known BKT ground truth (benchmarks.simulator)
+and split 80/20; the neural engines are trained on the first part and
+every engine is evaluated on the held-out students. Each engine replays
+the held-out interactions in order, predicting each response before it
+sees it, the way the API would serve it:
+
+    bkt             BKTEngine, default parameters
+    bkt_oracle      BKTEngine loaded with the ground-truth parameters
+    dkt_pattern     knowledge_tracing.DKTEngine (hybrid's pattern layer)
+    simplified_dkt  dkt_model.SimplifiedDKTEngine
+    dkt             dkt_model.DKTEngine (LSTM), rolling history window
+    dkvmn_memory    knowledge_tracing.DKVMNEngine (per-student memory)
+    dkvmn           dkvmn_model.DKVMNEngine (memory network)
+    hybrid          HybridKnowledgeTracing.calculate_mastery
+
+Per engine the report has p50/p99 per-update latency, throughput in
+updates per second (batched forward passes for the neural engines), AUC
+of the pre-response predictions, setup time (import, training) and peak
+RSS. auc_seen only counts responses on concepts the student practiced
+before, since first attempts carry no history. Each engine runs in a
+fresh process so RSS - including the cost of importing torch - is
+attributable to it. Reports are JSON with the git commit, so runs can be
+compared with --baseline.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import subprocess
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.simulator import simulate_cohort, auc
+
+ENGINES = (
+    'bkt', 'bkt_oracle', 'dkt_pattern', 'simplified_dkt',
+    'dkt', 'dkvmn_memory', 'dkvmn', 'hybrid'
+)
+NEURAL_ENGINES = ('dkt', 'dkvmn')
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# ============================================================================
+# STREAMING RUNNERS (one step = predict the response, then update)
+# ============================================================================
+
+class BKTRunner:
+    def __init__(self, cohort, oracle: bool = False):
+        from ai_engine.knowledge_tracing import BKTEngine, BKTParameters
+        self.engine = BKTEngine(
+            BKTParameters(),
+            params_loader=(lambda: cohort.param_documents()) if oracle else None
+        )
+
+    def start_student(self, student_index: int):
+        self.mastery = {}
+
+    def step(self, interaction: Dict) -> float:
+        concept_id = str(interaction['concept_id'])
+        params = self.engine.params_for(concept_id)
+        mastery = self.mastery.get(concept_id, params.p_l0 * 100) / 100
+        predicted = mastery * (1 - params.p_s) + (1 - mastery) * params.p_g
+        self.mastery[concept_id] = self.engine.update_mastery(
+            mastery * 100, interaction['is_correct'], concept_id
+        )
+        return predicted
+
+
+class PatternRunner:
+    """Pattern-analysis DKT engines over a per-concept rolling history"""
+
+    def __init__(self, cohort, engine_class, history_length: int):
+        self.engine = engine_class()
+        self.history_length = history_length
+
+    def start_student(self, student_index: int):
+        self.history = defaultdict(lambda: deque(maxlen=self.history_length))
+
+    def step(self, interaction: Dict) -> float:
+        history = self.history[interaction['concept_id']]
+        predicted = self.engine.analyze_pattern(list(history))['predicted_mastery'] / 100
+        history.append(interaction)
+        return predicted
+
+
+class DKVMNMemoryRunner:
+    """
+    Per-student memory layer on its own: reads, then writes an
+    erase-then-add blend of the read and the outcome (erase factor 0.3,
+    as SimplifiedDKVMNEngine does)
+    """
+
+    def __init__(self, cohort):
+        from ai_engine.knowledge_tracing import DKVMNEngine
+        from ai_engine.student_memory import StudentMemoryStore
+        self.engine = DKVMNEngine(memory_store=StudentMemoryStore(ttl_seconds=0))
+
+    def start_student(self, student_index: int):
+        self.student_id = f"student_{student_index}"
+
+    def step(self, interaction: Dict) -> float:
+        concept_id = str(interaction['concept_id'])
+        mastery = self.engine.read_mastery(self.student_id, concept_id, [])
+        outcome = 100.0 if interaction['is_correct'] else 0.0
+        self.engine.write_mastery(self.student_id, concept_id, 0.7 * mastery + 0.3 * outcome, [])
+        return mastery / 100
+
+
+class HybridRunner:
+    """calculate_mastery as /calculate calls it (previous score in, 50 first)"""
+
+    def __init__(self, cohort, history_length: int):
+        from ai_engine.knowledge_tracing import HybridKnowledgeTracing
+        from ai_engine.student_memory import StudentMemoryStore
+        self.engine = HybridKnowledgeTracing(memory_store=StudentMemoryStore(ttl_seconds=0))
+        self.history_length = history_length
+
+    def start_student(self, student_index: int):
+        self.student_id = f"student_{student_index}"
+        self.mastery = {}
+        self.history = defaultdict(lambda: deque(maxlen=self.history_length))
+
+    def step(self, interaction: Dict) -> float:
+        concept_id = str(interaction['concept_id'])
+        current = self.mastery.get(concept_id, 50.0)
+        history = self.history[concept_id]
+        history.append(interaction)
+        result = self.engine.calculate_mastery(
+            student_id=self.student_id,
+            concept_id=concept_id,
+            is_correct=interaction['is_correct'],
+            response_time=interaction['response_time'],
+            current_mastery=current,
+            response_history=list(history),
+            related_concepts=[]
+        )
+        self.mastery[concept_id] = result['mastery_score']
+        return current / 100
+
+
+class NeuralRunner:
+    """
+    Neural engine serving one prediction per update from the student's
+    rolling history window (the call HybridKnowledgeTracing makes)
+    """
+
+    def __init__(self, engine, history_length: int):
+        self.engine = engine
+        self.history_length = history_length
+
+    def start_student(self, student_index: int):
+        self.history = deque(maxlen=self.history_length)
+
+    def step(self, interaction: Dict) -> float:
+        predicted = self.engine.predict_mastery(list(self.history), interaction['concept_id'])
+        self.history.append(interaction)
+        return predicted['mastery_score'] / 100
+
+
+def replay(runner, students: List[List[Dict]], max_updates: int) -> Dict:
+    """Stream students through a runner; latency, throughput and AUC"""
+    latencies = []
+    labels, scores, repeats = [], [], []
+    started = time.perf_counter()
+    for student_index, interactions in enumerate(students):
+        runner.start_student(student_index)
+        seen = set()
+        for interaction in interactions:
+            step_started = time.perf_counter_ns()
+            predicted = runner.step(interaction)
+            latencies.append(time.perf_counter_ns() - step_started)
+            labels.append(interaction['is_correct'])
+            scores.append(predicted)
+            repeats.append(interaction['concept_id'] in seen)
+            seen.add(interaction['concept_id'])
+            if len(latencies) >= max_updates:
+                break
+        if len(latencies) >= max_updates:
+            break
+    elapsed = time.perf_counter() - started
+
+    latencies_us = np.asarray(latencies) / 1000
+    labels, scores, repeats = np.asarray(labels), np.asarray(scores), np.asarray(repeats)
+    return {
+        'updates': len(latencies),
+        'p50_us': round(float(np.percentile(latencies_us, 50)), 2),
+        'p99_us': round(float(np.percentile(latencies_us, 99)), 2),
+        'throughput_per_s': round(len(latencies) / elapsed, 1),
+        'auc': round(auc(labels, scores), 4),
+        # Responses on concepts the student already practiced
+        'auc_seen': round(auc(labels[repeats], scores[repeats]), 4)
+    }
+
+
+# ============================================================================
+# NEURAL ENGINES (trained on the training split)
+# ============================================================================
+
+def _build_dkt(train, num_concepts: int, epochs: int, workdir: str):
+    from ai_engine.dkt_model import DKTEngine
+    from ai_engine.dkt_training import InteractionSequenceDataset, train_dkt
+
+    engine = DKTEngine(num_concepts, model_path=os.path.join(workdir, 'dkt.pt'))
+    if epochs:
+        dataset = InteractionSequenceDataset.from_sequences(engine.encode_codes(s) for s in train)
+        train_dkt(engine, dataset, epochs=epochs, num_workers=0)
+    engine.model.eval()
+    return engine
+
+
+def _build_dkvmn(train, num_concepts: int, epochs: int, workdir: str, batch_size: int = 64):
+    """DKVMN has no trainer; a plain BCE loop over the training split"""
+    import torch
+    import torch.nn.functional as F
+    from ai_engine.dkvmn_model import DKVMNEngine
+
+    engine = DKVMNEngine(num_concepts, model_path=os.path.join(workdir, 'dkvmn.pt'))
+    concept_ids, correctness, mask = _pad(train)
+    concept_ids, correctness, mask = map(torch.from_numpy, (concept_ids, correctness, mask))
+    generator = torch.Generator().manual_seed(0)
+    engine.model.train()
+    for _ in range(epochs):
+        for batch in torch.randperm(len(train), generator=generator).split(batch_size):
+            predictions, _ = engine.model(concept_ids[batch], correctness[batch])
+            loss = F.binary_cross_entropy(
+                predictions[mask[batch]].clamp(1e-6, 1 - 1e-6), correctness[batch][mask[batch]]
+            )
+            engine.optimizer.zero_grad()
+            loss.backward()
+            engine.optimizer.step()
+    engine.model.eval()
+    return engine
+
+
+def _pad(students: List[List[Dict]]):
+    lengths = np.array([len(s) for s in students])
+    concept_ids = np.zeros((len(students), lengths.max()), dtype=np.int64)
+    correctness = np.zeros((len(students), lengths.max()), dtype=np.float32)
+    for row, interactions in enumerate(students):
+        concept_ids[row, :len(interactions)] = [i['concept_id'] for i in interactions]
+        correctness[row, :len(interactions)] = [i['is_correct'] for i in interactions]
+    mask = np.arange(lengths.max())[None, :] < lengths[:, None]
+    return concept_ids, correctness, mask
+
+
+def _neural_batch_metrics(name: str, engine, held_out, batch_size: int) -> Dict:
+    """
+    Full-sequence forward passes over the held-out students: AUC of every
+    next-response prediction and interactions scored per second
+    """
+    import torch
+
+    labels, scores = [], []
+    started = time.perf_counter()
+    with torch.no_grad():
+        for start in range(0, len(held_out), batch_size):
+            batch = held_out[start:start + batch_size]
+            concept_ids, correctness, mask = _pad(batch)
+            if name == 'dkt':
+                codes, lengths = engine._pad_codes([engine.encode_codes(s) for s in batch])
+                output, _ = engine.model(codes[:, :-1], lengths=lengths - 1)
+                next_concepts = torch.from_numpy(concept_ids[:, 1:])
+                predictions = output.gather(-1, next_concepts.unsqueeze(-1)).squeeze(-1).numpy()
+                step_mask = mask[:, 1:]
+                labels.append(correctness[:, 1:][step_mask])
+            else:
+                predictions, _ = engine.model(torch.from_numpy(concept_ids), torch.from_numpy(correctness))
+                predictions = predictions.numpy()
+                step_mask = mask
+                labels.append(correctness[step_mask])
+            scores.append(predictions[step_mask])
+    elapsed = time.perf_counter() - started
+
+    labels, scores = np.concatenate(labels), np.concatenate(scores)
+    return {
+        'batch_throughput_per_s': round(len(scores) / elapsed, 1),
+        'auc': round(auc(labels > 0.5, scores), 4)
+    }
+
+
+# ============================================================================
+# ONE ENGINE (runs in its own process)
+# ============================================================================
+
+def run_engine(name: str, config: Dict) -> Dict:
+    """Benchmark one engine; config holds the cohort and run settings"""
+    cohort = simulate_cohort(config['students'], config['concepts'], config['length'], config['seed'])
+    train, held_out = cohort.split()
+    baseline_rss = _peak_rss_mb()
+    history_length = config['history_length']
+
+    setup_started = time.perf_counter()
+    if name in ('bkt', 'bkt_oracle'):
+        runner = BKTRunner(cohort, oracle=name == 'bkt_oracle')
+    elif name == 'dkt_pattern':
+        from ai_engine.knowledge_tracing import DKTEngine
+        runner = PatternRunner(cohort, DKTEngine, history_length)
+    elif name == 'simplified_dkt':
+        from ai_engine.dkt_model import SimplifiedDKTEngine
+        runner = PatternRunner(cohort, SimplifiedDKTEngine, history_length)
+    elif name == 'dkvmn_memory':
+        runner = DKVMNMemoryRunner(cohort)
+    elif name == 'hybrid':
+        runner = HybridRunner(cohort, history_length)
+    elif name in NEURAL_ENGINES:
+        import tempfile
+        import torch
+        torch.manual_seed(config['seed'])
+        torch.set_num_threads(config['threads'])
+        build = _build_dkt if name == 'dkt' else _build_dkvmn
+        engine = build(train, cohort.num_concepts, config['epochs'], tempfile.mkdtemp())
+        runner = NeuralRunner(engine, history_length)
+    else:
+        raise ValueError(f"Unknown engine: {name}")
+    setup_seconds = time.perf_counter() - setup_started
+
+    max_updates = config['neural_updates'] if name in NEURAL_ENGINES else config['max_updates']
+    result = replay(runner, held_out, max_updates)
+    if name in NEURAL_ENGINES:
+        # AUC over every held-out response from batched passes; the
+        # streaming AUC above only covers the latency sample
+        batch = _neural_batch_metrics(name, runner.engine, held_out, config['batch_size'])
+        result['streaming_auc'] = result['auc']
+        result.update(batch, throughput_per_s=batch['batch_throughput_per_s'], epochs=config['epochs'])
+
+    result.update(
+        setup_seconds=round(setup_seconds, 3),
+        baseline_rss_mb=round(baseline_rss, 1),
+        peak_rss_mb=round(_peak_rss_mb(), 1)
+    )
+    return result
+
+
+# ============================================================================
+# SUITE
+# ============================================================================
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    engines=ENGINES,
+    students: int = 1000,
+    concepts: int = 20,
+    length: int = 100,
+    epochs: int = 3,
+    history_length: int = 50,
+    max_updates: int = 20000,
+    neural_updates: int = 2000,
+    batch_size: int = 64,
+    threads: int = 1,
+    seed: int = 0,
+    isolate: bool = True
+) -> Dict:
+    config = {
+        'students': students, 'concepts': concepts, 'length': length,
+        'epochs': epochs, 'history_length': history_length,
+        'max_updates': max_updates, 'neural_updates': neural_updates,
+        'batch_size': batch_size, 'threads': threads, 'seed': seed,
+        'isolated': isolate
+    }
+    report = {
+        'benchmark': 'knowledge_tracing',
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'config': config,
+        'engines': {}
+    }
+
+    for name in engines:
+        if isolate:
+            # Fresh interpreter per engine: peak RSS is the engine's own
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                report['engines'][name] = pool.submit(run_engine, name, config).result()
+        else:
+            report['engines'][name] = run_engine(name, config)
+        print(f"  {name:<15} done", file=sys.stderr)
+    return report
+
+
+def compare(report: Dict, baseline: Dict) -> List[Dict]:
+    """Per-engine ratios (current / baseline) of the headline metrics"""
+    rows = []
+    for name, row in report['engines'].items():
+        previous = baseline.get('engines', {}).get(name)
+        if not previous:
+            continue
+        ratios = {'engine': name}
+        for metric in ('p50_us', 'p99_us', 'throughput_per_s', 'peak_rss_mb', 'auc'):
+            if previous.get(metric):
+                ratios[metric] = round(row[metric] / previous[metric], 3)
+        rows.append(ratios)
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the knowledge tracing engines')
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=list(ENGINES))
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--concepts', type=int, default=20)
+    parser.add_argument('--length', type=int, default=100, help='Interactions per student')
+    parser.add_argument('--epochs', type=int, default=3, help='Training epochs of the neural engines')
+    parser.add_argument('--history-length', type=int, default=50)
+    parser.add_argument('--max-updates', type=int, default=20000, help='Updates timed per engine')
+    parser.add_argument('--neural-updates', type=int, default=2000, help='Updates timed per neural engine')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=1, help='torch intra-op threads')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-isolate', action='store_true', help='Run all engines in this process')
+    parser.add_argument('--json', help='Also write the report to this file')
+    parser.add_argument('--baseline', help='Earlier --json report to compare against')
+    args = parser.parse_args()
+
+    report = run(
+        args.engines, args.students, args.concepts, args.length, args.epochs,
+        args.history_length, args.max_updates, args.neural_updates,
+        args.batch_size, args.threads, args.seed, isolate=not args.no_isolate
+    )
+
+    print(f"\ncommit {report['commit']} | {args.students} students x {args.concepts} concepts x {args.length} interactions")
+    print(f"{'engine':<15} {'updates':>8} {'p50 us':>10} {'p99 us':>10} {'updates/s':>11} {'auc':>7} {'auc seen':>9} {'setup s':>8} {'rss MB':>8}")
+    for name, row in report['engines'].items():
+        print(f"{name:<15} {row['updates']:>8} {row['p50_us']:>10.1f} {row['p99_us']:>10.1f} "
+              f"{row['throughput_per_s']:>11.1f} {row['auc']:>7.4f} {row['auc_seen']:>9.4f} "
+              f"{row['setup_seconds']:>8.2f} {row['peak_rss_mb']:>8.1f}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report['baseline_commit'] = baseline.get('commit')
+        report['vs_baseline'] = compare(report, baseline)
+        print(f"\nvs {args.baseline} (commit {baseline.get('commit')}), current / baseline")
+        print(f"{'engine':<15} {'p50':>7} {'p99':>7} {'updates/s':>10} {'rss':>7} {'auc':>7}")
+        for row in report['vs_baseline']:
+            print(f"{row['engine']:<15} {row.get('p50_us', float('nan')):>7.3f} {row.get('p99_us', float('nan')):>7.3f} "
+                  f"{row.get('throughput_per_s', float('nan')):>10.3f} {row.get('peak_rss_mb', float('nan')):>7.3f} "
+                  f"{row.get('auc', float('nan')):>7.3f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
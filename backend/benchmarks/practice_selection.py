@@ -0,0 +1,129 @@
+"""
+AMEP Practice Selection Benchmark
+Compares the greedy and knapsack strategies of select_next_content
+
+Usage:
+    python -m benchmarks.practice_selection
+    python -m benchmarks.practice_selection --pools 1000 10000 50000 --durations 30 60 --json out.json
+
+Each student gets random mastery over the pool's concepts and selects
+from the same ContentBank with both strategies. Reports p50/p99 latency
+and session quality: total ZPD score of the selected items, item count,
+minutes used and average cognitive load. Knapsack tables larger than
+knapsack_max_cells fall back to greedy, which shows up as identical rows.
+"""
+
+import json
+import time
+import argparse
+import numpy as np
+
+from ai_engine.adaptive_practice import AdaptivePracticeEngine, ContentBank, ContentItem
+
+STRATEGIES = ('greedy', 'knapsack')
+
+
+def build_pool(num_items: int, num_concepts: int, rng: np.random.Generator) -> ContentBank:
+    """Random practice items spread over num_concepts concepts"""
+    concepts = rng.integers(0, num_concepts, num_items)
+    difficulty = np.round(rng.random(num_items), 2)
+    weight = rng.choice([1.0, 1.5], num_items)
+    estimated_time = rng.choice([3, 5, 6, 8], num_items)
+    scaffolding = rng.random(num_items) < 0.5
+    return ContentBank.from_items(
+        ContentItem(
+            item_id=f"item_{i}",
+            concept_id=f"concept_{concepts[i]}",
+            difficulty=float(difficulty[i]),
+            weight=float(weight[i]),
+            estimated_time=int(estimated_time[i]),
+            scaffolding_available=bool(scaffolding[i])
+        )
+        for i in range(num_items)
+    )
+
+
+def _session_quality(engine, bank, selected, mastery, velocity):
+    """(total ZPD score, minutes, average load) of a selection"""
+    if not selected:
+        return 0.0, 0, 0.0
+    scores = dict(zip(bank.item_ids, engine._zpd_scores(bank, mastery, velocity).tolist()))
+    total = sum(scores[item.item_id.replace('_scaffolded', '')] for item in selected)
+    minutes = sum(item.estimated_time for item in selected)
+    return total, minutes, engine.calculate_cognitive_load(selected, mastery)
+
+
+def run(
+    pools=(1000, 10000, 50000),
+    durations=(30, 60),
+    num_concepts: int = 200,
+    students: int = 20,
+    seed: int = 0
+):
+    rng = np.random.default_rng(seed)
+    engine = AdaptivePracticeEngine()
+
+    results = []
+    for pool_size in pools:
+        bank = build_pool(pool_size, num_concepts, rng)
+        cohort = [
+            (
+                {f"concept_{c}": float(rng.choice([10, 30, 45, 70, 90])) for c in range(num_concepts)},
+                {f"concept_{c}": float(rng.choice([-1.0, 0.0, 2.0])) for c in range(num_concepts)}
+            )
+            for _ in range(students)
+        ]
+
+        for duration in durations:
+            row = {'pool': pool_size, 'duration': duration}
+            for strategy in STRATEGIES:
+                latencies, quality = [], []
+                for mastery, velocity in cohort:
+                    started = time.perf_counter()
+                    selected = engine.select_next_content(bank, mastery, velocity, duration, strategy)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    quality.append(_session_quality(engine, bank, selected, mastery, velocity) + (len(selected),))
+
+                quality = np.array(quality)
+                row[strategy] = {
+                    'p50_ms': float(np.percentile(latencies, 50)),
+                    'p99_ms': float(np.percentile(latencies, 99)),
+                    'zpd_score': float(quality[:, 0].mean()),
+                    'minutes': float(quality[:, 1].mean()),
+                    'load': float(quality[:, 2].mean()),
+                    'items': float(quality[:, 3].mean())
+                }
+            results.append(row)
+
+    return {
+        'benchmark': 'practice_selection',
+        'num_concepts': num_concepts,
+        'students': students,
+        'knapsack_max_cells': engine.knapsack_max_cells,
+        'results': results
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark greedy vs knapsack practice selection')
+    parser.add_argument('--pools', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--durations', type=int, nargs='+', default=[30, 60])
+    parser.add_argument('--concepts', type=int, default=200)
+    parser.add_argument('--students', type=int, default=20)
+    parser.add_argument('--json', help='Also write the report to this file')
+    args = parser.parse_args()
+
+    report = run(args.pools, args.durations, args.concepts, args.students)
+
+    print(f"{'pool':>7} {'min':>4} {'strategy':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'ZPD score':>10} {'items':>6} {'minutes':>8} {'load':>6}")
+    for row in report['results']:
+        for strategy in STRATEGIES:
+            stats = row[strategy]
+            print(f"{row['pool']:>7} {row['duration']:>4} {strategy:>9} {stats['p50_ms']:>8.2f} "
+                  f"{stats['p99_ms']:>8.2f} {stats['zpd_score']:>10.2f} {stats['items']:>6.1f} "
+                  f"{stats['minutes']:>8.1f} {stats['load']:>6.3f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
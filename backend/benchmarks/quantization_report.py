@@ -0,0 +1,177 @@
+"""
+AMEP Quantization Report
+Accuracy vs latency of int8 inference-only engines against fp32
+
+Usage:
+    python -m benchmarks.quantization_report
+    python -m benchmarks.quantization_report --students 2000 --concepts 50 --json report.json
+
+A DKT model is trained briefly on synthetic BKT students, saved, and then
+loaded three ways: the regular fp32 engine (with optimizer), an
+inference-only fp32 engine, and an inference-only int8 engine. DKVMN is
+compared the same way from random initial weights (it has no trainer).
+For each variant the report gives held-out next-step AUC (DKT), the
+largest prediction difference from fp32, p50/p99 single-request latency,
+batch throughput and the serialized size of the weights and optimizer state.
+"""
+
+import io
+import os
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+import torch
+
+from ai_engine.dkt_model import DKTEngine
+from ai_engine.dkvmn_model import DKVMNEngine
+from ai_engine.dkt_training import InteractionSequenceDataset, train_dkt
+from benchmarks.simulator import simulate_students, auc
+
+
+def next_step_predictions(engine: DKTEngine, students):
+    """(labels, scores) of every next response given the preceding ones"""
+    codes, lengths = engine._pad_codes([engine.encode_codes(s) for s in students])
+    with torch.no_grad():
+        output, _ = engine.model(codes[:, :-1], lengths=lengths - 1)
+    next_codes = codes[:, 1:]
+    next_concepts = next_codes % engine.num_concepts
+    scores = output.gather(-1, next_concepts.unsqueeze(-1)).squeeze(-1)
+    mask = torch.arange(next_codes.size(1)).unsqueeze(0) < (lengths - 1).unsqueeze(1)
+    labels = (next_codes >= engine.num_concepts)[mask].numpy()
+    return labels, scores[mask].numpy()
+
+
+def state_bytes(obj) -> int:
+    """Serialized size of a module's or optimizer's state_dict (0 if None)"""
+    if obj is None:
+        return 0
+    buffer = io.BytesIO()
+    torch.save(obj.state_dict(), buffer)
+    return buffer.tell()
+
+
+def time_engine(engine, students, batch_size: int, repeats: int):
+    """p50/p99 single-request latency and batched throughput"""
+    samples = []
+    for i in range(repeats):
+        started = time.perf_counter()
+        engine.predict_mastery(students[i % len(students)], 0)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    batch = [(s, 0) for s in students[:batch_size]]
+    engine.predict_mastery_batch(batch)
+    started = time.perf_counter()
+    rounds = max(1, repeats // 10)
+    for _ in range(rounds):
+        engine.predict_mastery_batch(batch)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'p50_ms': round(float(np.percentile(samples, 50)), 3),
+        'p99_ms': round(float(np.percentile(samples, 99)), 3),
+        'batch_throughput_per_s': round(rounds * len(batch) / elapsed, 1)
+    }
+
+
+def run(
+    num_students: int = 1000,
+    num_concepts: int = 50,
+    length: int = 50,
+    epochs: int = 3,
+    batch_size: int = 64,
+    repeats: int = 200,
+    num_threads: int = 1
+):
+    torch.manual_seed(0)
+    students = simulate_students(num_students, num_concepts, length)
+    split = int(len(students) * 0.8)
+    train, held_out = students[:split], students[split:]
+    workdir = tempfile.mkdtemp()
+    report = {'benchmark': 'quantization_report', 'torch_version': torch.__version__,
+              'num_threads': num_threads, 'students': num_students, 'concepts': num_concepts,
+              'sequence_length': length}
+
+    # ---- DKT ---------------------------------------------------------------
+    dkt_path = os.path.join(workdir, 'dkt.pt')
+    trainer = DKTEngine(num_concepts, model_path=dkt_path)
+    dataset = InteractionSequenceDataset.from_sequences(trainer.encode_codes(s) for s in train)
+    train_dkt(trainer, dataset, epochs=epochs, num_workers=0)
+    trainer.save_model()
+
+    torch.set_num_threads(num_threads)
+    variants = {
+        'fp32_training_engine': trainer,
+        'fp32_inference_only': DKTEngine(num_concepts, model_path=dkt_path, inference_only=True,
+                                         num_threads=num_threads),
+        'int8_inference_only': DKTEngine(num_concepts, model_path=dkt_path, inference_only=True,
+                                         quantize=True, num_threads=num_threads)
+    }
+    trainer.model.eval()
+    _, reference = next_step_predictions(trainer, held_out)
+
+    report['dkt'] = {}
+    for name, engine in variants.items():
+        labels, scores = next_step_predictions(engine, held_out)
+        report['dkt'][name] = dict(
+            time_engine(engine, held_out, batch_size, repeats),
+            auc=round(auc(labels, scores), 4),
+            max_abs_diff_vs_fp32=float(np.abs(scores - reference).max()),
+            weight_bytes=state_bytes(engine.model),
+            optimizer_bytes=state_bytes(engine.optimizer)
+        )
+
+    # ---- DKVMN -------------------------------------------------------------
+    dkvmn_path = os.path.join(workdir, 'dkvmn.pt')
+    torch.set_grad_enabled(True)
+    base = DKVMNEngine(num_concepts, model_path=dkvmn_path)
+    base.save_model()
+    variants = {
+        'fp32_training_engine': base,
+        'fp32_inference_only': DKVMNEngine(num_concepts, model_path=dkvmn_path, inference_only=True,
+                                           num_threads=num_threads),
+        'int8_inference_only': DKVMNEngine(num_concepts, model_path=dkvmn_path, inference_only=True,
+                                           quantize=True, num_threads=num_threads)
+    }
+    batch = [(s, 0) for s in held_out[:batch_size]]
+    reference = np.array([r['mastery_score'] for r in base.predict_mastery_batch(batch)])
+
+    report['dkvmn'] = {}
+    for name, engine in variants.items():
+        scores = np.array([r['mastery_score'] for r in engine.predict_mastery_batch(batch)])
+        report['dkvmn'][name] = dict(
+            time_engine(engine, held_out, batch_size, repeats),
+            max_abs_diff_vs_fp32_pct=float(np.abs(scores - reference).max()),
+            weight_bytes=state_bytes(engine.model),
+            optimizer_bytes=state_bytes(engine.optimizer)
+        )
+
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='int8 vs fp32 accuracy/latency report')
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--concepts', type=int, default=50)
+    parser.add_argument('--length', type=int, default=50)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--json', help='Also write the report to this file')
+    args = parser.parse_args()
+
+    report = run(args.students, args.concepts, args.length, args.epochs,
+                 repeats=args.repeats, num_threads=args.threads)
+
+    for model_name in ('dkt', 'dkvmn'):
+        print(f"\n{model_name.upper()}")
+        print(f"{'variant':<22} {'p50 ms':>8} {'p99 ms':>8} {'batch/s':>9} {'auc':>7} {'max diff':>10} {'weights B':>10} {'optim B':>10}")
+        for name, row in report[model_name].items():
+            diff = row.get('max_abs_diff_vs_fp32', row.get('max_abs_diff_vs_fp32_pct'))
+            print(f"{name:<22} {row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f} {row['batch_throughput_per_s']:>9.1f} "
+                  f"{row.get('auc', float('nan')):>7.4f} {diff:>10.2e} {row['weight_bytes']:>10} {row['optimizer_bytes']:>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,120 @@
+"""
+AMEP Synthetic Student Simulator
+Students drawn from a known BKT ground truth, for benchmarks
+
+Each concept gets its own (p_l0, p_t, p_g, p_s). A student starts knowing
+a concept with probability p_l0, answers correctly with 1 - p_s if they
+know it and p_g otherwise, and learns it after each attempt with
+probability p_t. Response times (seconds) are log-normal and shorter
+once a concept is known, so pattern-based engines see a realistic signal.
+
+Everything is deterministic in the seed, so separate benchmark processes
+can rebuild the same cohort instead of receiving it pickled.
+"""
+
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+
+@dataclass
+class SyntheticCohort:
+    """
+    Simulated students and the parameters that generated them
+
+    students: Per-student interaction lists ({'concept_id': int,
+        'is_correct': bool, 'response_time': float})
+    params: Ground-truth arrays p_l0, p_t, p_g, p_s indexed by concept
+    """
+    students: List[List[Dict]]
+    params: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def num_concepts(self) -> int:
+        return len(self.params['p_l0'])
+
+    @property
+    def num_interactions(self) -> int:
+        return sum(len(s) for s in self.students)
+
+    def split(self, held_out_fraction: float = 0.2):
+        """(train, held_out) student lists"""
+        cut = int(len(self.students) * (1 - held_out_fraction))
+        return self.students[:cut], self.students[cut:]
+
+    def param_documents(self) -> List[Dict]:
+        """Ground truth in the shape BKTEngine's params_loader returns"""
+        return [
+            {
+                'concept_id': str(concept),
+                'p_l0': float(self.params['p_l0'][concept]),
+                'p_t': float(self.params['p_t'][concept]),
+                'p_g': float(self.params['p_g'][concept]),
+                'p_s': float(self.params['p_s'][concept])
+            }
+            for concept in range(self.num_concepts)
+        ]
+
+
+def simulate_cohort(
+    num_students: int,
+    num_concepts: int,
+    length: int,
+    seed: int = 0
+) -> SyntheticCohort:
+    """
+    Simulate num_students students with length interactions each over
+    num_concepts concepts (uniformly drawn)
+    """
+    rng = np.random.default_rng(seed)
+    params = {
+        'p_l0': rng.uniform(0.1, 0.5, num_concepts),
+        'p_t': rng.uniform(0.05, 0.3, num_concepts),
+        'p_g': rng.uniform(0.1, 0.3, num_concepts),
+        'p_s': rng.uniform(0.05, 0.15, num_concepts)
+    }
+
+    students = []
+    for _ in range(num_students):
+        known = rng.random(num_concepts) < params['p_l0']
+        concepts = rng.integers(0, num_concepts, length)
+        draws = rng.random((length, 2))
+        times = rng.lognormal(np.log(12.0), 0.4, length)
+        interactions = []
+        for step, concept in enumerate(concepts):
+            was_known = known[concept]
+            correct = draws[step, 0] < (1 - params['p_s'][concept] if was_known else params['p_g'][concept])
+            interactions.append({
+                'concept_id': int(concept),
+                'is_correct': bool(correct),
+                'response_time': float(times[step] * (0.6 if was_known else 1.0))
+            })
+            if not was_known:
+                known[concept] = draws[step, 1] < params['p_t'][concept]
+        students.append(interactions)
+
+    return SyntheticCohort(students, params)
+
+
+def simulate_students(num_students: int, num_concepts: int, length: int, seed: int = 0):
+    """BKT ground-truth students; returns per-student interaction lists"""
+    return simulate_cohort(num_students, num_concepts, length, seed).students
+
+
+def auc(labels: np.ndarray, scores: np.ndarray) -> float:
+    """Area under the ROC curve via the rank-sum statistic (ties averaged)"""
+    labels = np.asarray(labels, dtype=bool)
+    scores = np.asarray(scores, dtype=np.float64)
+    positives, negatives = labels.sum(), (~labels).sum()
+    if not positives or not negatives:
+        return float('nan')
+    order = np.argsort(scores, kind='mergesort')
+    sorted_scores = scores[order]
+    ranks = np.empty(len(scores))
+    ranks[order] = np.arange(1, len(scores) + 1)
+    # Average the ranks of tied scores (pattern engines emit many ties)
+    _, first, counts = np.unique(sorted_scores, return_index=True, return_counts=True)
+    tied = counts > 1
+    for start, count in zip(first[tied], counts[tied]):
+        ranks[order[start:start + count]] = start + (count + 1) / 2
+    return float((ranks[labels].sum() - positives * (positives + 1) / 2) / (positives * negatives))
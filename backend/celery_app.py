@@ -2,6 +2,7 @@ from celery import Celery
 import os
 import logging
 from kombu import Queue
+from celery.schedules import crontab
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,15 @@ app.conf.result_backend = REDIS_URL
 app.conf.task_routes = {
     'celery_app.process_mastery_update': {'queue': 'ml_processing'},
     'celery_app.update_engagement_metrics': {'queue': 'analytics'},
+    'celery_app.recompute_bkt_posteriors': {'queue': 'ml_processing'},
+}
+
+# Nightly jobs (run with `celery -A celery_app beat`)
+app.conf.beat_schedule = {
+    'recompute-bkt-posteriors': {
+        'task': 'celery_app.recompute_bkt_posteriors',
+        'schedule': crontab(hour=int(os.getenv('BKT_RECOMPUTE_HOUR', 2)), minute=0),
+    },
 }
 
 # Queue configuration
@@ -61,5 +71,16 @@ def update_engagement_metrics(self, student_id, engagement_data):
         logger.error(f"Engagement update failed for student {student_id}: {exc}")
         raise self.retry(exc=exc, countdown=30 * (2 ** self.request.retries))
 
+@app.task(bind=True, max_retries=1)
+def recompute_bkt_posteriors(self):
+    """Refold every student's BKT posteriors from student_responses"""
+    try:
+        from services.bkt_recompute_service import run_recompute_job
+        return run_recompute_job()
+
+    except Exception as exc:
+        logger.error(f"BKT posterior recompute failed: {exc}")
+        raise self.retry(exc=exc, countdown=600)
+
 if __name__ == '__main__':
     app.start()
\ No newline at end of file
@@ -116,20 +116,88 @@ class Config:
     BKT_GUESS_RATE = float(os.getenv('BKT_GUESS_RATE', 0.25))
     BKT_SLIP_RATE = float(os.getenv('BKT_SLIP_RATE', 0.1))
     
+    # Per-concept BKT fitting (EM job writing bkt_concept_params)
+    BKT_FIT_MIN_RESPONSES = int(os.getenv('BKT_FIT_MIN_RESPONSES', 50))
+    BKT_FIT_MAX_ITERATIONS = int(os.getenv('BKT_FIT_MAX_ITERATIONS', 100))
+    BKT_FIT_TOLERANCE = float(os.getenv('BKT_FIT_TOLERANCE', 1e-5))
+    BKT_FIT_WORKERS = int(os.getenv('BKT_FIT_WORKERS', os.cpu_count() or 1))
+    BKT_PARAMS_REFRESH_SECONDS = int(os.getenv('BKT_PARAMS_REFRESH_SECONDS', 3600))
+    BKT_RECOMPUTE_WRITE_BATCH = int(os.getenv('BKT_RECOMPUTE_WRITE_BATCH', 1000))  # nightly bkt_posterior job
+    
+    # Mastery replay/backfill job (rebuilds student_concept_mastery)
+    MASTERY_REPLAY_WORKERS = int(os.getenv('MASTERY_REPLAY_WORKERS', os.cpu_count() or 1))
+    MASTERY_REPLAY_CHUNK_STUDENTS = int(os.getenv('MASTERY_REPLAY_CHUNK_STUDENTS', 200))
+    MASTERY_REPLAY_WRITE_BATCH = int(os.getenv('MASTERY_REPLAY_WRITE_BATCH', 1000))
+    
     # Deep Knowledge Tracing parameters
     DKT_SEQUENCE_LENGTH = int(os.getenv('DKT_SEQUENCE_LENGTH', 10))
     DKT_HISTORY_WEIGHT = float(os.getenv('DKT_HISTORY_WEIGHT', 0.7))
     DKT_TREND_WEIGHT = float(os.getenv('DKT_TREND_WEIGHT', 0.3))
     
+    # DKT LSTM model and offline training job
+    DKT_MODEL_PATH = os.getenv('DKT_MODEL_PATH', 'models/dkt_model.pt')
+    DKT_HIDDEN_DIM = int(os.getenv('DKT_HIDDEN_DIM', 100))
+    DKT_EMBEDDING_DIM = int(os.getenv('DKT_EMBEDDING_DIM', 0))  # 0 = one-hot input
+    DKT_TRAIN_EPOCHS = int(os.getenv('DKT_TRAIN_EPOCHS', 10))
+    DKT_TRAIN_BATCH_SIZE = int(os.getenv('DKT_TRAIN_BATCH_SIZE', 64))
+    DKT_TRAIN_WORKERS = int(os.getenv('DKT_TRAIN_WORKERS', 2))
+    DKT_TRAIN_MAX_LENGTH = int(os.getenv('DKT_TRAIN_MAX_LENGTH', 200))
+    
+    # Neural engine serving mode (CPU workers)
+    MODEL_INFERENCE_ONLY = os.getenv('MODEL_INFERENCE_ONLY', 'True') == 'True'
+    MODEL_QUANTIZE_INT8 = os.getenv('MODEL_QUANTIZE_INT8', 'False') == 'True'
+    TORCH_NUM_THREADS = int(os.getenv('TORCH_NUM_THREADS', 1))  # per worker
+    DKT_STATE_CACHE_SIZE = int(os.getenv('DKT_STATE_CACHE_SIZE', 5000))  # students per worker
+    DKT_STATE_PERSIST = os.getenv('DKT_STATE_PERSIST', 'True') == 'True'  # persist every update (batched)
+    DKT_STATE_FLUSH_SECONDS = float(os.getenv('DKT_STATE_FLUSH_SECONDS', 2))  # 0 = write at the end of each batch
+    INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', 64))  # requests per forward pass
+    INFERENCE_MAX_WAIT_MS = float(os.getenv('INFERENCE_MAX_WAIT_MS', 10))  # batching window
+    
+    # Model registry: torch is only imported once a neural engine is requested
+    KT_USE_NEURAL_ENGINES = os.getenv('KT_USE_NEURAL_ENGINES', 'False') == 'True'
+    MODEL_WARMUP = os.getenv('MODEL_WARMUP', 'True') == 'True'
+    MODEL_WARMUP_DELAY = float(os.getenv('MODEL_WARMUP_DELAY', 5))  # seconds after start
+    
+    # Rolling per-(student, concept) response history used by /calculate
+    RESPONSE_HISTORY_LENGTH = int(os.getenv('RESPONSE_HISTORY_LENGTH', 50))
+    RESPONSE_HISTORY_MAX_PAIRS = int(os.getenv('RESPONSE_HISTORY_MAX_PAIRS', 100000))
+    RESPONSE_HISTORY_TTL = int(os.getenv('RESPONSE_HISTORY_TTL', 600))  # seconds since seeding
+    RESPONSE_HISTORY_CHECK_LATEST = os.getenv('RESPONSE_HISTORY_CHECK_LATEST', 'True') == 'True'  # re-seed rings behind the DB
+    
+    # Mastery trend history (/history served from daily/weekly rollups)
+    MASTERY_HISTORY_MAX_POINTS = int(os.getenv('MASTERY_HISTORY_MAX_POINTS', 120))
+    MASTERY_SNAPSHOT_TTL_DAYS = int(os.getenv('MASTERY_SNAPSHOT_TTL_DAYS', 0))  # 0 = keep raw snapshots
+    
     # DKVMN parameters
     DKVMN_MEMORY_SIZE = int(os.getenv('DKVMN_MEMORY_SIZE', 50))
     DKVMN_CORRELATION_THRESHOLD = float(os.getenv('DKVMN_CORRELATION_THRESHOLD', 0.3))
     
+    # Per-student DKVMN memory store (in-process LRU tier, spills to Mongo)
+    DKVMN_MEMORY_STORE_CAPACITY = int(os.getenv('DKVMN_MEMORY_STORE_CAPACITY', 10000))
+    DKVMN_MEMORY_STORE_TTL = int(os.getenv('DKVMN_MEMORY_STORE_TTL', 1800))  # seconds
+    DKVMN_MEMORY_STORE_SHARDS = int(os.getenv('DKVMN_MEMORY_STORE_SHARDS', 16))
+    DKVMN_MEMORY_WRITE_THROUGH = os.getenv('DKVMN_MEMORY_WRITE_THROUGH', 'True') == 'True'  # persist every update
+    DKVMN_MEMORY_FLUSH_SECONDS = int(os.getenv('DKVMN_MEMORY_FLUSH_SECONDS', 30))  # flush + idle sweep; 0 = shutdown only
+    DKVMN_MEMORY_REVALIDATE = os.getenv('DKVMN_MEMORY_REVALIDATE', 'True') == 'True'  # reload students other workers wrote
+    
     # Mastery thresholds (BR3: Efficiency optimization)
     MASTERY_THRESHOLD_SKIP = float(os.getenv('MASTERY_THRESHOLD_SKIP', 85.0))
     MASTERY_THRESHOLD_LIGHT = float(os.getenv('MASTERY_THRESHOLD_LIGHT', 60.0))
     MASTERY_THRESHOLD_FOCUS = float(os.getenv('MASTERY_THRESHOLD_FOCUS', 60.0))
     
+    # Forgetting curve applied when mastery is read (stored scores are not rewritten)
+    MASTERY_DECAY_ENABLED = os.getenv('MASTERY_DECAY_ENABLED', 'True') == 'True'
+    MASTERY_DECAY_RATE = float(os.getenv('MASTERY_DECAY_RATE', 0.02))  # per day, concept default
+    MASTERY_DECAY_FLOOR = float(os.getenv('MASTERY_DECAY_FLOOR', 30.0))
+    MASTERY_DECAY_REFRESH_SECONDS = int(os.getenv('MASTERY_DECAY_REFRESH_SECONDS', 3600))
+    
+    # Concept graph (co-occurrence + prerequisite correlations for the DKVMN layer)
+    CONCEPT_GRAPH_ENABLED = os.getenv('CONCEPT_GRAPH_ENABLED', 'True') == 'True'
+    CONCEPT_GRAPH_MIN_SUPPORT = int(os.getenv('CONCEPT_GRAPH_MIN_SUPPORT', 3))  # students per pair
+    CONCEPT_GRAPH_PREREQUISITE_WEIGHT = float(os.getenv('CONCEPT_GRAPH_PREREQUISITE_WEIGHT', 0.6))
+    CONCEPT_GRAPH_MAX_NEIGHBORS = int(os.getenv('CONCEPT_GRAPH_MAX_NEIGHBORS', 20))
+    CONCEPT_GRAPH_REFRESH_SECONDS = int(os.getenv('CONCEPT_GRAPH_REFRESH_SECONDS', 900))
+    
     # ========================================================================
     # ADAPTIVE PRACTICE CONFIGURATION (BR2)
     # ========================================================================
@@ -147,6 +215,21 @@ class Config:
     DEFAULT_SESSION_DURATION = int(os.getenv('DEFAULT_SESSION_DURATION', 30))
     MAX_SESSION_DURATION = int(os.getenv('MAX_SESSION_DURATION', 180))
     
+    # Item selection: 'greedy' (ZPD order) or 'knapsack' (best total ZPD score
+    # under the time budget and max_load; falls back to greedy on
+    # tables larger than PRACTICE_KNAPSACK_MAX_CELLS)
+    PRACTICE_SELECTION_STRATEGY = os.getenv('PRACTICE_SELECTION_STRATEGY', 'greedy')
+    PRACTICE_KNAPSACK_MAX_CELLS = int(os.getenv('PRACTICE_KNAPSACK_MAX_CELLS', 20_000_000))
+    
+    # Practice item pool (in-memory items per concept; other workers pick up
+    # item edits after this many seconds)
+    PRACTICE_ITEM_POOL_MAX_AGE_SECONDS = int(os.getenv('PRACTICE_ITEM_POOL_MAX_AGE_SECONDS', 300))
+    
+    # Pre-generated next session per student, refreshed after mastery updates
+    PRACTICE_SESSION_QUEUE_ENABLED = os.getenv('PRACTICE_SESSION_QUEUE_ENABLED', 'True') == 'True'
+    PRACTICE_SESSION_QUEUE_MAX_AGE_SECONDS = int(os.getenv('PRACTICE_SESSION_QUEUE_MAX_AGE_SECONDS', 1800))
+    PRACTICE_SESSION_QUEUE_ACTIVE_DAYS = int(os.getenv('PRACTICE_SESSION_QUEUE_ACTIVE_DAYS', 7))
+    
     # ========================================================================
     # ENGAGEMENT DETECTION CONFIGURATION (BR4, BR6)
     # ========================================================================
@@ -167,6 +250,11 @@ class Config:
     ENGAGEMENT_AT_RISK_THRESHOLD = float(os.getenv('ENGAGEMENT_AT_RISK_THRESHOLD', 50.0))
     ENGAGEMENT_CRITICAL_THRESHOLD = float(os.getenv('ENGAGEMENT_CRITICAL_THRESHOLD', 30.0))
     
+    # Event-fed daily counters (always recorded; read once rebuilt with
+    # python -m services.engagement_counter_service)
+    ENGAGEMENT_COUNTERS_ENABLED = os.getenv('ENGAGEMENT_COUNTERS_ENABLED', 'False') == 'True'
+    ENGAGEMENT_RECENT_RESPONSES_LIMIT = int(os.getenv('ENGAGEMENT_RECENT_RESPONSES_LIMIT', 50))
+    
     # ========================================================================
     # SOFT SKILLS ASSESSMENT CONFIGURATION (BR5)
     # ========================================================================
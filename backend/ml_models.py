@@ -2,7 +2,9 @@ import numpy as np
 from typing import Dict, List
 import logging
 import os
+import time
 import pickle
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -91,33 +93,160 @@ def extract_features(history: List, current_response: Dict) -> np.ndarray:
 def sigmoid(x):
     return 1 / (1 + np.exp(-np.clip(x, -500, 500)))
 
-def load_cached_dkt_weights():
-    """Load pre-computed model weights"""
-    weights_path = os.getenv('DKT_WEIGHTS_PATH', 'models/dkt_weights.pkl')
-    
-    try:
-        if os.path.exists(weights_path):
-            data = np.load(weights_path)
-            weights = {'input': data['input'], 'output': data['output']}
-            logger.info(f"Loaded DKT weights from {weights_path}")
-            return weights
-        else:
-            logger.warning(f"DKT weights not found at {weights_path}. Using fallback weights.")
-            # Fixed fallback weights for consistency (replace with proper model in production)
-            np.random.seed(42)
+# ============================================================================
+# DKT WEIGHT CACHE
+# ============================================================================
+
+DKT_WEIGHT_NAMES = ('input', 'output')
+
+
+class DKTWeightCache:
+    """
+    Process-wide cache of the DKT weights with mtime-based hot reload
+
+    Weights are read once and served from memory. At most every
+    check_interval seconds a request stats the weights path; if its mtime
+    changed, the new weights are read and swapped in with a single
+    reference assignment, so workers pick up retrained weights without a
+    restart and readers never see a half-loaded set. Publish new weights
+    atomically (write to a temp file, then os.replace).
+
+    Supported layouts:
+        directory   input.npy / output.npy, memory-mapped read-only if mmap
+        file        NumPy archive with 'input' and 'output' (read eagerly;
+                    zip members cannot be mapped). Pickles are refused.
+    """
+
+    def __init__(self, path: str, mmap: bool = True, check_interval: float = 5.0):
+        self.path = path
+        self.mmap = mmap
+        self.check_interval = check_interval
+
+        self._weights = None
+        self._mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'loads': 0,
+            'reloads': 0,
+            'failures': 0,
+            'fallbacks': 0,
+            'mtime_checks': 0,
+            'hits': 0
+        }
+
+    def _stat_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _read(self) -> Dict[str, np.ndarray]:
+        if os.path.isdir(self.path):
+            mmap_mode = 'r' if self.mmap else None
             return {
-                'input': np.random.randn(4, 4) * 0.1,
-                'output': np.random.randn(4) * 0.1
+                name: np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode=mmap_mode)
+                for name in DKT_WEIGHT_NAMES
             }
-    except Exception as e:
-        logger.error(f"Failed to load DKT weights: {e}")
-        # In production, consider failing fast here
+        # allow_pickle=False: a weights file must never execute code on load
+        with np.load(self.path, allow_pickle=False) as data:
+            return {name: data[name] for name in DKT_WEIGHT_NAMES}
+
+    @staticmethod
+    def _fallback() -> Dict[str, np.ndarray]:
+        """Fixed fallback weights (local RNG - leaves the global NumPy seed alone)"""
+        rng = np.random.default_rng(42)
         return {
-            'input': np.random.randn(4, 4) * 0.1,
-            'output': np.random.randn(4) * 0.1
+            'input': rng.standard_normal((4, 4)) * 0.1,
+            'output': rng.standard_normal(4) * 0.1
         }
 
+    def _load(self, mtime):
+        """Read weights for the given mtime (lock held)"""
+        reload = self._mtime is not None
+
+        if mtime is None:
+            if self._weights is None:
+                logger.warning(f"DKT weights not found at {self.path}. Using fallback weights.")
+                self._weights = self._fallback()
+                self.stats['fallbacks'] += 1
+            self._mtime = None
+            return
+
+        try:
+            weights = self._read()
+        except Exception as e:
+            # Keep serving whatever is loaded (or the fallback) until the file is fixed
+            logger.error(f"Failed to load DKT weights from {self.path}: {e}")
+            self.stats['failures'] += 1
+            if self._weights is None:
+                self._weights = self._fallback()
+                self.stats['fallbacks'] += 1
+            self._mtime = mtime
+            return
+
+        self._weights = weights
+        self._mtime = mtime
+        self.stats['reloads' if reload else 'loads'] += 1
+        logger.info(f"{'Reloaded' if reload else 'Loaded'} DKT weights from {self.path}")
+
+    def get(self) -> Dict[str, np.ndarray]:
+        """Current weights; stats the file at most once per check_interval"""
+        now = time.monotonic()
+        weights = self._weights
+        if weights is not None and now < self._next_check:
+            self.stats['hits'] += 1
+            return weights
+
+        with self._lock:
+            if self._weights is None or now >= self._next_check:
+                mtime = self._stat_mtime()
+                self.stats['mtime_checks'] += 1
+                if self._weights is None or mtime != self._mtime:
+                    self._load(mtime)
+                self._next_check = now + self.check_interval
+            return self._weights
+
+    def reload(self) -> Dict[str, np.ndarray]:
+        """Force a re-read regardless of mtime"""
+        with self._lock:
+            self._load(self._stat_mtime())
+            self._next_check = time.monotonic() + self.check_interval
+            return self._weights
+
+    def get_stats(self) -> Dict:
+        """Load/reload counters for monitoring"""
+        return dict(self.stats, path=self.path, loaded=self._weights is not None)
+
+
+_dkt_weight_cache = DKTWeightCache(
+    os.getenv('DKT_WEIGHTS_PATH', 'models/dkt_weights.pkl'),
+    mmap=os.getenv('DKT_WEIGHTS_MMAP', 'true').lower() == 'true',
+    check_interval=float(os.getenv('DKT_WEIGHTS_CHECK_INTERVAL', 5))
+)
+
+
+def load_cached_dkt_weights():
+    """Load pre-computed model weights (served from the process-wide cache)"""
+    return _dkt_weight_cache.get()
+
+
+def get_dkt_weight_cache_stats() -> Dict:
+    """Counters of the process-wide DKT weight cache"""
+    return _dkt_weight_cache.get_stats()
+
 def get_student_history(student_id: int) -> List[Dict]:
-    """Get student's response history from database"""
-    from database import get_responses
-    return get_responses(student_id, limit=50)  # Last 50 responses
\ No newline at end of file
+    """Get student's last 50 responses from database, oldest first"""
+    from models.database import STUDENT_RESPONSES, find_many
+    responses = find_many(
+        STUDENT_RESPONSES,
+        {'student_id': student_id},
+        {'is_correct': 1, 'response_time': 1, 'submitted_at': 1},
+        sort=[('submitted_at', -1)],
+        limit=50
+    )
+    return [
+        {'correct': bool(r.get('is_correct')), 'response_time': r.get('response_time', 30)}
+        for r in reversed(responses)
+    ]
\ No newline at end of file
@@ -6,7 +6,7 @@ Location: backend/models/database.py
 """
 
 from pymongo import MongoClient, ASCENDING, DESCENDING
-from pymongo.errors import ConnectionFailure
+from pymongo.errors import ConnectionFailure, OperationFailure
 from datetime import datetime
 from bson import ObjectId
 import os
@@ -103,6 +103,16 @@ TEACHER_INTERVENTIONS = 'teacher_interventions'
 PRACTICE_ITEMS = 'practice_items'
 STUDENT_LEARNING_PATHS = 'student_learning_paths'
 
+# Knowledge Tracing State Collections
+STUDENT_MEMORY_STATES = 'student_memory_states'
+DKT_HIDDEN_STATES = 'dkt_hidden_states'
+BKT_CONCEPT_PARAMS = 'bkt_concept_params'
+MASTERY_REPLAY_CHECKPOINTS = 'mastery_replay_checkpoints'
+MASTERY_SNAPSHOTS = 'mastery_snapshots'
+MASTERY_ROLLUPS = 'mastery_rollups'
+PRACTICE_SESSION_QUEUE = 'practice_session_queue'
+ENGAGEMENT_COUNTERS = 'engagement_counters'
+
 # Attendance Collections
 ATTENDANCE_SESSIONS = 'attendance_sessions'
 ATTENDANCE_RECORDS = 'attendance_records'
@@ -178,6 +188,20 @@ def init_db(app=None):
     db[STUDENT_RESPONSES].create_index([('concept_id', ASCENDING)])
     db[STUDENT_RESPONSES].create_index([('submitted_at', DESCENDING)])
     db[STUDENT_RESPONSES].create_index([('session_id', ASCENDING)])
+    db[STUDENT_RESPONSES].create_index([
+        ('student_id', ASCENDING),
+        ('concept_id', ASCENDING),
+        ('submitted_at', DESCENDING)
+    ])
+    db[STUDENT_RESPONSES].create_index([
+        ('student_id', ASCENDING),
+        ('submitted_at', ASCENDING)
+    ])
+    db[STUDENT_RESPONSES].create_index([
+        ('concept_id', ASCENDING),
+        ('student_id', ASCENDING),
+        ('submitted_at', ASCENDING)
+    ])
     print(f"[OK] {STUDENT_RESPONSES} collection initialized")
     
     # Engagement Sessions collection (BR4)
@@ -401,6 +425,59 @@ def init_db(app=None):
     db[EXTERNAL_ACHIEVEMENTS].create_index([('created_at', DESCENDING)])
     print(f"[OK] {EXTERNAL_ACHIEVEMENTS} collection initialized")
 
+    # Student Memory States collection (DKVMN spill tier, keyed by student _id)
+    db[STUDENT_MEMORY_STATES].create_index([('updated_at', DESCENDING)])
+    print(f"[OK] {STUDENT_MEMORY_STATES} collection initialized")
+
+    # DKT LSTM states (incremental inference tier, keyed by student _id)
+    db[DKT_HIDDEN_STATES].create_index([('updated_at', DESCENDING)])
+    print(f"[OK] {DKT_HIDDEN_STATES} collection initialized")
+
+    # Fitted BKT parameters per concept (BR1)
+    db[BKT_CONCEPT_PARAMS].create_index([('concept_id', ASCENDING)], unique=True)
+    db[BKT_CONCEPT_PARAMS].create_index([('fitted_at', DESCENDING)])
+    print(f"[OK] {BKT_CONCEPT_PARAMS} collection initialized")
+
+    # Mastery replay/backfill progress, keyed by job _id
+    db[MASTERY_REPLAY_CHECKPOINTS].create_index([('updated_at', DESCENDING)])
+    print(f"[OK] {MASTERY_REPLAY_CHECKPOINTS} collection initialized")
+
+    # Mastery snapshots: time-series of every mastery update (BR1)
+    if MASTERY_SNAPSHOTS not in db.list_collection_names():
+        ttl_days = int(os.getenv('MASTERY_SNAPSHOT_TTL_DAYS', 0))
+        try:
+            db.create_collection(
+                MASTERY_SNAPSHOTS,
+                timeseries={'timeField': 'assessed_at', 'metaField': 'meta', 'granularity': 'hours'},
+                **({'expireAfterSeconds': ttl_days * 86400} if ttl_days else {})
+            )
+        except OperationFailure:
+            # Servers before MongoDB 5.0 have no time-series collections
+            db.create_collection(MASTERY_SNAPSHOTS)
+    db[MASTERY_SNAPSHOTS].create_index([
+        ('meta.student_id', ASCENDING),
+        ('meta.concept_id', ASCENDING),
+        ('assessed_at', ASCENDING)
+    ])
+    print(f"[OK] {MASTERY_SNAPSHOTS} collection initialized")
+
+    # Daily/weekly mastery rollups served by /mastery/history
+    db[MASTERY_ROLLUPS].create_index([
+        ('student_id', ASCENDING),
+        ('concept_id', ASCENDING),
+        ('period', ASCENDING),
+        ('bucket_start', ASCENDING)
+    ])
+    print(f"[OK] {MASTERY_ROLLUPS} collection initialized")
+
+    # Pre-generated next practice session per student (keyed by student _id)
+    db[PRACTICE_SESSION_QUEUE].create_index([('requested_at', DESCENDING)])
+    print(f"[OK] {PRACTICE_SESSION_QUEUE} collection initialized")
+
+    # Daily per-student engagement counters (BR4), keyed by student and UTC day
+    db[ENGAGEMENT_COUNTERS].create_index([('student_id', ASCENDING), ('day', ASCENDING)])
+    print(f"[OK] {ENGAGEMENT_COUNTERS} collection initialized")
+
     print("="*60)
     print("[OK] All MongoDB collections and indexes created successfully")
     print("="*60 + "\n")
@@ -471,6 +548,12 @@ def update_many(collection_name, query, update):
     result = db[collection_name].update_many(query, update)
     return result.modified_count
 
+def bulk_write(collection_name, operations, ordered=False):
+    """Run a batch of write operations (UpdateOne, InsertOne, ...) in one round trip"""
+    if not operations:
+        return None
+    return db[collection_name].bulk_write(operations, ordered=ordered)
+
 def delete_one(collection_name, query):
     """Delete a single document"""
     result = db[collection_name].delete_one(query)
@@ -491,6 +574,111 @@ def aggregate(collection_name, pipeline):
     """Perform aggregation"""
     return list(db[collection_name].aggregate(pipeline))
 
+# ============================================================================
+# BATCHED DOCUMENT LOADER
+# ============================================================================
+
+class BatchLoader:
+    """
+    Batching document loader (DataLoader pattern)
+
+    Keys are queued while a response is being built and fetched with a
+    single $in query the first time one of them is needed. Results,
+    including misses, are memoized for the lifetime of the loader, so a
+    route resolving N references costs one query instead of N.
+
+    Usage:
+        authors = get_loader(USERS)
+        authors.prime(post['author_id'] for post in posts)
+        for post in posts:
+            author = authors.load(post['author_id'])
+    """
+
+    def __init__(self, collection_name, key_field='_id', base_query=None, projection=None):
+        self.collection_name = collection_name
+        self.key_field = key_field
+        self.base_query = base_query or {}
+        self.projection = projection
+        self.query_count = 0
+        self._cache = {}
+        self._pending = {}
+
+    def prime(self, keys):
+        """Queue keys for the next batch fetch"""
+        for key in keys:
+            if key is not None and key not in self._cache:
+                self._pending[key] = True
+        return self
+
+    def dispatch(self):
+        """Fetch all queued keys with one $in query"""
+        if not self._pending:
+            return
+
+        keys = list(self._pending)
+        self._pending = {}
+
+        query = dict(self.base_query)
+        query[self.key_field] = {'$in': keys}
+        documents = find_many(self.collection_name, query, self.projection)
+        self.query_count += 1
+
+        for key in keys:
+            self._cache[key] = None
+        for document in documents:
+            key = document.get(self.key_field)
+            # Keep the first match, like find_one would
+            if key in self._cache and self._cache[key] is None:
+                self._cache[key] = document
+
+    def load(self, key):
+        """Return the document for key (or None), fetching queued keys if needed"""
+        if key is None:
+            return None
+        if key not in self._cache:
+            self._pending[key] = True
+            self.dispatch()
+        return self._cache.get(key)
+
+    def load_many(self, keys):
+        """Return documents for keys in order, with None for misses"""
+        keys = list(keys)
+        self.prime(keys)
+        self.dispatch()
+        return [self._cache.get(key) if key is not None else None for key in keys]
+
+    def clear(self, key=None):
+        """Forget a memoized key (or everything) after a write"""
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+
+def get_loader(collection_name, key_field='_id', base_query=None, projection=None):
+    """
+    Get the request-scoped BatchLoader for a collection and key field
+
+    Loaders live on flask.g, so every lookup made while handling one
+    request shares the same memo and is discarded when the request ends.
+    Outside an app context a fresh loader is returned.
+    """
+    from flask import g, has_app_context
+
+    if not has_app_context():
+        return BatchLoader(collection_name, key_field, base_query, projection)
+
+    loader_key = (
+        collection_name,
+        key_field,
+        repr(sorted((base_query or {}).items())),
+        repr(projection)
+    )
+    loaders = g.setdefault('batch_loaders', {})
+    if loader_key not in loaders:
+        loaders[loader_key] = BatchLoader(collection_name, key_field, base_query, projection)
+    return loaders[loader_key]
+
 # ============================================================================
 # DOCUMENT SCHEMAS (for reference)
 # ============================================================================
@@ -545,6 +733,8 @@ Student Concept Mastery Document Schema (BR1):
     "learning_velocity": "float",
     "last_assessed": "datetime",
     "times_assessed": "int",
+    "bkt_posterior": "float (0-100), nightly pure-BKT refold",
+    "bkt_recomputed_at": "datetime",
     "updated_at": "datetime"
 }
 
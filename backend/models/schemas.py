@@ -124,7 +124,7 @@ class MasteryCalculationRequest(BaseModel):
     is_correct: bool
     response_time: float = Field(..., gt=0)
     current_mastery: Optional[float] = Field(None, ge=0.0, le=100.0)
-    response_history: List[Dict[str, Any]] = []
+    response_history: List[Dict[str, Any]] = []  # Deprecated: ignored, history is kept server-side
     related_concepts: List[str] = []
 
 class MasteryCalculationResponse(BaseModel):
@@ -153,6 +153,13 @@ class PracticeSessionRequest(BaseModel):
     classroom_id: Optional[str] = None
     concept_id: Optional[str] = None
 
+class ClassPracticeSessionRequest(BaseModel):
+    """BR2: Request to generate practice sessions for a whole classroom"""
+    classroom_id: str
+    student_ids: Optional[List[str]] = None  # Default: the classroom's students
+    session_duration: int = Field(default=30, ge=5, le=180)  # minutes
+    concept_id: Optional[str] = None
+
 class ContentItemResponse(BaseModel):
     """BR2: Practice content item"""
     item_id: str
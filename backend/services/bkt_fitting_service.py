@@ -0,0 +1,242 @@
+"""
+AMEP BKT Fitting Service
+Offline job fitting per-concept BKT parameters from student_responses (BR1)
+
+Location: backend/services/bkt_fitting_service.py
+
+Responses are streamed from one cursor sorted by (concept_id, student_id,
+submitted_at), so each concept arrives as a contiguous run that is packed
+into arrays and handed to a process pool while the cursor moves on to the
+next concept. Only concepts whose response count or latest submission
+changed since their last fit are re-fitted, and those fits start from the
+previous parameters, so incremental runs converge in a few EM iterations.
+
+Results are upserted into bkt_concept_params, which BKTEngine loads and
+caches through HybridKnowledgeTracing's bkt_params_loader.
+
+Usage:
+    python -m services.bkt_fitting_service            # stale concepts only
+    python -m services.bkt_fitting_service --all      # re-fit everything
+"""
+
+import time
+import argparse
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import groupby
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from models.database import (
+    db,
+    STUDENT_RESPONSES,
+    BKT_CONCEPT_PARAMS,
+    find_many,
+    update_one,
+    aggregate
+)
+from ai_engine.bkt_fitting import fit_concept
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PARAM_FIELDS = ('p_l0', 'p_t', 'p_g', 'p_s')
+
+# ============================================================================
+# PARAMETER STORE
+# ============================================================================
+
+def load_fitted_params() -> List[Dict]:
+    """Fitted parameter documents, in the shape BKTEngine's params_loader expects"""
+    return find_many(
+        BKT_CONCEPT_PARAMS,
+        {},
+        {'_id': 0, 'concept_id': 1, **{field: 1 for field in PARAM_FIELDS}}
+    )
+
+
+def save_fitted_params(result: Dict, last_response_at: Optional[datetime]):
+    """Upsert one concept's fit"""
+    document = dict(result, last_response_at=last_response_at, fitted_at=datetime.utcnow())
+    update_one(
+        BKT_CONCEPT_PARAMS,
+        {'concept_id': result['concept_id']},
+        {'$set': document},
+        upsert=True
+    )
+
+
+# ============================================================================
+# WORK SELECTION & STREAMING
+# ============================================================================
+
+def concepts_needing_refit(
+    concept_ids: Optional[List[str]] = None,
+    force: bool = False,
+    min_responses: int = Config.BKT_FIT_MIN_RESPONSES
+) -> Dict[str, Dict]:
+    """
+    Concepts with enough responses whose data changed since their last fit
+
+    Returns:
+        {concept_id: {'num_responses', 'last_response_at', 'previous'}} where
+        previous holds the last fitted parameters (warm start) or None
+    """
+    match = {'concept_id': {'$in': concept_ids}} if concept_ids else {'concept_id': {'$ne': None}}
+    totals = aggregate(STUDENT_RESPONSES, [
+        {'$match': match},
+        {'$group': {
+            '_id': '$concept_id',
+            'num_responses': {'$sum': 1},
+            'last_response_at': {'$max': '$submitted_at'}
+        }},
+        {'$match': {'num_responses': {'$gte': min_responses}}}
+    ])
+
+    fitted = {
+        doc['concept_id']: doc
+        for doc in find_many(BKT_CONCEPT_PARAMS, {'concept_id': {'$in': [t['_id'] for t in totals]}})
+    }
+
+    stale = {}
+    for total in totals:
+        previous = fitted.get(total['_id'])
+        unchanged = (
+            previous is not None
+            and previous.get('num_responses') == total['num_responses']
+            and previous.get('last_response_at') == total['last_response_at']
+        )
+        if force or not unchanged:
+            stale[total['_id']] = {
+                'num_responses': total['num_responses'],
+                'last_response_at': total['last_response_at'],
+                'previous': {f: previous[f] for f in PARAM_FIELDS} if previous else None
+            }
+    return stale
+
+
+def stream_concept_responses(
+    concept_ids: List[str],
+    batch_size: int = 5000
+) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+    """
+    Yield (concept_id, student_codes, correct) one concept at a time
+
+    Uses the (concept_id, student_id, submitted_at) index, so each
+    concept's responses arrive together and chronologically per student.
+    """
+    cursor = db[STUDENT_RESPONSES].find(
+        {'concept_id': {'$in': concept_ids}},
+        {'_id': 0, 'concept_id': 1, 'student_id': 1, 'is_correct': 1}
+    ).sort([
+        ('concept_id', 1),
+        ('student_id', 1),
+        ('submitted_at', 1)
+    ]).batch_size(batch_size)
+
+    for concept_id, rows in groupby(cursor, key=lambda r: r['concept_id']):
+        student_codes = {}
+        codes = []
+        correct = []
+        for row in rows:
+            codes.append(student_codes.setdefault(row.get('student_id'), len(student_codes)))
+            correct.append(bool(row.get('is_correct')))
+        yield (
+            concept_id,
+            np.asarray(codes, dtype=np.int64),
+            np.asarray(correct, dtype=bool)
+        )
+
+
+# ============================================================================
+# JOB
+# ============================================================================
+
+def run_fitting_job(
+    concept_ids: Optional[List[str]] = None,
+    force: bool = False,
+    workers: int = Config.BKT_FIT_WORKERS,
+    max_iterations: int = Config.BKT_FIT_MAX_ITERATIONS,
+    tolerance: float = Config.BKT_FIT_TOLERANCE
+) -> Dict:
+    """
+    Fit BKT parameters for every stale concept across a process pool
+
+    Args:
+        concept_ids: Restrict the run to these concepts (default: all)
+        force: Re-fit even if a concept's data is unchanged
+        workers: Worker processes (one concept per task)
+        max_iterations: EM iteration cap per concept
+        tolerance: EM convergence threshold (log-likelihood gain per response)
+
+    Returns:
+        Run summary with counts and timings
+    """
+    started = time.perf_counter()
+    stale = concepts_needing_refit(concept_ids, force=force)
+    logger.info(f"[BKT_FIT] Starting | stale_concepts: {len(stale)} | workers: {workers}")
+
+    summary = {
+        'concepts_fitted': 0,
+        'concepts_failed': 0,
+        'responses_processed': 0,
+        'not_converged': []
+    }
+    if not stale:
+        summary['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+        return summary
+
+    def collect(futures):
+        for future in futures:
+            concept_id = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                summary['concepts_failed'] += 1
+                logger.error(f"[BKT_FIT] Failed | concept_id: {concept_id} | error: {str(e)}")
+                continue
+            save_fitted_params(result, stale[concept_id]['last_response_at'])
+            summary['concepts_fitted'] += 1
+            summary['responses_processed'] += result['num_responses']
+            if not result['converged']:
+                summary['not_converged'].append(concept_id)
+
+    pending = {}
+    max_in_flight = max(1, workers) * 2
+
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        for concept_id, codes, correct in stream_concept_responses(sorted(stale)):
+            # Bound the number of packed concepts held in memory at once
+            if len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = pool.submit(
+                fit_concept,
+                concept_id,
+                codes,
+                correct,
+                stale[concept_id]['previous'],
+                max_iterations,
+                tolerance
+            )
+            pending[future] = concept_id
+
+        collect(list(pending))
+
+    summary['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+    logger.info(
+        f"[BKT_FIT] Done | fitted: {summary['concepts_fitted']} | failed: {summary['concepts_failed']} "
+        f"| responses: {summary['responses_processed']} | elapsed: {summary['elapsed_seconds']}s"
+    )
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fit per-concept BKT parameters')
+    parser.add_argument('--concepts', nargs='*', help='Only fit these concept IDs')
+    parser.add_argument('--all', action='store_true', help='Re-fit concepts whose data is unchanged')
+    parser.add_argument('--workers', type=int, default=Config.BKT_FIT_WORKERS)
+    args = parser.parse_args()
+
+    print(run_fitting_job(args.concepts, force=args.all, workers=args.workers))
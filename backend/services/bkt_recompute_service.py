@@ -0,0 +1,174 @@
+"""
+AMEP BKT Recompute Service
+Nightly recompute of pure BKT posteriors from student_responses (BR1)
+
+Location: backend/services/bkt_recompute_service.py
+
+/calculate steps BKT from the previous blended mastery score, so its
+bkt_component drifts from what BKT alone says about a student. This job
+refolds every (student, concept) history from P(L0) with the current
+fitted parameters (bkt_concept_params, Config defaults elsewhere) and
+stores the result as bkt_posterior on the student's mastery document.
+
+Responses are read with one cursor sorted by (student_id, submitted_at)
+and packed into code arrays, and VectorizedBKTEngine.scan folds all pairs
+at once, so the Python loop runs once per step of the longest history
+rather than once per response. Only pairs that already have a mastery
+document are updated.
+
+Usage:
+    python -m services.bkt_recompute_service
+    python -m services.bkt_recompute_service --students s1 s2 --dry-run
+"""
+
+import time
+import argparse
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from models.database import (
+    db,
+    STUDENT_RESPONSES,
+    STUDENT_CONCEPT_MASTERY,
+    bulk_write
+)
+from ai_engine.bkt_vectorized import BKTParameterTable, VectorizedBKTEngine
+from ai_engine.knowledge_tracing import BKTParameters
+from services.bkt_fitting_service import load_fitted_params, PARAM_FIELDS
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# ============================================================================
+# INPUTS
+# ============================================================================
+
+def load_parameter_table() -> BKTParameterTable:
+    """Config defaults plus every fitted concept, as parameter vectors"""
+    table = BKTParameterTable(defaults=BKTParameters(
+        p_l0=Config.BKT_PRIOR_MASTERY,
+        p_t=Config.BKT_LEARNING_RATE,
+        p_g=Config.BKT_GUESS_RATE,
+        p_s=Config.BKT_SLIP_RATE
+    ))
+    for doc in load_fitted_params():
+        table.set_params(doc['concept_id'], BKTParameters(**{f: doc[f] for f in PARAM_FIELDS}))
+    return table
+
+
+def pack_responses(
+    table: BKTParameterTable,
+    student_ids: Optional[List[str]] = None,
+    batch_size: int = 10000
+) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Every response as aligned (student code, concept column, correct) arrays
+
+    Uses the (student_id, submitted_at) index, so each pair's responses are
+    in submission order.
+
+    Returns:
+        (student_ids by code, student_idx, concept_idx, correct)
+    """
+    student_filter = {'$in': student_ids} if student_ids else {'$ne': None}
+    cursor = db[STUDENT_RESPONSES].find(
+        {'student_id': student_filter, 'concept_id': {'$ne': None}},
+        {'_id': 0, 'student_id': 1, 'concept_id': 1, 'is_correct': 1}
+    ).sort([
+        ('student_id', 1),
+        ('submitted_at', 1)
+    ]).batch_size(batch_size)
+
+    student_codes: Dict[str, int] = {}
+    students, concepts, correct = [], [], []
+    for row in cursor:
+        students.append(student_codes.setdefault(row['student_id'], len(student_codes)))
+        concepts.append(table.index_of(row['concept_id']))
+        correct.append(bool(row.get('is_correct')))
+
+    return (
+        list(student_codes),
+        np.asarray(students, dtype=np.int64),
+        np.asarray(concepts, dtype=np.int64),
+        np.asarray(correct, dtype=bool)
+    )
+
+
+# ============================================================================
+# JOB
+# ============================================================================
+
+def run_recompute_job(
+    student_ids: Optional[List[str]] = None,
+    dry_run: bool = False,
+    write_batch: int = Config.BKT_RECOMPUTE_WRITE_BATCH
+) -> Dict:
+    """
+    Recompute bkt_posterior (0-100) for every (student, concept) pair
+
+    Args:
+        student_ids: Restrict the run to these students (default: all)
+        dry_run: Compute and summarize without writing
+        write_batch: Operations per bulk_write call
+
+    Returns:
+        Run summary with counts and timings
+    """
+    started = time.perf_counter()
+    table = load_parameter_table()
+    students, student_idx, concept_idx, correct = pack_responses(table, student_ids)
+    loaded = time.perf_counter()
+
+    result = VectorizedBKTEngine(table).scan(student_idx, concept_idx, correct)
+    scanned = time.perf_counter()
+
+    summary = {
+        'dry_run': dry_run,
+        'responses': int(len(correct)),
+        'pairs': int(len(result.mastery)),
+        'pairs_updated': 0,
+        'load_seconds': round(loaded - started, 2),
+        'scan_seconds': round(scanned - loaded, 2)
+    }
+
+    if not dry_run and len(result.mastery):
+        concept_ids = list(table.concept_index)
+        recomputed_at = datetime.utcnow()
+        scores = result.mastery_scores
+        for start in range(0, len(scores), write_batch):
+            operations = [
+                UpdateOne(
+                    {'_id': f"{students[s]}_{concept_ids[c]}"},
+                    {'$set': {'bkt_posterior': round(float(score), 2), 'bkt_recomputed_at': recomputed_at}}
+                )
+                for s, c, score in zip(
+                    result.pair_students[start:start + write_batch],
+                    result.pair_concepts[start:start + write_batch],
+                    scores[start:start + write_batch]
+                )
+            ]
+            summary['pairs_updated'] += bulk_write(STUDENT_CONCEPT_MASTERY, operations, ordered=False).modified_count
+    elif len(result.mastery):
+        summary['mean_posterior'] = round(float(result.mastery_scores.mean()), 2)
+
+    summary['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+    logger.info(
+        f"[BKT_RECOMPUTE] Done | responses: {summary['responses']} | pairs: {summary['pairs']} "
+        f"| updated: {summary['pairs_updated']} | scan: {summary['scan_seconds']}s "
+        f"| elapsed: {summary['elapsed_seconds']}s"
+    )
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recompute BKT posteriors from student_responses')
+    parser.add_argument('--students', nargs='*', help='Only recompute these student IDs')
+    parser.add_argument('--dry-run', action='store_true', help='Compute without writing')
+    parser.add_argument('--write-batch', type=int, default=Config.BKT_RECOMPUTE_WRITE_BATCH)
+    args = parser.parse_args()
+
+    print(run_recompute_job(args.students, args.dry_run, args.write_batch))
@@ -0,0 +1,147 @@
+"""
+AMEP Concept Graph Service
+Feeds the sparse concept graph from student_responses and concepts (BR3)
+
+Location: backend/services/concept_graph_service.py
+
+The first refresh folds in every student's set of practiced concepts.
+Later refreshes only look at students with responses newer than the
+graph's watermark: their concepts first practiced after the watermark are
+paired with the ones they had practiced before it, so a refresh costs
+O(recently active students), not O(all responses). Prerequisites are
+re-read from concepts on every refresh (the collection is small).
+
+Responses inserted with a submitted_at older than the watermark are not
+picked up until the process restarts and rebuilds the graph.
+
+Usage:
+    python -m services.concept_graph_service --concept <concept_id>
+"""
+
+import time
+import argparse
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Set
+
+from models.database import (
+    db,
+    CONCEPTS,
+    STUDENT_RESPONSES,
+    find_many
+)
+from ai_engine.concept_graph import ConceptGraph
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# ============================================================================
+# LOADERS
+# ============================================================================
+
+def load_prerequisites() -> Dict[str, List[str]]:
+    """{concept_id: [prerequisite concept ids]} for concepts that have any"""
+    return {
+        concept['_id']: concept['prerequisites']
+        for concept in find_many(CONCEPTS, {'prerequisites.0': {'$exists': True}}, {'prerequisites': 1})
+    }
+
+
+def _student_concept_sets(match: Dict) -> Iterator[Dict]:
+    """One {_id: student_id, concepts, newest} document per matching student"""
+    return db[STUDENT_RESPONSES].aggregate(
+        [
+            {'$match': dict(match, concept_id={'$ne': None})},
+            {'$group': {
+                '_id': '$student_id',
+                'concepts': {'$addToSet': '$concept_id'},
+                'newest': {'$max': '$submitted_at'}
+            }}
+        ],
+        allowDiskUse=True
+    )
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ============================================================================
+# REFRESH
+# ============================================================================
+
+def refresh_concept_graph(graph: ConceptGraph, batch_size: int = 1000):
+    """
+    Fold responses newer than graph.watermark into the graph (refresh_fn)
+
+    Args:
+        batch_size: Students per previous-concepts query
+    """
+    graph.set_prerequisites(load_prerequisites())
+
+    since = graph.watermark
+    recent = _student_concept_sets({'submitted_at': {'$gt': since}} if since is not None else {})
+
+    newest = since
+    for chunk in _chunks(recent, batch_size):
+        previous: Dict[str, Set[str]] = {}
+        if since is not None:
+            previous = {
+                doc['_id']: set(doc['concepts'])
+                for doc in _student_concept_sets({
+                    'student_id': {'$in': [doc['_id'] for doc in chunk]},
+                    'submitted_at': {'$lte': since}
+                })
+            }
+
+        graph.add_student_concepts(
+            (
+                set(doc['concepts']) - previous.get(doc['_id'], set()),
+                previous.get(doc['_id'], set())
+            )
+            for doc in chunk
+        )
+        for doc in chunk:
+            if doc.get('newest') is not None and (newest is None or doc['newest'] > newest):
+                newest = doc['newest']
+
+    graph.watermark = newest
+
+
+concept_graph = ConceptGraph(
+    min_support=Config.CONCEPT_GRAPH_MIN_SUPPORT,
+    prerequisite_weight=Config.CONCEPT_GRAPH_PREREQUISITE_WEIGHT,
+    max_neighbors=Config.CONCEPT_GRAPH_MAX_NEIGHBORS,
+    refresh_fn=refresh_concept_graph,
+    refresh_seconds=Config.CONCEPT_GRAPH_REFRESH_SECONDS
+)
+
+
+# ============================================================================
+# CLI (inspect a concept's neighborhood)
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the concept graph and print related concepts')
+    parser.add_argument('--concept', action='append', default=[], help='Concept ID (repeatable)')
+    parser.add_argument('--top', type=int, default=10, help='Neighbors to print per concept')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    concept_graph.refresh()
+    print(f"Concept graph: {concept_graph.get_stats()} ({time.perf_counter() - started:.2f}s)")
+
+    snapshot = concept_graph.snapshot()
+    for concept_id in args.concept:
+        print(f"\n{concept_id}")
+        for related_id, weight in snapshot.related(concept_id, top_k=args.top):
+            print(f"  {related_id:<40} {weight:.3f}")
+
+
+if __name__ == '__main__':
+    main()
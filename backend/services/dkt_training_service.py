@@ -0,0 +1,198 @@
+"""
+AMEP DKT Training Service
+Offline job retraining the DKT LSTM from student_responses (BR1)
+
+Location: backend/services/dkt_training_service.py
+
+Responses are read through one cursor sorted by (student_id, submitted_at)
+and folded straight into a compact InteractionSequenceDataset, so the job
+never holds response documents in memory. Training then runs length-
+bucketed, packed minibatches with DataLoader worker processes (see
+ai_engine/dkt_training.py) and saves the model together with the concept
+order it was trained on.
+
+When concepts have been added or removed since the last run, the saved
+model is grown (or shrunk) to the new concept list: surviving concepts
+keep their learned input and output weights at their new index, new ones
+start untrained, and the model is written back to the same path, so the
+API picks it up on its next load without a config change.
+
+Usage:
+    python -m services.dkt_training_service --epochs 10 --workers 4
+"""
+
+import os
+import time
+import argparse
+import torch
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from models.database import (
+    db,
+    CONCEPTS,
+    STUDENT_RESPONSES,
+    find_many
+)
+from ai_engine.dkt_model import DKTEngine
+from ai_engine.dkt_training import (
+    InteractionSequenceDataset,
+    sequences_from_responses,
+    train_dkt
+)
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def load_concept_ids() -> List[str]:
+    """Model concept order: concept _ids, sorted for stability across runs"""
+    return sorted(c['_id'] for c in find_many(CONCEPTS, {}, {'_id': 1}))
+
+
+def check_checkpoint(
+    model_path: str,
+    concept_ids: List[str],
+    hidden_dim: int,
+    embedding_dim: Optional[int]
+) -> Optional[List[str]]:
+    """
+    Raise ValueError if the model saved at model_path cannot be trained
+    further with this architecture
+
+    Checked before DKTEngine is built, since the engine loads the
+    checkpoint in its constructor and a shape change would fail there
+    with a torch size-mismatch error. A different concept list is fine
+    when the checkpoint records its own (DKTEngine remaps the weights).
+
+    Returns:
+        The saved model's concept list (None if there is no saved model)
+    """
+    if not os.path.exists(model_path):
+        return None
+    checkpoint = torch.load(model_path, map_location='cpu')
+    saved_concepts = checkpoint.get('concept_ids')
+    mismatched = [
+        name for name, saved, current in (
+            # Without a saved concept list there is nothing to remap from
+            ('num_concepts', checkpoint.get('num_concepts'), len(saved_concepts or concept_ids)),
+            ('hidden_dim', checkpoint.get('hidden_dim'), hidden_dim),
+            ('embedding_dim', checkpoint.get('embedding_dim') or None, embedding_dim)
+        )
+        if saved != current
+    ]
+    if mismatched:
+        raise ValueError(f"Saved DKT model has a different {', '.join(mismatched)}; use a new model_path")
+    return list(saved_concepts or concept_ids)
+
+
+def build_dataset(
+    concept_ids: List[str],
+    since: Optional[datetime] = None,
+    max_length: int = Config.DKT_TRAIN_MAX_LENGTH,
+    batch_size: int = 10000
+) -> InteractionSequenceDataset:
+    """Stream responses into a compact code-sequence dataset"""
+    concept_index = {concept_id: i for i, concept_id in enumerate(concept_ids)}
+
+    query = {'concept_id': {'$in': concept_ids}}
+    if since is not None:
+        query['submitted_at'] = {'$gte': since}
+
+    cursor = db[STUDENT_RESPONSES].find(
+        query,
+        {'_id': 0, 'student_id': 1, 'concept_id': 1, 'is_correct': 1}
+    ).sort([('student_id', 1), ('submitted_at', 1)]).batch_size(batch_size)
+
+    return InteractionSequenceDataset.from_sequences(
+        sequences_from_responses(cursor, concept_index, len(concept_ids)),
+        max_length=max_length
+    )
+
+
+def run_training_job(
+    epochs: int = Config.DKT_TRAIN_EPOCHS,
+    batch_size: int = Config.DKT_TRAIN_BATCH_SIZE,
+    num_workers: int = Config.DKT_TRAIN_WORKERS,
+    days: Optional[int] = None,
+    model_path: str = Config.DKT_MODEL_PATH
+) -> Dict:
+    """
+    Retrain the DKT model on recent responses and save it
+
+    Args:
+        epochs: Passes over the data
+        batch_size: Sequences per minibatch
+        num_workers: DataLoader worker processes
+        days: Only use responses from the last N days (None = all)
+        model_path: Where the trained model is written
+
+    Returns:
+        Run summary with dataset size, per-epoch losses and timings
+    """
+    started = time.perf_counter()
+
+    concept_ids = load_concept_ids()
+    if not concept_ids:
+        logger.warning("[DKT_TRAIN] No concepts found - nothing to train")
+        return {'sequences': 0, 'interactions': 0, 'losses': []}
+
+    embedding_dim = Config.DKT_EMBEDDING_DIM or None
+    saved_concepts = check_checkpoint(model_path, concept_ids, Config.DKT_HIDDEN_DIM, embedding_dim)
+    if saved_concepts is not None and saved_concepts != concept_ids:
+        logger.info(
+            f"[DKT_TRAIN] Concept list changed - remapping saved model "
+            f"| added: {len(set(concept_ids) - set(saved_concepts))} "
+            f"| removed: {len(set(saved_concepts) - set(concept_ids))}"
+        )
+
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    dataset = build_dataset(concept_ids, since=since)
+    loaded = time.perf_counter()
+    logger.info(
+        f"[DKT_TRAIN] Dataset built | concepts: {len(concept_ids)} | sequences: {len(dataset)} "
+        f"| interactions: {dataset.num_interactions} | elapsed: {loaded - started:.1f}s"
+    )
+
+    if not len(dataset):
+        return {'sequences': 0, 'interactions': 0, 'losses': []}
+
+    engine = DKTEngine(
+        num_concepts=len(concept_ids),
+        hidden_dim=Config.DKT_HIDDEN_DIM,
+        model_path=model_path,
+        embedding_dim=embedding_dim,
+        concept_ids=concept_ids
+    )
+
+    losses = train_dkt(
+        engine,
+        dataset,
+        epochs=epochs,
+        batch_size=batch_size,
+        num_workers=num_workers,
+        on_epoch=lambda epoch, loss: logger.info(f"[DKT_TRAIN] Epoch {epoch + 1}/{epochs} | loss: {loss:.4f}")
+    )
+    engine.save_model()
+
+    summary = {
+        'sequences': len(dataset),
+        'interactions': dataset.num_interactions,
+        'losses': [round(loss, 4) for loss in losses],
+        'load_seconds': round(loaded - started, 2),
+        'train_seconds': round(time.perf_counter() - loaded, 2)
+    }
+    logger.info(f"[DKT_TRAIN] Done | {summary}")
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Retrain the DKT model from student responses')
+    parser.add_argument('--epochs', type=int, default=Config.DKT_TRAIN_EPOCHS)
+    parser.add_argument('--batch-size', type=int, default=Config.DKT_TRAIN_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=Config.DKT_TRAIN_WORKERS)
+    parser.add_argument('--days', type=int, help='Only use the last N days of responses')
+    args = parser.parse_args()
+
+    print(run_training_job(args.epochs, args.batch_size, args.workers, args.days))
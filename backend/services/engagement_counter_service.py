@@ -0,0 +1,275 @@
+"""
+AMEP Engagement Counter Service
+Event-fed daily engagement counters per student (BR4)
+
+Location: backend/services/engagement_counter_service.py
+
+Logins, responses, submissions, poll answers and timed sessions each $inc
+one compact document per (student, UTC day) as they happen:
+
+    logins, responses, correct, response_time_total, timed_responses,
+    submissions, polls, sessions, session_minutes
+
+/engagement/analyze then sums the last `days` day buckets instead of
+scanning raw documents, so computing the signals costs the same for a
+student with five interactions a week as for one with five hundred. The
+disengagement behaviors still look at individual responses; those come
+from one query capped at the most recent `recent_limit`.
+
+Buckets are calendar days (today plus the days - 1 before it), not a
+rolling 168 hours. Counters only see events recorded after deployment;
+rebuild them from the raw collections once before reading from them:
+
+Usage:
+    python -m services.engagement_counter_service                 # last 7 days
+    python -m services.engagement_counter_service --days 30 --students s1 s2
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from models.database import (
+    db,
+    ENGAGEMENT_COUNTERS,
+    ENGAGEMENT_LOGS,
+    ENGAGEMENT_SESSIONS,
+    POLL_RESPONSES,
+    STUDENT_RESPONSES,
+    CLASSROOM_SUBMISSIONS,
+    find_many,
+    aggregate,
+    bulk_write
+)
+from services.engagement_signal_service import (
+    EngagementSignalData,
+    RESPONSE_FIELDS,
+    SUBMITTED_STATUSES
+)
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+COUNTER_FIELDS = (
+    'logins',
+    'responses',
+    'correct',
+    'response_time_total',
+    'timed_responses',
+    'submissions',
+    'polls',
+    'sessions',
+    'session_minutes'
+)
+
+# ============================================================================
+# BUCKETS
+# ============================================================================
+
+def bucket_day(moment: datetime) -> datetime:
+    """Start of the UTC day containing moment"""
+    return datetime(moment.year, moment.month, moment.day)
+
+
+def counter_id(student_id: str, day: datetime) -> str:
+    return f"{student_id}_{day:%Y-%m-%d}"
+
+
+def _increments(event: str, details: Dict) -> Dict:
+    if event == 'login':
+        return {'logins': 1}
+    if event == 'response':
+        increments = {'responses': 1, 'correct': 1 if details.get('is_correct') else 0}
+        if details.get('response_time'):
+            increments['response_time_total'] = details['response_time']
+            increments['timed_responses'] = 1
+        return increments
+    if event == 'submission':
+        return {'submissions': 1}
+    if event == 'poll':
+        return {'polls': 1}
+    if event == 'session':
+        if not details.get('duration'):
+            return {}
+        return {'sessions': 1, 'session_minutes': details['duration']}
+    raise ValueError(f"Unknown engagement event: {event}")
+
+
+# ============================================================================
+# WRITE PATH
+# ============================================================================
+
+def record_engagement_event(
+    student_id: str,
+    event: str,
+    occurred_at: Optional[datetime] = None,
+    **details
+):
+    """
+    Count one engagement event in the student's day bucket
+
+    Args:
+        event: 'login', 'response' (is_correct, response_time),
+            'submission', 'poll' or 'session' (duration, minutes)
+        occurred_at: Time of the event (default: now, UTC)
+    """
+    increments = _increments(event, details)
+    if not increments:
+        return
+    day = bucket_day(occurred_at or datetime.utcnow())
+    db[ENGAGEMENT_COUNTERS].update_one(
+        {'_id': counter_id(student_id, day)},
+        {
+            '$setOnInsert': {'student_id': student_id, 'day': day},
+            '$inc': increments
+        },
+        upsert=True
+    )
+
+
+# ============================================================================
+# READ PATH
+# ============================================================================
+
+def engagement_counter_signals(
+    student_id: str,
+    days: int = 7,
+    now: Optional[datetime] = None,
+    recent_limit: int = 50
+) -> EngagementSignalData:
+    """
+    Engagement inputs for a student's last `days` day buckets
+
+    responses holds at most recent_limit of the student's latest responses
+    (for behavior detection); every count comes from the buckets.
+    """
+    now = now or datetime.utcnow()
+    first_day = bucket_day(now) - timedelta(days=days - 1)
+    buckets = find_many(
+        ENGAGEMENT_COUNTERS,
+        {'student_id': student_id, 'day': {'$gte': first_day}},
+        {'_id': 0, **{name: 1 for name in COUNTER_FIELDS}}
+    )
+    responses = find_many(
+        STUDENT_RESPONSES,
+        {'student_id': student_id, 'submitted_at': {'$gte': first_day}},
+        RESPONSE_FIELDS,
+        sort=[('submitted_at', -1)],
+        limit=recent_limit
+    )
+
+    def total(name: str):
+        return sum(bucket.get(name, 0) for bucket in buckets)
+
+    return EngagementSignalData(
+        responses=responses,
+        response_count=total('responses'),
+        correct_count=total('correct'),
+        response_time_total=total('response_time_total'),
+        timed_responses=total('timed_responses'),
+        login_days=sum(1 for bucket in buckets if bucket.get('logins')),
+        session_minutes=total('session_minutes'),
+        sessions=total('sessions'),
+        submissions=total('submissions'),
+        poll_responses=total('polls'),
+        queries=2
+    )
+
+
+# ============================================================================
+# REBUILD
+# ============================================================================
+
+def _daily_counts(
+    collection: str,
+    time_field: str,
+    match: Dict,
+    counts: Dict
+) -> List[Dict]:
+    """Raw documents grouped by (student_id, UTC day) into counter fields"""
+    return aggregate(collection, [
+        {'$match': match},
+        {'$group': dict({
+            '_id': {
+                'student_id': '$student_id',
+                'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': f'${time_field}'}}
+            }
+        }, **counts)}
+    ])
+
+
+def rebuild_engagement_counters(
+    days: int = 7,
+    student_ids: Optional[List[str]] = None,
+    now: Optional[datetime] = None
+) -> Dict:
+    """
+    Recompute the last `days` day buckets from the raw collections
+
+    Overwrites every counter except logins, which are only raised to the
+    legacy engagement_logs count (new logins exist only as counters).
+    Events recorded while the rebuild runs may be lost.
+    """
+    now = now or datetime.utcnow()
+    first_day = bucket_day(now) - timedelta(days=days - 1)
+    scope = {'student_id': {'$in': student_ids}} if student_ids else {}
+    since = {'$gte': first_day}
+
+    sources = [
+        _daily_counts(STUDENT_RESPONSES, 'submitted_at', {**scope, 'submitted_at': since}, {
+            'responses': {'$sum': 1},
+            'correct': {'$sum': {'$cond': ['$is_correct', 1, 0]}},
+            'response_time_total': {'$sum': {'$cond': [{'$gt': ['$response_time', 0]}, '$response_time', 0]}},
+            'timed_responses': {'$sum': {'$cond': [{'$gt': ['$response_time', 0]}, 1, 0]}}
+        }),
+        _daily_counts(CLASSROOM_SUBMISSIONS, 'submitted_at', {
+            **scope, 'submitted_at': since, 'status': {'$in': SUBMITTED_STATUSES}
+        }, {'submissions': {'$sum': 1}}),
+        _daily_counts(POLL_RESPONSES, 'submitted_at', {**scope, 'submitted_at': since}, {
+            'polls': {'$sum': 1}
+        }),
+        _daily_counts(ENGAGEMENT_SESSIONS, 'analyzed_at', {
+            **scope, 'analyzed_at': since, 'duration': {'$nin': [None, 0]}
+        }, {'sessions': {'$sum': 1}, 'session_minutes': {'$sum': '$duration'}})
+    ]
+    logins = _daily_counts(ENGAGEMENT_LOGS, 'timestamp', {
+        **scope, 'timestamp': since, 'event_type': 'login'
+    }, {'logins': {'$sum': 1}})
+
+    buckets: Dict = {}
+    for rows in sources + [logins]:
+        for row in rows:
+            key = (row['_id']['student_id'], row['_id']['day'])
+            buckets.setdefault(key, {}).update({k: v for k, v in row.items() if k != '_id'})
+
+    operations = []
+    for (student_id, day), counts in buckets.items():
+        day = datetime.strptime(day, '%Y-%m-%d')
+        update = {'$set': {
+            'student_id': student_id,
+            'day': day,
+            **{name: counts.get(name, 0) for name in COUNTER_FIELDS if name != 'logins'}
+        }}
+        if counts.get('logins'):
+            update['$max'] = {'logins': counts['logins']}
+        operations.append(UpdateOne({'_id': counter_id(student_id, day)}, update, upsert=True))
+    bulk_write(ENGAGEMENT_COUNTERS, operations, ordered=False)
+
+    summary = {
+        'buckets_written': len(operations),
+        'students': len({student_id for student_id, _ in buckets}),
+        'since': first_day.isoformat()
+    }
+    logger.info(f"[ENGAGEMENT_COUNTERS] Rebuilt | buckets: {summary['buckets_written']} | students: {summary['students']} | since: {summary['since']}")
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild daily engagement counters from raw engagement data')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--students', nargs='*', help='Only rebuild these student IDs')
+    args = parser.parse_args()
+
+    print(rebuild_engagement_counters(args.days, args.students))
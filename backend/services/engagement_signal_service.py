@@ -0,0 +1,240 @@
+"""
+AMEP Engagement Signal Service
+Single-pass extraction of implicit/explicit engagement signals (BR4)
+
+Location: backend/services/engagement_signal_service.py
+
+/engagement/analyze needs a student's last week of student_responses,
+login days from engagement_logs, session durations from
+engagement_sessions, turned-in classroom_submissions and poll_responses.
+All of it is gathered by one aggregation on student_responses: the other
+collections are pulled in with $unionWith (each pre-filtered and projected
+to the fields the signals use, and tagged with a source), and a $facet
+splits the stream into the responses plus per-source counts and sums.
+
+Servers without $unionWith (before MongoDB 4.4) get the same data from
+five projected queries instead. Every extraction reports how many
+queries it made.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo.errors import OperationFailure
+
+from models.database import (
+    db,
+    ENGAGEMENT_LOGS,
+    ENGAGEMENT_SESSIONS,
+    POLL_RESPONSES,
+    STUDENT_RESPONSES,
+    CLASSROOM_SUBMISSIONS,
+    count_documents,
+    find_many
+)
+from ai_engine.engagement_detection import ImplicitSignals, ExplicitSignals
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SUBMITTED_STATUSES = ['turned_in', 'graded', 'returned']
+
+# Response fields read by the signals and by disengagement detection
+RESPONSE_FIELDS = {
+    '_id': 0,
+    'response_time': 1,
+    'hints_used': 1,
+    'attempts': 1,
+    'is_correct': 1,
+    'submitted_at': 1
+}
+
+# Cleared once the server rejects $unionWith
+_facet_supported = True
+
+
+@dataclass
+class EngagementSignalData:
+    """
+    Everything /engagement/analyze reads, from one extraction
+
+    responses: The student's recent responses, newest first (for
+        disengagement behaviors)
+    response_count .. timed_responses: Totals over every response in
+        the window
+    queries: Database round trips the extraction made
+    """
+    responses: List[Dict] = field(default_factory=list)
+    response_count: int = 0
+    correct_count: int = 0
+    response_time_total: float = 0.0
+    timed_responses: int = 0
+    login_days: int = 0
+    session_minutes: float = 0.0
+    sessions: int = 0
+    submissions: int = 0
+    poll_responses: int = 0
+    queries: int = 0
+
+    @classmethod
+    def from_responses(cls, responses: List[Dict], **counts) -> 'EngagementSignalData':
+        """Signal data whose response totals are taken from responses itself"""
+        timed = [r['response_time'] for r in responses if r.get('response_time')]
+        return cls(
+            responses=responses,
+            response_count=len(responses),
+            correct_count=sum(1 for r in responses if r.get('is_correct')),
+            response_time_total=sum(timed),
+            timed_responses=len(timed),
+            **counts
+        )
+
+    def implicit_signals(self) -> ImplicitSignals:
+        # Task completion: For assignments, turned_in counts as complete.
+        total_tasks = self.response_count + self.submissions
+
+        return ImplicitSignals(
+            login_frequency=self.login_days,
+            avg_session_duration=self.session_minutes / self.sessions if self.sessions else 10.0,
+            time_on_task=self.session_minutes,
+            interaction_count=total_tasks,
+            # The engine only reads the mean response time
+            response_times=[self.response_time_total / self.timed_responses] if self.timed_responses else [],
+            task_completion_rate=(self.correct_count + self.submissions) / total_tasks if total_tasks > 0 else 0.5,
+            reattempt_rate=0.1,  # Placeholder
+            optional_resource_usage=0,  # Placeholder
+            discussion_participation=0  # Placeholder
+        )
+
+    def explicit_signals(self) -> ExplicitSignals:
+        return ExplicitSignals(
+            poll_responses=self.poll_responses,
+            understanding_level=3.0,  # Placeholder - would come from self-reports
+            participation_rate=0.75,  # Placeholder
+            quiz_accuracy=self.correct_count / self.response_count if self.response_count else 0.5
+        )
+
+
+# ============================================================================
+# EXTRACTION
+# ============================================================================
+
+def _signal_pipeline(student_id: str, since: datetime) -> List[Dict]:
+    def tagged(source: str, match: Dict, fields: Optional[Dict] = None) -> List[Dict]:
+        return [
+            {'$match': dict(match, student_id=student_id)},
+            {'$project': dict({'_id': 0, 'source': {'$literal': source}}, **(fields or {}))}
+        ]
+
+    return tagged('response', {'submitted_at': {'$gte': since}}, {k: 1 for k in RESPONSE_FIELDS if k != '_id'}) + [
+        {'$unionWith': {'coll': ENGAGEMENT_LOGS, 'pipeline': tagged(
+            'login',
+            {'timestamp': {'$gte': since}, 'event_type': 'login'},
+            {'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$timestamp'}}}
+        )}},
+        {'$unionWith': {'coll': ENGAGEMENT_SESSIONS, 'pipeline': tagged(
+            'session',
+            {'analyzed_at': {'$gte': since}, 'duration': {'$nin': [None, 0]}},
+            {'duration': 1}
+        )}},
+        {'$unionWith': {'coll': CLASSROOM_SUBMISSIONS, 'pipeline': tagged(
+            'submission',
+            {'submitted_at': {'$gte': since}, 'status': {'$in': SUBMITTED_STATUSES}}
+        )}},
+        {'$unionWith': {'coll': POLL_RESPONSES, 'pipeline': tagged(
+            'poll',
+            {'submitted_at': {'$gte': since}}
+        )}},
+        {'$facet': {
+            'responses': [
+                {'$match': {'source': 'response'}},
+                {'$sort': {'submitted_at': -1}},
+                {'$project': {'source': 0}}
+            ],
+            'login_days': [
+                {'$match': {'source': 'login'}},
+                {'$group': {'_id': '$day'}},
+                {'$count': 'n'}
+            ],
+            'sessions': [
+                {'$match': {'source': 'session'}},
+                {'$group': {'_id': None, 'minutes': {'$sum': '$duration'}, 'n': {'$sum': 1}}}
+            ],
+            'submissions': [{'$match': {'source': 'submission'}}, {'$count': 'n'}],
+            'poll_responses': [{'$match': {'source': 'poll'}}, {'$count': 'n'}]
+        }}
+    ]
+
+
+def _extract_with_facet(student_id: str, since: datetime) -> EngagementSignalData:
+    facets = next(db[STUDENT_RESPONSES].aggregate(_signal_pipeline(student_id, since)), {})
+
+    def counted(name: str) -> int:
+        return facets[name][0]['n'] if facets.get(name) else 0
+
+    sessions = facets['sessions'][0] if facets.get('sessions') else {}
+    return EngagementSignalData.from_responses(
+        facets.get('responses', []),
+        login_days=counted('login_days'),
+        session_minutes=sessions.get('minutes', 0),
+        sessions=sessions.get('n', 0),
+        submissions=counted('submissions'),
+        poll_responses=counted('poll_responses'),
+        queries=1
+    )
+
+
+def _extract_with_queries(student_id: str, since: datetime) -> EngagementSignalData:
+    responses = find_many(
+        STUDENT_RESPONSES,
+        {'student_id': student_id, 'submitted_at': {'$gte': since}},
+        RESPONSE_FIELDS,
+        sort=[('submitted_at', -1)]
+    )
+    logins = find_many(
+        ENGAGEMENT_LOGS,
+        {'student_id': student_id, 'timestamp': {'$gte': since}, 'event_type': 'login'},
+        {'_id': 0, 'timestamp': 1}
+    )
+    sessions = find_many(
+        ENGAGEMENT_SESSIONS,
+        {'student_id': student_id, 'analyzed_at': {'$gte': since}, 'duration': {'$nin': [None, 0]}},
+        {'_id': 0, 'duration': 1}
+    )
+
+    durations = [s['duration'] for s in sessions if s.get('duration')]
+    return EngagementSignalData.from_responses(
+        responses,
+        login_days=len({log['timestamp'].date() for log in logins if log.get('timestamp')}),
+        session_minutes=sum(durations),
+        sessions=len(durations),
+        submissions=count_documents(CLASSROOM_SUBMISSIONS, {
+            'student_id': student_id,
+            'submitted_at': {'$gte': since},
+            'status': {'$in': SUBMITTED_STATUSES}
+        }),
+        poll_responses=count_documents(POLL_RESPONSES, {
+            'student_id': student_id,
+            'submitted_at': {'$gte': since}
+        }),
+        queries=5
+    )
+
+
+def extract_engagement_signals(
+    student_id: str,
+    days: int = 7,
+    now: Optional[datetime] = None
+) -> EngagementSignalData:
+    """Engagement inputs for a student's last `days` days"""
+    global _facet_supported
+    since = (now or datetime.utcnow()) - timedelta(days=days)
+    if _facet_supported:
+        try:
+            return _extract_with_facet(student_id, since)
+        except OperationFailure as e:
+            # $unionWith needs MongoDB 4.4+; stop trying for this process
+            _facet_supported = False
+            logger.warning(f"[ENGAGEMENT_SIGNALS] Facet extraction unavailable, using projected queries | error: {str(e)}")
+    return _extract_with_queries(student_id, since)
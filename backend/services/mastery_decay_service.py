@@ -0,0 +1,93 @@
+"""
+AMEP Mastery Decay Service
+Read-time forgetting for student_concept_mastery (BR1)
+
+Location: backend/services/mastery_decay_service.py
+
+Mastery documents store the score, last_assessed and the concept's
+decay_rate at the time of assessment; readers pass the documents they
+fetched through apply_mastery_decay, which decays the whole batch at once
+(see ai_engine/forgetting.py). Aggregations that average or bucket scores
+in the database add decayed_mastery_expression() as a $addFields stage
+instead. Per-concept rates come from the optional decay_rate field of
+concept documents, falling back to MASTERY_DECAY_RATE.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+from models.database import CONCEPTS, find_many
+from ai_engine.forgetting import ForgettingModel
+from config import Config
+
+
+def load_concept_decay_rates() -> Dict[str, float]:
+    """{concept_id: decay_rate} for concepts that define their own rate"""
+    return {
+        concept['_id']: float(concept['decay_rate'])
+        for concept in find_many(CONCEPTS, {'decay_rate': {'$ne': None}}, {'decay_rate': 1})
+        if concept.get('decay_rate') is not None
+    }
+
+
+forgetting_model = ForgettingModel(
+    default_rate=Config.MASTERY_DECAY_RATE,
+    floor=Config.MASTERY_DECAY_FLOOR,
+    rates_loader=load_concept_decay_rates,
+    refresh_seconds=Config.MASTERY_DECAY_REFRESH_SECONDS
+)
+
+
+def concept_decay_rate(concept_id: str) -> float:
+    """Rate stored on a mastery document when it is written"""
+    return forgetting_model.rate_for(concept_id)
+
+
+def apply_mastery_decay(records: List[Dict], now: Optional[datetime] = None) -> List[Dict]:
+    """
+    Replace mastery_score by its decayed value in a batch of mastery documents
+
+    The stored score stays available as stored_mastery_score. Records need
+    mastery_score and last_assessed (decay_rate and concept_id optional).
+    """
+    if not Config.MASTERY_DECAY_ENABLED:
+        return records
+    return forgetting_model.apply(records, now)
+
+
+def decayed_mastery_expression(now: Optional[datetime] = None) -> Union[str, Dict]:
+    """
+    Aggregation expression for a mastery document's decayed score
+
+    Same formula and rate precedence as apply_mastery_decay (the record's
+    decay_rate, then the concept's, then the default), for pipelines that
+    group on mastery_score, e.g.
+
+        {'$addFields': {'mastery_score': decayed_mastery_expression()}}
+    """
+    if not Config.MASTERY_DECAY_ENABLED:
+        return '$mastery_score'
+
+    now = now or datetime.utcnow()
+    floor = forgetting_model.floor
+    rates = forgetting_model.concept_rates()
+    concept_rate = {'$switch': {
+        'branches': [
+            {'case': {'$eq': ['$concept_id', concept_id]}, 'then': rate}
+            for concept_id, rate in rates.items()
+        ],
+        'default': forgetting_model.default_rate
+    }} if rates else forgetting_model.default_rate
+    elapsed_days = {'$max': [0, {'$divide': [{'$subtract': [now, '$last_assessed']}, 86400000]}]}
+
+    return {'$cond': [
+        {'$and': [
+            {'$eq': [{'$type': '$last_assessed'}, 'date']},
+            {'$gt': ['$mastery_score', floor]}
+        ]},
+        {'$round': [{'$add': [floor, {'$multiply': [
+            {'$subtract': ['$mastery_score', floor]},
+            {'$exp': {'$multiply': [-1, {'$ifNull': ['$decay_rate', concept_rate]}, elapsed_days]}}
+        ]}]}, 2]},
+        '$mastery_score'
+    ]}
@@ -0,0 +1,214 @@
+"""
+AMEP Mastery Heatmap Service
+Builds the class mastery heatmap (BR1, BR6) from a fixed number of bulk queries
+
+Location: backend/services/mastery_heatmap_service.py
+
+The roster, the student profiles and every mastery row for the class are
+loaded with one query each and assembled into a dense student x concept
+matrix. Per-student and per-concept statistics are then derived from that
+matrix with vectorized NumPy operations, so the number of database round
+trips does not grow with class size or concept count. Scores are decayed
+for time since assessment as they are loaded (services/mastery_decay_service.py).
+"""
+
+import numpy as np
+from typing import Dict, List
+
+from models.database import (
+    STUDENTS,
+    STUDENT_CONCEPT_MASTERY,
+    find_many
+)
+from services.mastery_decay_service import apply_mastery_decay
+
+# ============================================================================
+# COLOR BANDS
+# ============================================================================
+
+# (lower bound, color) pairs, checked from highest to lowest
+MASTERY_COLOR_BANDS = [
+    (85, '#22c55e'),  # green - mastered
+    (70, '#84cc16'),  # light green - proficient
+    (60, '#eab308'),  # yellow - developing
+    (40, '#f97316'),  # orange - struggling
+]
+MASTERY_DEFAULT_COLOR = '#ef4444'  # red - needs help
+
+MASTERED_THRESHOLD = 85
+STRUGGLING_THRESHOLD = 60
+
+
+# ============================================================================
+# MATRIX ASSEMBLY
+# ============================================================================
+
+def build_mastery_matrix(
+    student_ids: List[str],
+    concept_ids: List[str],
+    mastery_records: List[Dict]
+) -> np.ndarray:
+    """
+    Scatter mastery rows into a dense (students x concepts) matrix
+
+    Pairs without a mastery record are left at 0, matching the
+    behaviour of the per-cell lookups this replaces.
+
+    Args:
+        student_ids: Row order of the matrix
+        concept_ids: Column order of the matrix
+        mastery_records: Documents with student_id, concept_id, mastery_score
+
+    Returns:
+        float64 array of shape (len(student_ids), len(concept_ids))
+    """
+    matrix = np.zeros((len(student_ids), len(concept_ids)), dtype=np.float64)
+    if not mastery_records:
+        return matrix
+
+    student_index = {sid: i for i, sid in enumerate(student_ids)}
+    concept_index = {cid: j for j, cid in enumerate(concept_ids)}
+
+    rows, cols, values = [], [], []
+    for record in mastery_records:
+        i = student_index.get(record.get('student_id'))
+        j = concept_index.get(record.get('concept_id'))
+        if i is None or j is None:
+            continue
+        rows.append(i)
+        cols.append(j)
+        values.append(record.get('mastery_score', 0) or 0)
+
+    if rows:
+        matrix[rows, cols] = values
+
+    return matrix
+
+
+def mastery_colors(matrix: np.ndarray) -> np.ndarray:
+    """Map every cell of the mastery matrix to its heatmap color"""
+    conditions = [matrix >= bound for bound, _ in MASTERY_COLOR_BANDS]
+    choices = [color for _, color in MASTERY_COLOR_BANDS]
+    return np.select(conditions, choices, default=MASTERY_DEFAULT_COLOR)
+
+
+# ============================================================================
+# HEATMAP BUILDER
+# ============================================================================
+
+def summarize_mastery_matrix(
+    student_ids: List[str],
+    student_names: Dict[str, str],
+    concepts: List[Dict],
+    matrix: np.ndarray
+) -> Dict:
+    """
+    Derive the heatmap rows and concept statistics from a mastery matrix
+
+    Scores are rounded to one decimal before aggregating so the averages
+    and counts agree with the per-cell values shown to the teacher.
+
+    Returns:
+        Dict with 'heatmap', 'concept_averages' and 'class_average_mastery'
+    """
+    num_students, num_concepts = matrix.shape
+    concept_ids = [concept['_id'] for concept in concepts]
+
+    rounded = np.round(matrix, 1)
+    colors = mastery_colors(matrix)
+
+    # Per-student statistics (row reductions)
+    if num_concepts:
+        student_avgs = np.round(rounded.sum(axis=1) / num_concepts, 1)
+    else:
+        student_avgs = np.zeros(num_students)
+
+    # Per-concept statistics (column reductions)
+    if num_students:
+        concept_avgs = np.round(rounded.mean(axis=0), 1)
+    else:
+        concept_avgs = np.zeros(num_concepts)
+    mastered_counts = (rounded >= MASTERED_THRESHOLD).sum(axis=0)
+    struggling_counts = (rounded < STRUGGLING_THRESHOLD).sum(axis=0)
+
+    # Lowest average first - students needing most help on top
+    heatmap = []
+    for i in np.argsort(student_avgs, kind='stable'):
+        student_id = student_ids[i]
+        heatmap.append({
+            'student_id': student_id,
+            'student_name': student_names.get(student_id, 'Unknown'),
+            'concepts': {
+                concept_id: {
+                    'mastery_score': float(rounded[i, j]),
+                    'color': str(colors[i, j])
+                }
+                for j, concept_id in enumerate(concept_ids)
+            },
+            'average_mastery': float(student_avgs[i])
+        })
+
+    # Lowest average first - concepts needing focus on top
+    concept_averages = [
+        {
+            'concept_id': concept_ids[j],
+            'concept_name': concepts[j].get('concept_name', 'Unknown'),
+            'average_mastery': float(concept_avgs[j]),
+            'students_mastered': int(mastered_counts[j]),
+            'students_struggling': int(struggling_counts[j])
+        }
+        for j in np.argsort(concept_avgs, kind='stable')
+    ]
+
+    class_average = round(float(student_avgs.mean()), 1) if num_students else 0
+
+    return {
+        'heatmap': heatmap,
+        'concept_averages': concept_averages,
+        'class_average_mastery': class_average
+    }
+
+
+def build_mastery_heatmap(student_ids: List[str], concepts: List[Dict]) -> Dict:
+    """
+    Build the mastery heatmap for a roster and concept list
+
+    Issues exactly two queries (student profiles, mastery rows) regardless
+    of how many students or concepts are involved.
+
+    Args:
+        student_ids: Student IDs from the classroom roster
+        concepts: Concept documents to include as columns
+
+    Returns:
+        Dict with 'heatmap', 'concept_averages' and 'class_average_mastery'
+    """
+    # Drop duplicate memberships while keeping roster order
+    student_ids = list(dict.fromkeys(student_ids))
+    concept_ids = [concept['_id'] for concept in concepts]
+
+    student_names = {}
+    mastery_records = []
+
+    if student_ids:
+        students = find_many(
+            STUDENTS,
+            {'_id': {'$in': student_ids}},
+            {'name': 1}
+        )
+        student_names = {s['_id']: s.get('name', 'Unknown') for s in students}
+
+        if concept_ids:
+            mastery_records = find_many(
+                STUDENT_CONCEPT_MASTERY,
+                {
+                    'student_id': {'$in': student_ids},
+                    'concept_id': {'$in': concept_ids}
+                },
+                {'student_id': 1, 'concept_id': 1, 'mastery_score': 1, 'last_assessed': 1, 'decay_rate': 1}
+            )
+            apply_mastery_decay(mastery_records)
+
+    matrix = build_mastery_matrix(student_ids, concept_ids, mastery_records)
+
+    return summarize_mastery_matrix(student_ids, student_names, concepts, matrix)
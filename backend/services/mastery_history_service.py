@@ -0,0 +1,176 @@
+"""
+AMEP Mastery History Service
+Time-series snapshots of every mastery update plus daily/weekly rollups (BR1)
+
+Location: backend/services/mastery_history_service.py
+
+Each /calculate result is appended to the mastery_snapshots time-series
+collection and folded into two rollup documents per (student, concept) -
+the UTC day and the ISO week (starting Monday) it falls in - holding count,
+sum, min, max and the first/last score of the bucket. History queries
+read only rollups: at most one document per day for short windows and
+one per week for long ones, merged down to max_points, so a trend chart
+costs the same for a student with ten assessments as for one with ten
+thousand.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from models.database import (
+    db,
+    MASTERY_SNAPSHOTS,
+    MASTERY_ROLLUPS,
+    find_many,
+    bulk_write
+)
+
+ROLLUP_PERIODS = ('day', 'week')
+
+# ============================================================================
+# BUCKETS
+# ============================================================================
+
+def bucket_start(moment: datetime, period: str) -> datetime:
+    """Start of the UTC day or ISO week containing moment"""
+    day = datetime(moment.year, moment.month, moment.day)
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def rollup_id(student_id: str, concept_id: str, period: str, start: datetime) -> str:
+    return f"{student_id}_{concept_id}_{period}_{start:%Y-%m-%d}"
+
+
+# ============================================================================
+# WRITE PATH
+# ============================================================================
+
+def record_mastery_snapshot(
+    student_id: str,
+    concept_id: str,
+    result: Dict,
+    assessed_at: Optional[datetime] = None
+):
+    """
+    Append one mastery update and fold it into its day and week rollups
+
+    Args:
+        result: HybridKnowledgeTracing.calculate_mastery output
+        assessed_at: Time of the update (default: now, UTC)
+
+    Updates are expected in time order per pair (as /calculate produces
+    them); 'last' is the most recently written score of the bucket.
+    """
+    assessed_at = assessed_at or datetime.utcnow()
+    score = float(result['mastery_score'])
+
+    # Native ObjectId _id and no created_at: keeps time-series buckets compact
+    db[MASTERY_SNAPSHOTS].insert_one({
+        'assessed_at': assessed_at,
+        'meta': {'student_id': student_id, 'concept_id': concept_id},
+        'mastery_score': score,
+        'bkt_component': result.get('bkt_component'),
+        'dkt_component': result.get('dkt_component'),
+        'dkvmn_component': result.get('dkvmn_component'),
+        'confidence': result.get('confidence')
+    })
+
+    operations = []
+    for period in ROLLUP_PERIODS:
+        start = bucket_start(assessed_at, period)
+        operations.append(UpdateOne(
+            {'_id': rollup_id(student_id, concept_id, period, start)},
+            {
+                '$setOnInsert': {
+                    'student_id': student_id,
+                    'concept_id': concept_id,
+                    'period': period,
+                    'bucket_start': start,
+                    'first': score
+                },
+                '$inc': {'count': 1, 'sum': score},
+                '$min': {'min': score, 'first_at': assessed_at},
+                '$max': {'max': score, 'last_at': assessed_at},
+                '$set': {'last': score}
+            },
+            upsert=True
+        ))
+    bulk_write(MASTERY_ROLLUPS, operations, ordered=False)
+
+
+# ============================================================================
+# READ PATH
+# ============================================================================
+
+def _merge_buckets(buckets: List[Dict]) -> Dict:
+    """Combine consecutive rollup documents into one"""
+    return {
+        'bucket_start': buckets[0]['bucket_start'],
+        'count': sum(b['count'] for b in buckets),
+        'sum': sum(b['sum'] for b in buckets),
+        'min': min(b['min'] for b in buckets),
+        'max': max(b['max'] for b in buckets),
+        'last': buckets[-1]['last']
+    }
+
+
+def get_mastery_series(
+    student_id: str,
+    concept_id: str,
+    start: datetime,
+    end: Optional[datetime] = None,
+    resolution: str = 'auto',
+    max_points: int = 120
+) -> Dict:
+    """
+    Downsampled mastery trend for a (student, concept) pair
+
+    Args:
+        start, end: Window (end defaults to now)
+        resolution: 'day', 'week' or 'auto' (days if the window has at
+            most max_points of them, weeks otherwise)
+        max_points: Adjacent buckets are merged until at most this many remain
+
+    Returns:
+        {'resolution', 'points': [{'date', 'mastery_score' (mean),
+        'min', 'max', 'last', 'assessments_count'}, ...]}
+    """
+    end = end or datetime.utcnow()
+    max_points = max(1, max_points)
+    if resolution not in ROLLUP_PERIODS:
+        resolution = 'day' if (end - start).days + 1 <= max_points else 'week'
+
+    buckets = find_many(
+        MASTERY_ROLLUPS,
+        {
+            'student_id': student_id,
+            'concept_id': concept_id,
+            'period': resolution,
+            'bucket_start': {'$gte': bucket_start(start, resolution), '$lte': end}
+        },
+        {'_id': 0, 'bucket_start': 1, 'count': 1, 'sum': 1, 'min': 1, 'max': 1, 'last': 1},
+        sort=[('bucket_start', 1)]
+    )
+
+    if len(buckets) > max_points:
+        group = -(-len(buckets) // max_points)
+        buckets = [_merge_buckets(buckets[i:i + group]) for i in range(0, len(buckets), group)]
+
+    return {
+        'resolution': resolution,
+        'points': [
+            {
+                'date': b['bucket_start'].isoformat(),
+                'mastery_score': round(b['sum'] / b['count'], 2),
+                'min': round(b['min'], 2),
+                'max': round(b['max'], 2),
+                'last': round(b['last'], 2),
+                'assessments_count': b['count']
+            }
+            for b in buckets if b.get('count')
+        ]
+    }
@@ -0,0 +1,408 @@
+"""
+AMEP Mastery Replay Service
+Offline job rebuilding student_concept_mastery from student_responses (BR1)
+
+Location: backend/services/mastery_replay_service.py
+
+Responses are streamed from one cursor sorted by (student_id, submitted_at)
+and cut into chunks of whole students, which a process pool replays through
+HybridKnowledgeTracing (see ai_engine/mastery_replay.py) with the current
+fitted BKT parameters and, when CONCEPT_GRAPH_ENABLED, a concept graph
+snapshot built once here and shipped to every worker. Results are upserted with unordered bulk_write
+batches while the cursor keeps reading.
+
+Each replayed student's serving state is replaced too: the DKVMN memory
+the replay ends with overwrites student_memory_states (bumping its
+version, so API workers reload a resident copy on their next hit) and the
+student's dkt_hidden_states document is dropped, so the DKT state is
+rebuilt from history on the next miss instead of resuming a stale one.
+
+Progress is checkpointed per job in mastery_replay_checkpoints as the last
+student whose chunk - and every chunk before it - has been written, so an
+interrupted run restarts after that student with --resume. --dry-run
+writes nothing and reports how the replayed scores differ from the
+stored ones instead.
+
+Usage:
+    python -m services.mastery_replay_service --dry-run
+    python -m services.mastery_replay_service --job-id bkt-2024-06 --workers 8
+    python -m services.mastery_replay_service --job-id bkt-2024-06 --resume
+"""
+
+import time
+import heapq
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import groupby
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from models.database import (
+    db,
+    STUDENT_RESPONSES,
+    STUDENT_CONCEPT_MASTERY,
+    STUDENT_MEMORY_STATES,
+    DKT_HIDDEN_STATES,
+    MASTERY_REPLAY_CHECKPOINTS,
+    find_one,
+    find_many,
+    update_one,
+    delete_many,
+    bulk_write
+)
+from ai_engine.mastery_replay import init_replay_worker, replay_students
+from services.bkt_fitting_service import load_fitted_params
+from services.practice_session_queue_service import invalidate_practice_sessions
+from services.concept_graph_service import concept_graph
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# ============================================================================
+# CHECKPOINTS
+# ============================================================================
+
+def load_checkpoint(job_id: str) -> Optional[Dict]:
+    """Saved progress of a replay job, or None"""
+    return find_one(MASTERY_REPLAY_CHECKPOINTS, {'_id': job_id})
+
+
+def save_checkpoint(job_id: str, last_student_id: str, summary: Dict, completed: bool = False):
+    """Record that every student up to last_student_id has been written"""
+    update_one(
+        MASTERY_REPLAY_CHECKPOINTS,
+        {'_id': job_id},
+        {'$set': {
+            'last_student_id': last_student_id,
+            'students_replayed': summary['students_replayed'],
+            'responses_replayed': summary['responses_replayed'],
+            'completed': completed
+        }},
+        upsert=True
+    )
+
+
+# ============================================================================
+# STREAMING
+# ============================================================================
+
+def stream_student_responses(
+    after_student_id: Optional[str] = None,
+    student_ids: Optional[List[str]] = None,
+    batch_size: int = 10000
+) -> Iterator[Tuple[str, List[Tuple]]]:
+    """
+    Yield (student_id, rows) one student at a time, in student_id order
+
+    rows are (concept_id, is_correct, response_time, submitted_at) tuples
+    in submission order; uses the (student_id, submitted_at) index.
+    """
+    student_filter = {'$ne': None}
+    if student_ids:
+        student_filter = {'$in': student_ids}
+    if after_student_id is not None:
+        student_filter['$gt'] = after_student_id
+
+    cursor = db[STUDENT_RESPONSES].find(
+        {'student_id': student_filter, 'concept_id': {'$ne': None}},
+        {'_id': 0, 'student_id': 1, 'concept_id': 1, 'is_correct': 1, 'response_time': 1, 'submitted_at': 1}
+    ).sort([
+        ('student_id', 1),
+        ('submitted_at', 1)
+    ]).batch_size(batch_size)
+
+    for student_id, rows in groupby(cursor, key=lambda r: r['student_id']):
+        yield student_id, [
+            (row['concept_id'], bool(row.get('is_correct')), row.get('response_time') or 0.0, row.get('submitted_at'))
+            for row in rows
+        ]
+
+
+def chunk_students(
+    students: Iterator[Tuple[str, List[Tuple]]],
+    max_students: int,
+    max_responses: int = 50000
+) -> Iterator[List[Tuple[str, List[Tuple]]]]:
+    """Group whole students into pool tasks of bounded size"""
+    chunk = []
+    responses = 0
+    for student_id, rows in students:
+        chunk.append((student_id, rows))
+        responses += len(rows)
+        if len(chunk) >= max_students or responses >= max_responses:
+            yield chunk
+            chunk = []
+            responses = 0
+    if chunk:
+        yield chunk
+
+
+# ============================================================================
+# OUTPUT (WRITE OR DIFF)
+# ============================================================================
+
+def write_mastery(documents: List[Dict], write_batch: int) -> int:
+    """Upsert replayed mastery documents with unordered bulk writes"""
+    replayed_at = datetime.utcnow()
+    written = 0
+    for start in range(0, len(documents), write_batch):
+        operations = [
+            UpdateOne(
+                {'_id': doc['_id']},
+                {'$set': dict(
+                    {k: v for k, v in doc.items() if k != '_id'},
+                    replayed_at=replayed_at,
+                    updated_at=replayed_at
+                )},
+                upsert=True
+            )
+            for doc in documents[start:start + write_batch]
+        ]
+        result = bulk_write(STUDENT_CONCEPT_MASTERY, operations, ordered=False)
+        written += result.upserted_count + result.modified_count
+        invalidate_practice_sessions({doc['student_id'] for doc in documents[start:start + write_batch]})
+    return written
+
+
+def write_student_states(memories: List[Tuple[str, Dict[str, float]]], write_batch: int):
+    """Replace replayed students' DKVMN memory and drop their DKT hidden states"""
+    replayed_at = datetime.utcnow()
+    for start in range(0, len(memories), write_batch):
+        batch = memories[start:start + write_batch]
+        bulk_write(STUDENT_MEMORY_STATES, [
+            UpdateOne(
+                {'_id': student_id},
+                {
+                    '$set': {'mastery': mastery, 'updated_at': replayed_at},
+                    '$unset': {'concept_ids': '', 'values': ''},
+                    '$inc': {'version': 1}
+                },
+                upsert=True
+            )
+            for student_id, mastery in batch
+        ], ordered=False)
+        delete_many(DKT_HIDDEN_STATES, {'_id': {'$in': [student_id for student_id, _ in batch]}})
+
+
+class MasteryDiff:
+    """Running comparison of replayed against stored mastery scores"""
+
+    def __init__(self, tolerance: float = 0.01, top: int = 20):
+        self.tolerance = tolerance
+        self.top = top
+        self.compared = 0
+        self.new = 0
+        self.changed = 0
+        self.total_abs_delta = 0.0
+        self.max_abs_delta = 0.0
+        self._largest = []
+
+    def add(self, documents: List[Dict]):
+        stored = {
+            doc['_id']: doc.get('mastery_score')
+            for doc in find_many(
+                STUDENT_CONCEPT_MASTERY,
+                {'_id': {'$in': [d['_id'] for d in documents]}},
+                {'mastery_score': 1}
+            )
+        }
+        for doc in documents:
+            before = stored.get(doc['_id'])
+            if before is None:
+                self.new += 1
+                continue
+
+            delta = doc['mastery_score'] - before
+            self.compared += 1
+            self.total_abs_delta += abs(delta)
+            self.max_abs_delta = max(self.max_abs_delta, abs(delta))
+            if abs(delta) > self.tolerance:
+                self.changed += 1
+                entry = (abs(delta), doc['_id'], before, doc['mastery_score'])
+                if len(self._largest) < self.top:
+                    heapq.heappush(self._largest, entry)
+                else:
+                    heapq.heappushpop(self._largest, entry)
+
+    def summary(self) -> Dict:
+        return {
+            'pairs_compared': self.compared,
+            'pairs_new': self.new,
+            'pairs_changed': self.changed,
+            'mean_abs_delta': round(self.total_abs_delta / self.compared, 4) if self.compared else 0.0,
+            'max_abs_delta': round(self.max_abs_delta, 4),
+            'largest_changes': [
+                {'_id': _id, 'stored': before, 'replayed': after}
+                for _, _id, before, after in sorted(self._largest, reverse=True)
+            ]
+        }
+
+
+# ============================================================================
+# JOB
+# ============================================================================
+
+def run_replay_job(
+    job_id: str = 'default',
+    resume: bool = False,
+    dry_run: bool = False,
+    student_ids: Optional[List[str]] = None,
+    workers: int = Config.MASTERY_REPLAY_WORKERS,
+    chunk_size: int = Config.MASTERY_REPLAY_CHUNK_STUDENTS,
+    write_batch: int = Config.MASTERY_REPLAY_WRITE_BATCH,
+    tolerance: float = 0.01
+) -> Dict:
+    """
+    Replay every student's responses and rewrite (or diff) their mastery
+
+    Args:
+        job_id: Checkpoint key; reuse it with resume=True after an interruption
+        resume: Continue after the job's last checkpointed student
+        dry_run: Write nothing; compare replayed scores to stored ones
+        student_ids: Restrict the replay to these students (default: all)
+        workers: Worker processes
+        chunk_size: Students per pool task
+        write_batch: Operations per bulk_write call
+        tolerance: Dry run - score deltas above this count as changed
+
+    Returns:
+        Run summary with counts, timings and (dry run) the diff
+    """
+    started = time.perf_counter()
+
+    after_student_id = None
+    if resume:
+        checkpoint = load_checkpoint(job_id)
+        if checkpoint is not None:
+            if checkpoint.get('completed'):
+                logger.info(f"[MASTERY_REPLAY] Job already completed | job_id: {job_id}")
+                return {'job_id': job_id, 'students_replayed': 0, 'responses_replayed': 0, 'completed': True}
+            after_student_id = checkpoint.get('last_student_id')
+
+    bkt_defaults = {
+        'p_l0': Config.BKT_PRIOR_MASTERY,
+        'p_t': Config.BKT_LEARNING_RATE,
+        'p_g': Config.BKT_GUESS_RATE,
+        'p_s': Config.BKT_SLIP_RATE
+    }
+    fitted_params = load_fitted_params()
+
+    # Same related concepts as live /calculate reads
+    graph_snapshot = None
+    if Config.CONCEPT_GRAPH_ENABLED:
+        concept_graph.refresh()
+        graph_snapshot = concept_graph.snapshot()
+
+    logger.info(
+        f"[MASTERY_REPLAY] Starting | job_id: {job_id} | dry_run: {dry_run} | workers: {workers} "
+        f"| fitted_concepts: {len(fitted_params)} "
+        f"| graph_edges: {graph_snapshot.num_edges if graph_snapshot is not None else 'off'} "
+        f"| after_student_id: {after_student_id}"
+    )
+
+    summary = {
+        'job_id': job_id,
+        'dry_run': dry_run,
+        'students_replayed': 0,
+        'responses_replayed': 0,
+        'pairs_written': 0,
+        'chunks_failed': 0
+    }
+    diff = MasteryDiff(tolerance) if dry_run else None
+
+    # Chunks finish out of order; the checkpoint only advances over a
+    # contiguous prefix of finished chunks
+    pending = {}
+    finished = {}
+    next_sequence = 0
+    last_checkpointed = after_student_id
+
+    def collect(futures):
+        nonlocal next_sequence, last_checkpointed
+        for future in futures:
+            sequence, last_student_id, num_students = pending.pop(future)
+            try:
+                documents, memories, responses = future.result()
+            except Exception as e:
+                summary['chunks_failed'] += 1
+                logger.error(f"[MASTERY_REPLAY] Chunk failed | last_student_id: {last_student_id} | error: {str(e)}")
+                continue
+
+            if dry_run:
+                diff.add(documents)
+            else:
+                summary['pairs_written'] += write_mastery(documents, write_batch)
+                write_student_states(memories, write_batch)
+            summary['students_replayed'] += num_students
+            summary['responses_replayed'] += responses
+            finished[sequence] = last_student_id
+
+        advanced = False
+        while next_sequence in finished:
+            last_checkpointed = finished.pop(next_sequence)
+            next_sequence += 1
+            advanced = True
+        if advanced and not dry_run:
+            save_checkpoint(job_id, last_checkpointed, summary)
+
+    max_in_flight = max(1, workers) * 2
+
+    with ProcessPoolExecutor(
+        max_workers=max(1, workers),
+        initializer=init_replay_worker,
+        initargs=(bkt_defaults, fitted_params, Config.RESPONSE_HISTORY_LENGTH, graph_snapshot)
+    ) as pool:
+        students = stream_student_responses(after_student_id, student_ids)
+        for sequence, chunk in enumerate(chunk_students(students, max(1, chunk_size))):
+            # Bound the number of response chunks held in memory at once
+            if len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = pool.submit(replay_students, chunk)
+            pending[future] = (sequence, chunk[-1][0], len(chunk))
+
+            if sequence and sequence % 50 == 0:
+                logger.info(
+                    f"[MASTERY_REPLAY] Progress | students: {summary['students_replayed']} "
+                    f"| responses: {summary['responses_replayed']} | elapsed: {time.perf_counter() - started:.1f}s"
+                )
+
+        collect(list(pending))
+
+    if not dry_run and not summary['chunks_failed'] and last_checkpointed is not None:
+        save_checkpoint(job_id, last_checkpointed, summary, completed=True)
+
+    summary['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+    if diff is not None:
+        summary['diff'] = diff.summary()
+    logger.info(
+        f"[MASTERY_REPLAY] Done | students: {summary['students_replayed']} | responses: {summary['responses_replayed']} "
+        f"| pairs_written: {summary['pairs_written']} | failed_chunks: {summary['chunks_failed']} "
+        f"| elapsed: {summary['elapsed_seconds']}s"
+    )
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild student_concept_mastery by replaying student_responses')
+    parser.add_argument('--job-id', default='default', help='Checkpoint key for --resume')
+    parser.add_argument('--resume', action='store_true', help="Continue after the job's last checkpoint")
+    parser.add_argument('--dry-run', action='store_true', help='Report differences without writing')
+    parser.add_argument('--students', nargs='*', help='Only replay these student IDs')
+    parser.add_argument('--workers', type=int, default=Config.MASTERY_REPLAY_WORKERS)
+    parser.add_argument('--chunk-size', type=int, default=Config.MASTERY_REPLAY_CHUNK_STUDENTS)
+    parser.add_argument('--tolerance', type=float, default=0.01, help='Dry run: minimum delta reported as changed')
+    args = parser.parse_args()
+
+    print(run_replay_job(
+        job_id=args.job_id,
+        resume=args.resume,
+        dry_run=args.dry_run,
+        student_ids=args.students,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        tolerance=args.tolerance
+    ))
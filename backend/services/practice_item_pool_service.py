@@ -0,0 +1,195 @@
+"""
+AMEP Practice Item Pool Service
+In-memory practice_items pool for adaptive session generation (BR2, BR3)
+
+Location: backend/services/practice_item_pool_service.py
+
+Session generation used to query practice_items once per concept and
+rebuild a ContentItem per item on every request. The pool instead loads
+every missing concept with one $in query, normalizes difficulty once and
+keeps ready-made ContentItem lists per concept. The ContentBank assembled
+for a concept set (one classroom's concepts, one focus concept) is kept
+too, so repeat requests for a classroom only pay for ZPD scoring.
+
+Invalidation is version based: mastery_concepts_routes calls invalidate()
+when it creates, updates or deletes an item or concept, which bumps that
+concept's version. Entries loaded under an older version (including loads
+that were in flight during the write) are reloaded on next use. Versions
+live in this process, so other workers only see writes once
+max_age_seconds has passed.
+"""
+
+import time
+import threading
+from itertools import count
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.database import PRACTICE_ITEMS, find_many
+from ai_engine.adaptive_practice import ContentBank, ContentItem
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DIFFICULTY_LEVELS = {'easy': 0.3, 'medium': 0.5, 'hard': 0.7}
+
+ITEM_PROJECTION = {
+    'concept_id': 1,
+    'difficulty': 1,
+    'question': 1,
+    'options': 1,
+    'correct_answer': 1,
+    'explanation': 1
+}
+
+
+def normalize_difficulty(value) -> float:
+    """Stored difficulty ('easy'/'medium'/'hard' or a number) as 0-1 float"""
+    try:
+        if isinstance(value, str):
+            return DIFFICULTY_LEVELS.get(value.lower()) or float(value)
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.5
+
+
+@dataclass
+class _ConceptEntry:
+    serial: int
+    version: Tuple[int, int]
+    loaded_at: float
+    weight: float
+    items: List[ContentItem]
+
+
+class PracticeItemPool:
+    """
+    Per-concept ContentItem lists plus assembled ContentBanks
+
+    Args:
+        max_age_seconds: Reload entries older than this (0 = never)
+        max_banks: Assembled concept-set banks kept (least recently used
+            are dropped first)
+    """
+
+    def __init__(self, max_age_seconds: float = 300, max_banks: int = 256):
+        self.max_age_seconds = max_age_seconds
+        self.max_banks = max_banks
+        self._entries: Dict[str, _ConceptEntry] = {}
+        self._banks: 'OrderedDict[Tuple[str, ...], Tuple[Tuple[int, ...], ContentBank]]' = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._generation = 0
+        self._serials = count()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'loads': 0, 'queries': 0, 'bank_hits': 0}
+
+    def invalidate(self, concept_id: Optional[str] = None):
+        """Mark a concept's items (or, with no concept, every item) stale"""
+        with self._lock:
+            if concept_id is None:
+                self._generation += 1
+            else:
+                concept_id = str(concept_id)
+                self._versions[concept_id] = self._versions.get(concept_id, 0) + 1
+
+    def _version(self, concept_id: str) -> Tuple[int, int]:
+        return self._generation, self._versions.get(concept_id, 0)
+
+    def _fresh(self, entry: Optional[_ConceptEntry], concept_id: str, weight: float, now: float) -> bool:
+        return (
+            entry is not None
+            and entry.version == self._version(concept_id)
+            and entry.weight == weight
+            and not (self.max_age_seconds and now - entry.loaded_at > self.max_age_seconds)
+        )
+
+    def concept_items(self, concepts: Sequence[Dict]) -> Dict[str, List[ContentItem]]:
+        """
+        {concept_id: [ContentItem]} for concept documents
+
+        Concepts not cached (or stale) are loaded with a single
+        practice_items query. Items take the concept's weight.
+        """
+        return {cid: entry.items for cid, entry in self._concept_entries(concepts).items()}
+
+    def _concept_entries(self, concepts: Sequence[Dict]) -> Dict[str, _ConceptEntry]:
+        now = time.monotonic()
+        weights = {str(c['_id']): float(c.get('weight', 1.0)) for c in concepts}
+
+        with self._lock:
+            entries = {cid: self._entries.get(cid) for cid in weights}
+            missing = [cid for cid in weights if not self._fresh(entries[cid], cid, weights[cid], now)]
+            versions = {cid: self._version(cid) for cid in missing}
+            self.stats['hits'] += len(weights) - len(missing)
+
+        if missing:
+            grouped: Dict[str, List[ContentItem]] = {cid: [] for cid in missing}
+            for doc in find_many(PRACTICE_ITEMS, {'concept_id': {'$in': missing}}, ITEM_PROJECTION):
+                concept_id = str(doc.get('concept_id'))
+                if concept_id not in grouped:
+                    continue
+                grouped[concept_id].append(ContentItem(
+                    item_id=str(doc['_id']),
+                    concept_id=concept_id,
+                    difficulty=normalize_difficulty(doc.get('difficulty', 0.5)),
+                    weight=weights[concept_id],
+                    estimated_time=5,
+                    question=doc.get('question', 'Question text missing'),
+                    options=doc.get('options', []),
+                    correct_answer=doc.get('correct_answer'),
+                    explanation=doc.get('explanation')
+                ))
+
+            with self._lock:
+                self.stats['queries'] += 1
+                self.stats['loads'] += len(missing)
+                for concept_id, items in grouped.items():
+                    # Stamped with the version read before the query, so a
+                    # write during the load leaves this entry stale
+                    entries[concept_id] = self._entries[concept_id] = _ConceptEntry(
+                        serial=next(self._serials),
+                        version=versions[concept_id],
+                        loaded_at=now,
+                        weight=weights[concept_id],
+                        items=items
+                    )
+            logger.info(f"[ITEM_POOL] Loaded concepts | concepts: {len(missing)} | items: {sum(len(i) for i in grouped.values())}")
+
+        return entries
+
+    def bank(self, concepts: Sequence[Dict]) -> Tuple[ContentBank, Dict[str, int]]:
+        """
+        ContentBank over the items of the given concepts, in concept order
+
+        Returns:
+            (bank, {concept_id: item count})
+        """
+        entries = self._concept_entries(concepts)
+        counts = {cid: len(entry.items) for cid, entry in entries.items()}
+        key = tuple(entries)
+        stamp = tuple(entry.serial for entry in entries.values())
+        with self._lock:
+            cached = self._banks.get(key)
+            if cached is not None and cached[0] == stamp:
+                self._banks.move_to_end(key)
+                self.stats['bank_hits'] += 1
+                return cached[1], counts
+
+        bank = ContentBank.from_items(item for entry in entries.values() for item in entry.items)
+        with self._lock:
+            self._banks[key] = (stamp, bank)
+            self._banks.move_to_end(key)
+            while len(self._banks) > self.max_banks:
+                self._banks.popitem(last=False)
+        return bank, counts
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, concepts=len(self._entries), banks=len(self._banks))
+
+
+practice_item_pool = PracticeItemPool(
+    max_age_seconds=Config.PRACTICE_ITEM_POOL_MAX_AGE_SECONDS
+)
@@ -0,0 +1,226 @@
+"""
+AMEP Practice Session Queue Service
+Pre-generated next practice session per student (BR2)
+
+Location: backend/services/practice_session_queue_service.py
+
+Each student has one practice_session_queue document holding
+
+    mastery_version   bumped ($inc) on every write to the student's mastery
+    request           the parameters of their last practice request
+    session           the pre-generated session, built at session_version
+    requested_at      when they last asked for a session (activity marker)
+
+After a mastery update, students who practiced within active_days get their
+next session regenerated by a background worker. The session is written
+only if mastery_version is still the one read before generating, so a
+session built from outdated mastery is never stored. /practice/generate
+serves the stored session with a single read when its version matches the
+current mastery_version, the request parameters match and it is younger
+than max_age_seconds (stored mastery decays and items change over time);
+otherwise it generates on demand and stores the result the same way.
+"""
+
+import queue
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from models.database import db, PRACTICE_SESSION_QUEUE, find_one, update_one, update_many
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def invalidate_practice_sessions(student_ids: Iterable[str]):
+    """Mark stored sessions stale for students whose mastery was rewritten in bulk"""
+    student_ids = list(student_ids)
+    if student_ids:
+        update_many(PRACTICE_SESSION_QUEUE, {'_id': {'$in': student_ids}}, {'$inc': {'mastery_version': 1}})
+
+
+class PracticeSessionQueue:
+    """
+    Version-stamped cache of each student's next practice session
+
+    Args:
+        generate_fn: (student_id, request) -> session payload, where
+            request is {'classroom_id', 'concept_id', 'session_duration'}
+        max_age_seconds: Stored sessions older than this are not served
+        active_days: Only students who requested a session this recently
+            are regenerated in the background
+    """
+
+    def __init__(
+        self,
+        generate_fn: Callable[[str, Dict], Dict],
+        max_age_seconds: float = 1800,
+        active_days: float = 7,
+        name: str = 'practice-session-queue'
+    ):
+        self.generate_fn = generate_fn
+        self.max_age_seconds = max_age_seconds
+        self.active_days = active_days
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._running = False
+        self.stats = {'hits': 0, 'misses': 0, 'scheduled': 0, 'generated': 0, 'stale_writes': 0, 'errors': 0}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the background worker (idempotent)"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._worker.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the worker after draining already scheduled students"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            self._queue.put(None)
+        self._worker.join(timeout)
+
+    # ------------------------------------------------------------------
+    # Serving
+    # ------------------------------------------------------------------
+
+    def cached_session(self, student_id: str, request: Dict) -> Tuple[Optional[Dict], int]:
+        """
+        (stored session or None, current mastery_version) from one read
+
+        The version is passed back to store_session when the caller
+        generates on demand.
+        """
+        doc = find_one(PRACTICE_SESSION_QUEUE, {'_id': student_id}) or {}
+        version = doc.get('mastery_version', 0)
+        generated_at = doc.get('generated_at')
+        fresh = (
+            doc.get('session') is not None
+            and doc.get('session_version') == version
+            and doc.get('request') == request
+            and generated_at is not None
+            and datetime.utcnow() - generated_at <= timedelta(seconds=self.max_age_seconds)
+        )
+        with self._lock:
+            self.stats['hits' if fresh else 'misses'] += 1
+        if fresh and datetime.utcnow() - doc.get('requested_at', generated_at) > timedelta(days=1):
+            # Keep the activity marker roughly current without a write per hit
+            update_one(PRACTICE_SESSION_QUEUE, {'_id': student_id}, {'$set': {'requested_at': datetime.utcnow()}})
+        return (doc['session'] if fresh else None), version
+
+    def store_session(
+        self,
+        student_id: str,
+        request: Dict,
+        session: Dict,
+        mastery_version: int,
+        requested: bool = False
+    ) -> bool:
+        """
+        Store a session generated from mastery at mastery_version
+
+        Returns False (and stores nothing) if the student's mastery changed
+        since that version was read.
+        """
+        fields = {
+            'request': request,
+            'session': session,
+            'session_version': mastery_version,
+            'generated_at': datetime.utcnow()
+        }
+        if requested:
+            fields['requested_at'] = fields['generated_at']
+        try:
+            # Upsert only creates the document for a student with no
+            # mastery writes yet (version 0); otherwise a version mismatch
+            # makes the insert collide with the existing _id
+            update_one(
+                PRACTICE_SESSION_QUEUE,
+                {'_id': student_id, 'mastery_version': mastery_version},
+                {'$set': fields},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            with self._lock:
+                self.stats['stale_writes'] += 1
+            return False
+
+    # ------------------------------------------------------------------
+    # Background regeneration
+    # ------------------------------------------------------------------
+
+    def mastery_updated(self, student_id: str) -> bool:
+        """
+        Bump the student's mastery_version and schedule their next session
+        if they practiced within active_days
+
+        Returns: Whether regeneration was scheduled
+        """
+        doc = db[PRACTICE_SESSION_QUEUE].find_one_and_update(
+            {'_id': student_id},
+            {'$inc': {'mastery_version': 1}},
+            projection={'requested_at': 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        requested_at = (doc or {}).get('requested_at')
+        if requested_at is None or datetime.utcnow() - requested_at > timedelta(days=self.active_days):
+            return False
+        self.schedule(student_id)
+        return True
+
+    def schedule(self, student_id: str):
+        """Queue a regeneration (no-op if one is already pending)"""
+        with self._lock:
+            if student_id in self._pending:
+                return
+            self._pending.add(student_id)
+            self.stats['scheduled'] += 1
+        self.start()
+        self._queue.put(student_id)
+
+    def regenerate(self, student_id: str) -> bool:
+        """Generate and store a student's next session from current mastery"""
+        doc = find_one(PRACTICE_SESSION_QUEUE, {'_id': student_id}, {'mastery_version': 1, 'request': 1})
+        if not doc or doc.get('request') is None:
+            return False
+        session = self.generate_fn(student_id, doc['request'])
+        stored = self.store_session(student_id, doc['request'], session, doc.get('mastery_version', 0))
+        if stored:
+            with self._lock:
+                self.stats['generated'] += 1
+        return stored
+
+    def _run(self):
+        while True:
+            student_id = self._queue.get()
+            if student_id is None:
+                return
+            with self._lock:
+                self._pending.discard(student_id)
+            try:
+                self.regenerate(student_id)
+            except Exception as e:
+                with self._lock:
+                    self.stats['errors'] += 1
+                logger.warning(f"[PRACTICE_QUEUE] Regeneration failed | student_id: {student_id} | error: {str(e)}")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, pending=len(self._pending))